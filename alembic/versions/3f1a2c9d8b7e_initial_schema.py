@@ -0,0 +1,96 @@
+"""initial schema
+
+Revision ID: 3f1a2c9d8b7e
+Revises: 
+Create Date: 2026-10-18 09:12:41.503118
+
+Tables as they were created by Base.metadata.create_all before migrations
+were introduced. On a database that already has them (created by the app
+before it stopped calling create_all) it adopts them instead: it adds the
+date columns older versions lacked, which add_started_at.py and
+migrate_subtask_dates.py used to patch in, and the status indexes.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a2c9d8b7e'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+status_values = ('pending', 'in_progress', 'completed')
+
+
+# Columns that tables from older create_all versions may lack
+LEGACY_COLUMNS = {
+    'task': ('started_at', 'completed_at'),
+    'subtask': ('created_at', 'started_at', 'completed_at'),
+}
+
+
+def adopt_existing_tables(inspector) -> None:
+    for table, columns in LEGACY_COLUMNS.items():
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        missing = [column for column in columns if column not in existing]
+        if missing:
+            with op.batch_alter_table(table) as batch_op:
+                for column in missing:
+                    batch_op.add_column(sa.Column(column, sa.DateTime(), nullable=True))
+    op.execute("UPDATE subtask SET created_at = updated_at WHERE created_at IS NULL")
+
+    for table in ('task', 'subtask'):
+        index = f'idx_{table}_status'
+        if index not in {idx['name'] for idx in inspector.get_indexes(table)}:
+            op.create_index(index, table, ['status'], unique=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Offline (--sql) runs have no database to look at and always create
+    if not op.get_context().as_sql:
+        inspector = sa.inspect(op.get_bind())
+        if inspector.has_table('task') and inspector.has_table('subtask'):
+            adopt_existing_tables(inspector)
+            return
+
+    op.create_table(
+        'task',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('page_name', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('status', sa.Enum(*status_values, name='taskstatus'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_task_status', 'task', ['status'], unique=False)
+
+    op.create_table(
+        'subtask',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('status', sa.Enum(*status_values, name='subtaskstatus'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['task_id'], ['task.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_subtask_status', 'subtask', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_subtask_status', table_name='subtask')
+    op.drop_table('subtask')
+    op.drop_index('idx_task_status', table_name='task')
+    op.drop_table('task')
@@ -0,0 +1,38 @@
+"""task and subtask lookup indexes
+
+Revision ID: 8c4e71b05d2a
+Revises: 3f1a2c9d8b7e
+Create Date: 2026-10-18 09:31:07.220914
+
+Adds the indexes behind the hot queries in crud.py: page listings
+(page_name, status / created_at ordering), the global created_at ordering
+and subtask lookups by task_id. `if_not_exists` keeps this safe on databases
+whose tables were already created from the current models.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4e71b05d2a'
+down_revision: Union[str, Sequence[str], None] = '3f1a2c9d8b7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_task_page_status', 'task', ['page_name', 'status'], unique=False, if_not_exists=True)
+    op.create_index('idx_task_page_created', 'task', ['page_name', 'created_at', 'id'], unique=False, if_not_exists=True)
+    op.create_index('idx_task_created', 'task', ['created_at', 'id'], unique=False, if_not_exists=True)
+    op.create_index('idx_subtask_task_id', 'subtask', ['task_id', 'status'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_subtask_task_id', table_name='subtask')
+    op.drop_index('idx_task_created', table_name='task')
+    op.drop_index('idx_task_page_created', table_name='task')
+    op.drop_index('idx_task_page_status', table_name='task')
@@ -0,0 +1,94 @@
+"""task archive tier
+
+Revision ID: a7d4e2c19f63
+Revises: f3c6a2d81e47
+Create Date: 2026-10-18 19:02:41.336120
+
+Adds task_archive and subtask_archive, where the archival job moves old
+completed tasks, the task_archive_stats counters that keep
+/tasks/analytics counting them, and the index the job selects tasks by.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d4e2c19f63'
+down_revision: Union[str, Sequence[str], None] = 'f3c6a2d81e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+status_values = ('pending', 'in_progress', 'completed')
+
+
+def _status_type(name):
+    # The enum types of task/subtask already exist on PostgreSQL
+    return sa.Enum(*status_values, name=name).with_variant(
+        postgresql.ENUM(*status_values, name=name, create_type=False), 'postgresql'
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'task_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('page_name', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('status', _status_type('taskstatus'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('subtask_total', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('subtask_pending', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('subtask_in_progress', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('subtask_completed', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('first_subtask_started_at', sa.DateTime(), nullable=True),
+        sa.Column('last_subtask_completed_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_task_archive_page_created', 'task_archive', ['page_name', 'created_at', 'id'], unique=False)
+    op.create_index('idx_task_archive_created', 'task_archive', ['created_at', 'id'], unique=False)
+    op.create_table(
+        'subtask_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('status', _status_type('subtaskstatus'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['task_id'], ['task_archive.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_subtask_archive_task_id', 'subtask_archive', ['task_id'], unique=False)
+    op.create_table(
+        'task_archive_stats',
+        sa.Column('page_name', sa.String(), nullable=False),
+        sa.Column('tasks', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('with_subtasks', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('subtasks_pending', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('subtasks_in_progress', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('subtasks_completed', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('page_name'),
+    )
+    op.create_index('idx_task_status_completed', 'task', ['status', 'completed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Archived tasks are lost with the tables: restore them first
+    op.drop_index('idx_task_status_completed', table_name='task')
+    op.drop_table('task_archive_stats')
+    op.drop_index('idx_subtask_archive_task_id', table_name='subtask_archive')
+    op.drop_table('subtask_archive')
+    op.drop_index('idx_task_archive_created', table_name='task_archive')
+    op.drop_index('idx_task_archive_page_created', table_name='task_archive')
+    op.drop_table('task_archive')
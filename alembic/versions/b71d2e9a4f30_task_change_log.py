@@ -0,0 +1,43 @@
+"""task change log
+
+Revision ID: b71d2e9a4f30
+Revises: 8c4e71b05d2a
+Create Date: 2026-10-18 11:02:16.874402
+
+Adds task_change, the per-task change feed whose ids are the page revision
+numbers returned by the mutation endpoints and /tasks/changes.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71d2e9a4f30'
+down_revision: Union[str, Sequence[str], None] = '8c4e71b05d2a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'task_change',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('page_name', sa.String(), nullable=False),
+        sa.Column('deleted', sa.Boolean(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('task_id'),
+        sqlite_autoincrement=True,
+        if_not_exists=True,
+    )
+    op.create_index('idx_task_change_page', 'task_change', ['page_name', 'id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_task_change_page', table_name='task_change')
+    op.drop_table('task_change')
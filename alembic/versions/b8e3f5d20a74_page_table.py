@@ -0,0 +1,86 @@
+"""page table
+
+Revision ID: b8e3f5d20a74
+Revises: a7d4e2c19f63
+Create Date: 2026-10-18 21:14:52.617035
+
+Adds the page registry and task.page_id / task_archive.page_id, backfilled
+from the page_name strings, and moves the page indexes over to page_id.
+The live page/status index is partial, so GET /pages counts from it alone.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from database_setup.search import search_triggers
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e3f5d20a74'
+down_revision: Union[str, Sequence[str], None] = 'a7d4e2c19f63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIVE = sa.text('deleted_at IS NULL AND archived_at IS NULL')
+
+
+def _restore_search_triggers():
+    # Recreating the table dropped its FTS triggers (see database_setup/search.py)
+    if op.get_context().dialect.name == 'sqlite':
+        for statement in search_triggers('task'):
+            op.execute(statement)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'page',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    # One page per distinct name in either tier, created with its first task
+    op.execute(
+        'INSERT INTO page (name, created_at) '
+        'SELECT page_name, MIN(created_at) FROM ('
+        'SELECT page_name, created_at FROM task '
+        'UNION ALL SELECT page_name, created_at FROM task_archive'
+        ') AS named GROUP BY page_name ORDER BY page_name'
+    )
+    for table in ('task', 'task_archive'):
+        op.add_column(table, sa.Column('page_id', sa.Integer(), nullable=True))
+        op.execute(f'UPDATE {table} SET page_id = (SELECT page.id FROM page WHERE page.name = {table}.page_name)')
+
+    op.drop_index('idx_task_page_status', table_name='task')
+    op.drop_index('idx_task_page_created', table_name='task')
+    op.drop_index('idx_task_archive_page_created', table_name='task_archive')
+    for table in ('task', 'task_archive'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('page_id', existing_type=sa.Integer(), nullable=False)
+            batch_op.create_foreign_key(f'fk_{table}_page_id_page', 'page', ['page_id'], ['id'])
+    op.create_index(
+        'idx_task_live_page_status', 'task', ['page_id', 'status', 'deleted_at', 'archived_at'], unique=False,
+        sqlite_where=LIVE, postgresql_where=LIVE,
+    )
+    op.create_index('idx_task_page_id_created', 'task', ['page_id', 'created_at', 'id'], unique=False)
+    op.create_index('idx_task_archive_page_created', 'task_archive', ['page_id', 'created_at', 'id'], unique=False)
+    _restore_search_triggers()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_task_archive_page_created', table_name='task_archive')
+    op.drop_index('idx_task_page_id_created', table_name='task')
+    op.drop_index('idx_task_live_page_status', table_name='task')
+    for table in ('task', 'task_archive'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f'fk_{table}_page_id_page', type_='foreignkey')
+            batch_op.drop_column('page_id')
+    op.create_index('idx_task_archive_page_created', 'task_archive', ['page_name', 'created_at', 'id'], unique=False)
+    op.create_index('idx_task_page_created', 'task', ['page_name', 'created_at', 'id'], unique=False)
+    op.create_index('idx_task_page_status', 'task', ['page_name', 'status'], unique=False)
+    op.drop_table('page')
+    _restore_search_triggers()
@@ -0,0 +1,40 @@
+"""task dependencies
+
+Revision ID: c3f7a1e05b92
+Revises: b8e3f5d20a74
+Create Date: 2026-10-18 22:05:37.348319
+
+Adds task_dependency, the edges of the dependency graph behind
+/tasks/ready, /tasks/blocked and /tasks/critical-path.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f7a1e05b92'
+down_revision: Union[str, Sequence[str], None] = 'b8e3f5d20a74'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'task_dependency',
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('depends_on_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['depends_on_id'], ['task.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['task_id'], ['task.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('task_id', 'depends_on_id'),
+    )
+    op.create_index('idx_task_dependency_depends_on', 'task_dependency', ['depends_on_id', 'task_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_task_dependency_depends_on', table_name='task_dependency')
+    op.drop_table('task_dependency')
@@ -0,0 +1,52 @@
+"""task subtask rollups
+
+Revision ID: c5d93e1f7a12
+Revises: b71d2e9a4f30
+Create Date: 2026-10-18 13:40:52.118305
+
+Adds the subtask rollup columns to task (counts by status, first subtask
+start, last subtask completion) and fills them from the existing subtasks.
+`python rebuild_rollups.py` recomputes them the same way later on.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d93e1f7a12'
+down_revision: Union[str, Sequence[str], None] = 'b71d2e9a4f30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNT_COLUMNS = ('subtask_total', 'subtask_pending', 'subtask_in_progress', 'subtask_completed')
+DATE_COLUMNS = ('first_subtask_started_at', 'last_subtask_completed_at')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('task') as batch_op:
+        for column in COUNT_COLUMNS:
+            batch_op.add_column(sa.Column(column, sa.Integer(), server_default='0', nullable=False))
+        for column in DATE_COLUMNS:
+            batch_op.add_column(sa.Column(column, sa.DateTime(), nullable=True))
+
+    # Enum columns store the member names
+    op.execute("""
+        UPDATE task SET
+            subtask_total = (SELECT count(*) FROM subtask WHERE subtask.task_id = task.id),
+            subtask_pending = (SELECT count(*) FROM subtask WHERE subtask.task_id = task.id AND status = 'pending'),
+            subtask_in_progress = (SELECT count(*) FROM subtask WHERE subtask.task_id = task.id AND status = 'in_progress'),
+            subtask_completed = (SELECT count(*) FROM subtask WHERE subtask.task_id = task.id AND status = 'completed'),
+            first_subtask_started_at = (SELECT min(started_at) FROM subtask WHERE subtask.task_id = task.id),
+            last_subtask_completed_at = (SELECT max(completed_at) FROM subtask WHERE subtask.task_id = task.id)
+        WHERE EXISTS (SELECT 1 FROM subtask WHERE subtask.task_id = task.id)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('task') as batch_op:
+        for column in reversed(COUNT_COLUMNS + DATE_COLUMNS):
+            batch_op.drop_column(column)
@@ -0,0 +1,60 @@
+"""task and subtask search index
+
+Revision ID: d2a8f61c9b35
+Revises: c5d93e1f7a12
+Create Date: 2026-10-18 15:12:40.531976
+
+Adds the FTS5 tables behind /tasks/search (external content over task and
+subtask), the triggers that keep them in sync, and indexes the existing
+rows. Mirrors database_setup/search.py as of this revision. SQLite only:
+on PostgreSQL crud.search_tasks ranks tsvectors of the raw columns instead.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a8f61c9b35'
+down_revision: Union[str, Sequence[str], None] = 'c5d93e1f7a12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = {
+    'task': ('name', 'description'),
+    'subtask': ('title', 'description'),
+}
+FTS_OPTIONS = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_context().dialect.name != 'sqlite':
+        return
+    for table, columns in SEARCH_COLUMNS.items():
+        fts = f'{table}_fts'
+        cols = ', '.join(columns)
+        new = ', '.join(f'new.{c}' for c in columns)
+        old = ', '.join(f'old.{c}' for c in columns)
+        remove = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+        add = f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});'
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{cols}, content='{table}', content_rowid='id', {FTS_OPTIONS})"
+        )
+        op.execute(f'CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {add} END')
+        op.execute(f'CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {remove} END')
+        op.execute(f'CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {cols} ON {table} BEGIN {remove} {add} END')
+        # Backfill from the content table
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name != 'sqlite':
+        return
+    for table in SEARCH_COLUMNS:
+        fts = f'{table}_fts'
+        for trigger in ('insert', 'delete', 'update'):
+            op.execute(f'DROP TRIGGER IF EXISTS {fts}_{trigger}')
+        op.execute(f'DROP TABLE IF EXISTS {fts}')
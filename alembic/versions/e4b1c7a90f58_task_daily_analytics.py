@@ -0,0 +1,56 @@
+"""task daily analytics
+
+Revision ID: e4b1c7a90f58
+Revises: d2a8f61c9b35
+Create Date: 2026-10-18 16:05:12.470193
+
+Adds task_daily_stats and task_duration_bucket, the per-day rollups behind
+/tasks/analytics/daily and /tasks/analytics/durations. They start empty;
+`python rebuild_analytics.py` fills them from the existing tasks.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b1c7a90f58'
+down_revision: Union[str, Sequence[str], None] = 'd2a8f61c9b35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'task_daily_stats',
+        sa.Column('page_name', sa.String(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('created', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('started', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('completed', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('removed', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('lead_seconds', sa.Float(), server_default='0', nullable=False),
+        sa.Column('cycle_seconds', sa.Float(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('page_name', 'day'),
+    )
+    op.create_index('idx_task_daily_stats_day', 'task_daily_stats', ['day'], unique=False)
+    op.create_table(
+        'task_duration_bucket',
+        sa.Column('page_name', sa.String(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('bucket', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('page_name', 'day', 'kind', 'bucket'),
+    )
+    op.create_index('idx_task_duration_bucket_day', 'task_duration_bucket', ['day'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_task_duration_bucket_day', table_name='task_duration_bucket')
+    op.drop_table('task_duration_bucket')
+    op.drop_index('idx_task_daily_stats_day', table_name='task_daily_stats')
+    op.drop_table('task_daily_stats')
@@ -0,0 +1,58 @@
+"""task and subtask autoincrement
+
+Revision ID: e7a2c4b9d016
+Revises: c3f7a1e05b92
+Create Date: 2026-10-19 09:12:44.271903
+
+Rebuilds task and subtask with AUTOINCREMENT so SQLite never hands an id
+out twice: without it a new row gets max(id) + 1, which can be the id of
+an archived or purged task. The counters start past the ids in both tiers.
+SQLite only: PostgreSQL sequences never reuse ids.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from database_setup.search import search_triggers
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a2c4b9d016'
+down_revision: Union[str, Sequence[str], None] = 'c3f7a1e05b92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Hot table -> its archive
+TABLES = {
+    'task': 'task_archive',
+    'subtask': 'subtask_archive',
+}
+
+
+def _rebuild(autoincrement: bool):
+    for table in TABLES:
+        with op.batch_alter_table(table, recreate='always', table_kwargs={'sqlite_autoincrement': autoincrement}):
+            pass
+        # Recreating the table dropped its FTS triggers (see database_setup/search.py)
+        for statement in search_triggers(table):
+            op.execute(statement)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_context().dialect.name != 'sqlite':
+        return
+    _rebuild(autoincrement=True)
+    for table, archive in TABLES.items():
+        op.execute(f"DELETE FROM sqlite_sequence WHERE name = '{table}'")
+        op.execute(
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT '{table}', COALESCE(MAX(id), 0) "
+            f"FROM (SELECT id FROM {table} UNION ALL SELECT id FROM {archive})"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name != 'sqlite':
+        return
+    _rebuild(autoincrement=False)
@@ -0,0 +1,46 @@
+"""task soft delete
+
+Revision ID: f3c6a2d81e47
+Revises: e4b1c7a90f58
+Create Date: 2026-10-18 17:21:08.904412
+
+Adds task.deleted_at and task.archived_at, which hide a task from every
+read in crud.py, and a partial index over the rows waiting for the purge.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from database_setup.search import search_triggers
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c6a2d81e47'
+down_revision: Union[str, Sequence[str], None] = 'e4b1c7a90f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('task') as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('archived_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'idx_task_deleted_at', 'task', ['deleted_at'], unique=False,
+        sqlite_where=sa.text('deleted_at IS NOT NULL'),
+        postgresql_where=sa.text('deleted_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_task_deleted_at', table_name='task')
+    with op.batch_alter_table('task') as batch_op:
+        batch_op.drop_column('archived_at')
+        batch_op.drop_column('deleted_at')
+    # Recreating the table dropped its FTS triggers (see database_setup/search.py)
+    if op.get_context().dialect.name == 'sqlite':
+        for statement in search_triggers('task'):
+            op.execute(statement)
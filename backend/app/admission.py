@@ -0,0 +1,154 @@
+"""
+Load control for the expensive reads, used by cached_json in
+app/routers/task.py.
+
+SingleFlight coalesces identical reads. While one request computes a
+response that missed the cache, identical requests (same cache key and
+version) wait for its result instead of running the same queries again.
+
+ConcurrencyLimiter caps how many requests compute a response at once. The
+others queue in arrival order, up to `max_queue`, for at most
+`queue_timeout` seconds. Past either limit the request is shed with a 503
+and a Retry-After header. Cache hits, 304s and coalesced requests never take
+a slot. Keep the limit of heavy_reads well under the database pool size
+(DB_POOL_SIZE + DB_MAX_OVERFLOW): the connections left over are what keeps
+the mutation endpoints responsive during a burst of dashboard loads.
+
+Both work per process and per event loop, like the response cache. Their
+numbers are in /metrics (admission_*, cached_reads_total).
+"""
+from collections import deque
+from contextlib import asynccontextmanager
+import asyncio
+import math
+import os
+import time
+
+from fastapi import HTTPException
+
+from database_setup.metrics import metrics
+
+# Slots and queue of the cross-page reads (/pages, /tasks/all,
+# /tasks/summary, /tasks/analytics*, /tasks/search and the dependency graph)
+HEAVY_READ_CONCURRENCY = int(os.environ.get("HEAVY_READ_CONCURRENCY", 4))
+HEAVY_READ_QUEUE = int(os.environ.get("HEAVY_READ_QUEUE", 32))
+HEAVY_READ_QUEUE_TIMEOUT = float(os.environ.get("HEAVY_READ_QUEUE_TIMEOUT", 5))
+
+
+class _LeaderGone(Exception):
+    """The request computing a coalesced read was cancelled (its client went
+    away); a waiting request takes over."""
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}  # key -> Future of the result
+
+    async def run(self, key, compute):
+        """Returns `await compute()`, or the result of the identical call
+        already in flight for `key`. Its exception is shared as well."""
+        while key in self._calls:
+            try:
+                result = await asyncio.shield(self._calls[key])
+                metrics.count_coalesced(shared=True)
+                return result
+            except _LeaderGone:
+                continue
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        metrics.count_coalesced(shared=False)
+        try:
+            result = await compute()
+        except BaseException as e:
+            future.set_exception(_LeaderGone() if isinstance(e, asyncio.CancelledError) else e)
+            # Mark it retrieved, or asyncio logs it when nobody was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()  # Futures, resolved when handed a slot
+        self._hold_seconds = 0.0  # moving average, for Retry-After
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _report(self):
+        metrics.set_admission_load(self.name, self.in_flight, self.queued)
+
+    def _shed(self, outcome: str, waited: float):
+        metrics.observe_admission(self.name, outcome, waited)
+        # Roughly when the requests ahead will have drained
+        retry_after = max(1, math.ceil(self._hold_seconds * (self.queued + 1) / self.limit))
+        raise HTTPException(
+            status_code=503,
+            detail=f"Too many concurrent {self.name} requests, retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def _release(self):
+        # Hand the slot to the first waiter still waiting, if any
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def _acquire(self):
+        started = time.perf_counter()
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            metrics.observe_admission(self.name, "admitted", 0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._shed("shed_queue_full", 0.0)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._report()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as the wait ended: pass it on
+                self._release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._report()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._shed("shed_timeout", time.perf_counter() - started)
+        metrics.observe_admission(self.name, "admitted", time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Holds one of the `limit` slots for the duration of the block;
+        raises a 503 HTTPException when the request is shed."""
+        await self._acquire()
+        self._report()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            held = time.perf_counter() - started
+            self._hold_seconds += (held - self._hold_seconds) * 0.2
+            metrics.observe_admission_hold(self.name, held)
+            self._release()
+            self._report()
+
+
+single_flight = SingleFlight()
+heavy_reads = ConcurrencyLimiter("heavy_reads", HEAVY_READ_CONCURRENCY, HEAVY_READ_QUEUE, HEAVY_READ_QUEUE_TIMEOUT)
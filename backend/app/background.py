@@ -0,0 +1,79 @@
+"""
+Periodic maintenance jobs that run inside the app process. The lifespan in
+app/main.py starts them and cancels them on shutdown. Each run calls a sync
+database_setup function on its own SessionLocal session in a worker thread,
+so the event loop keeps serving requests. An interval of 0 disables a job.
+
+With several workers every process runs the jobs. They are idempotent and
+work in bounded batches, so the only cost is the repeated empty checks.
+"""
+from datetime import timedelta
+import asyncio
+import logging
+import os
+
+from database_setup import archive, crud
+from database_setup.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Seconds between purges of soft-deleted tasks
+PURGE_INTERVAL_SECONDS = float(os.environ.get("PURGE_INTERVAL_SECONDS", 300))
+# How long a deleted task stays in the database (restorable by hand) first
+PURGE_AFTER_HOURS = float(os.environ.get("PURGE_AFTER_HOURS", 24))
+PURGE_BATCH_SIZE = int(os.environ.get("PURGE_BATCH_SIZE", 500))
+
+# Seconds between archival runs, and how long after completion a task moves
+# to the archive tables (at least archive.MIN_ARCHIVE_AGE)
+ARCHIVE_INTERVAL_SECONDS = float(os.environ.get("ARCHIVE_INTERVAL_SECONDS", 3600))
+ARCHIVE_AFTER_DAYS = float(os.environ.get("ARCHIVE_AFTER_DAYS", 90))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 500))
+
+
+def purge_deleted():
+    db = SessionLocal()
+    try:
+        purged = crud.purge_deleted_tasks(db, timedelta(hours=PURGE_AFTER_HOURS), PURGE_BATCH_SIZE)
+    finally:
+        db.close()
+    if purged:
+        logger.info("Purged %d deleted task(s)", purged)
+    return purged
+
+def archive_completed():
+    db = SessionLocal()
+    try:
+        archived = archive.archive_completed_tasks(db, timedelta(days=ARCHIVE_AFTER_DAYS), ARCHIVE_BATCH_SIZE)
+    finally:
+        db.close()
+    if archived:
+        logger.info("Archived %d completed task(s)", archived)
+    return archived
+
+# name -> (interval in seconds, job)
+JOBS = {
+    "purge_deleted": (PURGE_INTERVAL_SECONDS, purge_deleted),
+    "archive_completed": (ARCHIVE_INTERVAL_SECONDS, archive_completed),
+}
+
+
+async def _run_periodically(name: str, interval: float, job):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(job)
+        except Exception:
+            # A failed run is retried at the next interval
+            logger.exception("Background job %s failed", name)
+
+def start_jobs():
+    return [
+        asyncio.create_task(_run_periodically(name, interval, job), name=name)
+        for name, (interval, job) in JOBS.items()
+        if interval > 0
+    ]
+
+async def stop_jobs(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,22 +1,55 @@
+from contextlib import asynccontextmanager
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database_setup.database import engine
+from fastapi.responses import PlainTextResponse
+from database_setup.database import dispose_engines, init_engines
+from database_setup.metrics import metrics
+from database_setup.migrations import SCHEMA_MODE, prepare_schema
+from app.background import start_jobs, stop_jobs
+from app.middleware import MetricsMiddleware
 from database_setup.models import Base, Task, Subtask  # Import models to register them
 from app.routers import task
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engines and the schema check (or upgrade) run at startup, not at import,
+    # see SCHEMA_MODE in database_setup/migrations.py
+    engine, _ = init_engines()
+    await asyncio.to_thread(prepare_schema, engine, app.state.schema_mode)
+    jobs = start_jobs()
+    yield
+    await stop_jobs(jobs)
+    await dispose_engines()
+
+
+def create_app(schema_mode: str = SCHEMA_MODE) -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+    app.state.schema_mode = schema_mode
+
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000"],  # Frontend URL
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Request latency, status and SQL statement metrics, see /metrics
+    app.add_middleware(MetricsMiddleware)
+
+    # Include the task router
+    app.include_router(task.router, prefix="/api/v1")
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus_metrics():
+        """Prometheus scrape endpoint for this process's metrics."""
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    return app
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],  # Frontend URL
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Include the task router
-app.include_router(task.router, prefix="/api/v1")
+app = create_app()
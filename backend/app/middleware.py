@@ -0,0 +1,63 @@
+"""
+ASGI middleware that records every HTTP request in database_setup.metrics:
+latency, status and the SQL statements it issued, labelled with the route
+template (/api/v1/pages/{page_name}/tasks), not the raw path.
+
+With SERVER_TIMING=1 responses also carry a Server-Timing header with the
+time spent so far in the app and in SQL, shown by browser devtools. For a
+streamed body that only covers the work done before the first byte.
+SSE responses are left out of the latency histograms, since they last as
+long as the client stays connected.
+"""
+import os
+import time
+
+from starlette.datastructures import MutableHeaders
+
+from database_setup.metrics import metrics
+
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+
+
+class MetricsMiddleware:
+    def __init__(self, app, server_timing: bool = SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = metrics.track_request()
+        status = 500
+        event_stream = False
+
+        async def send_with_timing(message):
+            nonlocal status, event_stream
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                event_stream = headers.get("content-type", "").startswith("text/event-stream")
+                if self.server_timing:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    headers.append(
+                        "Server-Timing",
+                        f'app;dur={elapsed_ms:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"',
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if not event_stream:
+                # The router leaves the matched route in the shared scope
+                route = scope.get("route")
+                metrics.observe_request(
+                    scope["method"],
+                    route.path if route is not None else "unmatched",
+                    status,
+                    time.perf_counter() - started,
+                    stats,
+                )
@@ -1,180 +1,640 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
 from fastapi import Request
-from typing import List, Optional
+from typing import Any, List, Optional, Union
 from datetime import datetime
-from pydantic import BaseModel
-from database_setup.database import get_db
-from database_setup import crud, schemas
-from database_setup.models import Task, TaskStatus, Subtask
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+import asyncio
+import csv
+import io
+import json
+import logging
+from database_setup.database import get_async_db, SessionLocal
+from database_setup import analytics, archive, async_crud, crud, dependencies, schemas
+from database_setup.cache import ALL_PAGES, response_cache
+from database_setup.events import change_broker
+from database_setup.models import Task, TaskStatus, Subtask, SubtaskStatus
+from app.admission import heavy_reads, single_flight
 
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Pydantic model for status updates
 class StatusUpdate(BaseModel):
     status: str
 
+# Pydantic models for batch status updates
+class TaskBatchStatusUpdate(BaseModel):
+    task_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    status: TaskStatus
+
+class SubtaskBatchStatusUpdate(BaseModel):
+    subtask_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    status: SubtaskStatus
+
+
+class TaskListParams:
+    """Query parameters of the task lists; with `limit` they return a page envelope instead of a bare list."""
+    def __init__(
+        self,
+        status: Optional[TaskStatus] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        q: Optional[str] = Query(None, description="Case-insensitive match on task name"),
+        limit: Optional[int] = Query(None, ge=1, le=500),
+        page_token: Optional[str] = None,
+        fields: Optional[str] = Query(None, description="Comma-separated task fields, e.g. id,name,status"),
+        include_subtasks: bool = True,
+        include_archived: bool = Query(False, description="Also list archived tasks, in both tiers"),
+    ):
+        self.status = status
+        self.created_after = created_after
+        self.created_before = created_before
+        self.q = q
+        self.limit = limit
+        self.page_token = page_token
+        self.fields = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+        self.include_subtasks = include_subtasks
+        self.include_archived = include_archived
+
+
+async def list_tasks(db: AsyncSession, params: TaskListParams, page_name: Optional[str] = None, summary: bool = False):
+    filters = dict(
+        status=params.status,
+        created_after=params.created_after,
+        created_before=params.created_before,
+        q=params.q,
+        cursor=params.page_token,
+        include_archived=params.include_archived,
+    )
+
+    async def fetch(**extra):
+        if summary:
+            return await async_crud.get_task_summaries(db, page_name, **filters, **extra)
+        return await async_crud.get_task_rows(
+            db, page_name, fields=params.fields, include_subtasks=params.include_subtasks, **filters, **extra
+        )
+
+    try:
+        if params.limit is None:
+            return await fetch()
+        # Fetch one extra row to learn whether another page exists
+        tasks = await fetch(limit=params.limit + 1)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    next_page_token = None
+    if len(tasks) > params.limit:
+        tasks = tasks[:params.limit]
+        next_page_token = crud.encode_cursor(tasks[-1])
+    # Same shape as schemas.TaskPage / TaskSummaryPage, left unvalidated
+    return {"items": tasks, "next_page_token": next_page_token}
+
+
+# Serialises the row dicts (and any models inside them) straight to JSON
+# bytes in pydantic-core, without building response models first
+json_adapter = TypeAdapter(Any)
+
+def _dump_json(result) -> bytes:
+    if isinstance(result, BaseModel):
+        return result.model_dump_json().encode()
+    return json_adapter.dump_json(result)
+
+async def cached_json(request: Request, db: AsyncSession, scope: str, compute, vary: str = "", limiter=None):
+    """Serves `compute()` through response_cache with ETag/304; `vary` keys results that change without a write."""
+    key = f"{request.url.path}?{request.url.query}#{vary}"
+    if response_cache.version_source == "database":
+        # Shared by every worker process, see cache.py
+        version = await async_crud.get_revision(db, None if scope == ALL_PAGES else scope)
+        # Hand the connection back to the pool: a miss may queue for a
+        # limiter slot, and queued requests must not starve the writers
+        await db.close()
+    else:
+        version = response_cache.version(scope)
+    etag = response_cache.etag(scope, key, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(scope, key, version)
+    if body is None:
+        async def compute_body():
+            if limiter is None:
+                body = _dump_json(await compute())
+            else:
+                async with limiter.slot():
+                    body = _dump_json(await compute())
+            response_cache.set(scope, key, version, body)
+            return body
+
+        body = await single_flight.run((scope, key, version), compute_body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
 # @router.post("/api/v1/pages/Home/tasks/")
 # async def create_task(request: Request):
 #     body = await request.json()
 #     print("Received body:", body)
-@router.post("/pages/{page_name}/tasks", response_model=schemas.TaskResponse)
-async def create_task(page_name: str, request: Request, db: Session = Depends(get_db)):
+@router.post("/pages/{page_name}/tasks", response_model=schemas.TaskChange)
+async def create_task(page_name: str, request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
         # Get raw request body for debugging
         body = await request.json()
-        print(f"Raw request body: {body}")
+        logger.debug("Raw request body: %s", body)
         
         # Try to parse with Pydantic
         try:
             task = schemas.TaskCreate(**body)
-            print(f"Parsed task data: {task}")
+            logger.debug("Parsed task data: %s", task)
         except Exception as validation_error:
-            print(f"Validation error: {validation_error}")
+            logger.debug("Validation error: %s", validation_error)
             raise HTTPException(status_code=422, detail=f"Validation error: {str(validation_error)}")
         
-        db_task = crud.create_task(db, task, page_name)
+        db_task = await async_crud.create_task(db, task, page_name)
         return db_task
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        print(f"Error creating task: {str(e)}")
+        await db.rollback()
+        logger.exception("Error creating task")
         raise HTTPException(status_code=500, detail=f"Error creating task: {str(e)}")
 
-@router.get("/pages/{page_name}/tasks", response_model=List[schemas.TaskResponse])
-def get_tasks_by_page(page_name: str, db: Session = Depends(get_db)):
+# Rows per executemany/commit in the bulk import
+BULK_BATCH_SIZE = 500
+
+@router.post("/pages/{page_name}/tasks:bulk")
+async def bulk_create_tasks(page_name: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Imports one schemas.TaskCreate per NDJSON line; invalid lines are reported by line number."""
+    created = 0
+    errors = []
+    batch, batch_lines = [], []
+
+    async def flush_batch():
+        nonlocal created
+        try:
+            task_ids = await async_crud.bulk_create_tasks(db, batch, page_name)
+            created += len(task_ids)
+        except SQLAlchemyError as e:
+            errors.extend({"line": line, "error": f"Database error: {str(e)}"} for line in batch_lines)
+        except Exception as e:
+            # The earlier batches are committed; report this one and go on
+            await db.rollback()
+            logger.exception("Error importing tasks")
+            errors.extend({"line": line, "error": f"Error creating task: {str(e)}"} for line in batch_lines)
+        batch.clear()
+        batch_lines.clear()
+
+    async def handle_line(line_no: int, line: bytes):
+        if not line.strip():
+            return
+        try:
+            batch.append(schemas.TaskCreate.model_validate(json.loads(line)))
+            batch_lines.append(line_no)
+        except (ValueError, ValidationError) as e:
+            errors.append({"line": line_no, "error": str(e)})
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush_batch()
+
+    line_no = 0
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        # Keep the trailing partial line in the buffer for the next chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            await handle_line(line_no, line)
+    await handle_line(line_no + 1, buffer)
+    if batch:
+        await flush_batch()
+
+    return {"created": created, "failed": len(errors), "errors": errors}
+
+@router.get("/pages/{page_name}/tasks:export")
+def export_tasks(page_name: str, format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """Streams the page's tasks as NDJSON (one task per line) or CSV (one row per subtask)."""
+    def export_rows():
+        # The request-scoped session is closed before a streaming
+        # body is sent, so the generator owns its own session
+        db = SessionLocal()
+        try:
+            yield from crud.iter_task_export(db, page_name)
+        finally:
+            db.close()
+
+    if format == "ndjson":
+        body = (json.dumps(task) + "\n" for task in export_rows())
+        return StreamingResponse(body, media_type="application/x-ndjson")
+
+    def csv_lines():
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(list(crud.EXPORT_TASK_COLUMNS) + [f"subtask_{c}" for c in crud.EXPORT_SUBTASK_COLUMNS])
+        for task in export_rows():
+            task_values = [task[c] for c in crud.EXPORT_TASK_COLUMNS]
+            for subtask in task["subtasks"] or [None]:
+                subtask_values = [subtask[c] if subtask else None for c in crud.EXPORT_SUBTASK_COLUMNS]
+                writer.writerow(task_values + subtask_values)
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+
+    return StreamingResponse(
+        csv_lines(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{page_name}_tasks.csv"'},
+    )
+
+# Seconds between keep-alive comments on an idle change feed
+EVENT_KEEPALIVE_SECONDS = 15
+
+async def event_stream(request: Request, channel: str):
+    """Server-sent events of one change_broker channel; "resync" means the client should reload."""
+    subscription = change_broker.subscribe(channel)
     try:
-        tasks = crud.get_tasks_by_page(db, page_name)
-        return tasks
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), EVENT_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        change_broker.unsubscribe(subscription)
+
+def _event_response(request: Request, channel: str):
+    return StreamingResponse(
+        event_stream(request, channel),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/pages/{page_name}/events")
+async def page_events(page_name: str, request: Request):
+    return _event_response(request, page_name)
+
+@router.get("/tasks/events")
+async def all_events(request: Request):
+    return _event_response(request, ALL_PAGES)
+
+@router.get("/pages/{page_name}/tasks", response_model=Union[schemas.TaskPage, List[schemas.TaskResponse]])
+async def get_tasks_by_page(page_name: str, request: Request, params: TaskListParams = Depends(), db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await cached_json(request, db, page_name, lambda: list_tasks(db, params, page_name))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching tasks: {str(e)}")
 
-@router.get("/pages/Home/tasks", response_model=List[schemas.TaskResponse])
-def get_all_tasks(db: Session = Depends(get_db)):
+@router.get("/pages/{page_name}/tasks/summary", response_model=Union[schemas.TaskSummaryPage, List[schemas.TaskSummary]])
+async def get_task_summaries_by_page(page_name: str, request: Request, params: TaskListParams = Depends(), db: AsyncSession = Depends(get_async_db)):
+    """The page's tasks with subtask counts and progress instead of subtask lists."""
     try:
-        tasks = crud.get_tasks_by_page(db, "Home")
-        return tasks
+        return await cached_json(request, db, page_name, lambda: list_tasks(db, params, page_name, summary=True))
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching tasks: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error fetching task summaries: {str(e)}")
+
+@router.get("/tasks/summary", response_model=Union[schemas.TaskSummaryPage, List[schemas.TaskSummary]])
+async def get_all_task_summaries(request: Request, params: TaskListParams = Depends(), db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await cached_json(request, db, ALL_PAGES, lambda: list_tasks(db, params, summary=True), limiter=heavy_reads)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching task summaries: {str(e)}")
+
+@router.get("/pages/{page_name}/tasks/changes", response_model=schemas.TaskChangesSince)
+async def get_task_changes(page_name: str, since: int = Query(0, ge=0), db: AsyncSession = Depends(get_async_db)):
+    """Tasks changed and ids deleted after revision `since`; since=0 returns the whole page."""
+    try:
+        return await async_crud.get_task_changes(db, page_name, since)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching task changes: {str(e)}")
 
-@router.get("/tasks/all", response_model=List[schemas.TaskResponse])
-def get_all_tasks_from_all_pages(db: Session = Depends(get_db)):
+@router.get("/tasks/search", response_model=schemas.TaskSearchResults)
+async def search_tasks(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    page_name: Optional[str] = None,
+    status: Optional[TaskStatus] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Full-text search over task and subtask names and descriptions, best match first."""
+    async def compute():
+        hits, has_more = await async_crud.search_tasks(
+            db, q, page_name=page_name, status=status, limit=limit, offset=offset
+        )
+        return {"items": hits, "next_offset": offset + limit if has_more else None}
+
+    try:
+        return await cached_json(request, db, ALL_PAGES, compute, limiter=heavy_reads)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching tasks: {str(e)}")
+
+@router.get("/pages", response_model=List[schemas.PageResponse])
+async def get_pages(request: Request, db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await cached_json(request, db, ALL_PAGES, lambda: async_crud.get_pages(db), limiter=heavy_reads)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching pages: {str(e)}")
+
+@router.get("/tasks/all", response_model=Union[schemas.TaskPage, List[schemas.TaskResponse]])
+async def get_all_tasks_from_all_pages(request: Request, params: TaskListParams = Depends(), db: AsyncSession = Depends(get_async_db)):
     try:
-        tasks = crud.get_tasks(db)
-        return tasks
+        return await cached_json(request, db, ALL_PAGES, lambda: list_tasks(db, params), limiter=heavy_reads)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching all tasks: {str(e)}")
 
-@router.put("/pages/{page_name}/tasks/{task_id}/start", response_model=schemas.TaskResponse)
-def start_task(page_name: str, task_id: int, db: Session = Depends(get_db)):
+@router.put("/pages/{page_name}/tasks/{task_id}/start", response_model=schemas.TaskChange)
+async def start_task(page_name: str, task_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        db_task = crud.start_task(db, task_id)
+        db_task = await async_crud.start_task(db, task_id)
         if not db_task:
             raise HTTPException(status_code=404, detail="Task not found")
         return db_task
     except HTTPException:
         raise
+    except crud.InvalidTransition as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error starting task: {str(e)}")
 
-@router.put("/pages/{page_name}/tasks/{task_id}/complete", response_model=schemas.TaskResponse)
-def complete_task(page_name: str, task_id: int, db: Session = Depends(get_db)):
+@router.put("/pages/{page_name}/tasks/{task_id}/complete", response_model=schemas.TaskChange)
+async def complete_task(page_name: str, task_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        db_task = crud.complete_task(db, task_id)
+        db_task = await async_crud.complete_task(db, task_id)
         if not db_task:
             raise HTTPException(status_code=404, detail="Task not found")
         return db_task
     except HTTPException:
         raise
+    except crud.InvalidTransition as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error completing task: {str(e)}")
 
-@router.delete("/pages/{page_name}/tasks/{task_id}")
-def delete_task(page_name: str, task_id: int, db: Session = Depends(get_db)):
+@router.put("/tasks/status:batch", response_model=schemas.TaskTransitionResult)
+async def transition_tasks(update: TaskBatchStatusUpdate, db: AsyncSession = Depends(get_async_db)):
+    """Moves many tasks to "In progress" or "Completed" in one statement."""
+    if update.status == TaskStatus.pending:
+        raise HTTPException(status_code=400, detail="Tasks can only be moved to 'In progress' or 'Completed'")
     try:
-        db_task = crud.delete_task(db, task_id)
-        if not db_task:
+        return await async_crud.transition_tasks(db, update.task_ids, update.status)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating tasks: {str(e)}")
+
+@router.delete("/pages/{page_name}/tasks/{task_id}", response_model=schemas.DeleteChange)
+async def delete_task(page_name: str, task_id: int, db: AsyncSession = Depends(get_async_db)):
+    try:
+        change = await async_crud.delete_task(db, task_id)
+        if not change:
             raise HTTPException(status_code=404, detail="Task not found")
-        return {"message": "Task deleted successfully"}
+        return change
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting task: {str(e)}")
 
+@router.delete("/pages/{page_name}/tasks", response_model=schemas.PageBulkChange)
+async def delete_page_tasks(page_name: str, status: Optional[TaskStatus] = None, db: AsyncSession = Depends(get_async_db)):
+    """Soft-deletes the page's tasks, or only those in `status`, in one statement."""
+    try:
+        return await async_crud.delete_page_tasks(db, page_name, status)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting tasks: {str(e)}")
+
+@router.post("/pages/{page_name}/tasks:archive", response_model=schemas.PageBulkChange)
+async def archive_page_tasks(page_name: str, status: Optional[TaskStatus] = TaskStatus.completed, db: AsyncSession = Depends(get_async_db)):
+    """Hides the page's completed tasks (or those in `status`) from every list."""
+    try:
+        return await async_crud.archive_page_tasks(db, page_name, status)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error archiving tasks: {str(e)}")
+
+@router.post("/pages/{page_name}/tasks/{task_id}/restore", response_model=schemas.TaskChange)
+async def restore_task(page_name: str, task_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Puts an archived task back on its page, from either tier."""
+    try:
+        task = await async_crud.restore_task(db, task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Archived task not found")
+        return task
+    except HTTPException:
+        raise
+    except archive.RestoreConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error restoring task: {str(e)}")
+
 @router.get("/tasks/analytics")
-def get_task_analytics(db: Session = Depends(get_db)):
-    try:
-        # Fetch all tasks
-        tasks = db.query(Task).all()
-        analytics = {
-            "overall": {"total": 0, "pending": 0, "in_progress": 0, "completed": 0},
-            "by_subtasks": {"with_subtasks": 0, "without_subtasks": 0}
-        }
-        for task in tasks:
-            analytics["overall"]["total"] += 1
-            status = task.status.value if task.status else "Pending"
-            if status == "Pending":
-                analytics["overall"]["pending"] += 1
-            elif status == "In progress":
-                analytics["overall"]["in_progress"] += 1
-            elif status == "Completed":
-                analytics["overall"]["completed"] += 1
-            
-            # Count tasks with/without subtasks
-            if task.subtasks:
-                analytics["by_subtasks"]["with_subtasks"] += 1
-            else:
-                analytics["by_subtasks"]["without_subtasks"] += 1
-        
-        return analytics
+async def get_task_analytics(request: Request, db: AsyncSession = Depends(get_async_db)):
+    try:
+        # Counting happens in SQL so this stays flat as the tables grow
+        return await cached_json(request, db, ALL_PAGES, lambda: async_crud.get_task_analytics(db), limiter=heavy_reads)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching analytics: {str(e)}")
 
+@router.get("/tasks/analytics/daily")
+async def get_daily_analytics(
+    request: Request,
+    days: int = Query(30, ge=1, le=analytics.MAX_ANALYTICS_DAYS),
+    page_name: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        # Served from the task_daily_stats rollup, one row per page and day.
+        # The window moves at midnight UTC, so the day is part of the key.
+        scope = page_name if page_name is not None else ALL_PAGES
+        today = datetime.utcnow().date().isoformat()
+        return await cached_json(request, db, scope, lambda: async_crud.get_daily_series(db, days, page_name), vary=today, limiter=heavy_reads)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching daily analytics: {str(e)}")
+
+@router.get("/tasks/analytics/durations")
+async def get_duration_analytics(
+    request: Request,
+    days: int = Query(30, ge=1, le=analytics.MAX_ANALYTICS_DAYS),
+    page_name: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        scope = page_name if page_name is not None else ALL_PAGES
+        today = datetime.utcnow().date().isoformat()
+        return await cached_json(request, db, scope, lambda: async_crud.get_duration_stats(db, days, page_name), vary=today, limiter=heavy_reads)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching duration analytics: {str(e)}")
+
+
+# Dependency graph endpoints. Edges may cross pages; the reads are served
+# from the in-memory graph (database_setup/task_graph.py).
+@router.put("/tasks/{task_id}/dependencies/{depends_on_id}", response_model=schemas.DependencyChange)
+async def add_dependency(task_id: int, depends_on_id: int, db: AsyncSession = Depends(get_async_db)):
+    try:
+        change = await async_crud.add_dependency(db, task_id, depends_on_id)
+        if not change:
+            raise HTTPException(status_code=404, detail="Task not found")
+        return change
+    except HTTPException:
+        raise
+    except dependencies.DependencyCycle as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error adding dependency: {str(e)}")
+
+@router.delete("/tasks/{task_id}/dependencies/{depends_on_id}", response_model=schemas.DependencyChange)
+async def remove_dependency(task_id: int, depends_on_id: int, db: AsyncSession = Depends(get_async_db)):
+    try:
+        change = await async_crud.remove_dependency(db, task_id, depends_on_id)
+        if not change:
+            raise HTTPException(status_code=404, detail="Dependency not found")
+        return change
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error removing dependency: {str(e)}")
+
+@router.get("/tasks/{task_id}/dependencies", response_model=schemas.TaskDependencies)
+async def get_dependencies(task_id: int, db: AsyncSession = Depends(get_async_db)):
+    try:
+        dependencies = await async_crud.get_dependencies(db, task_id)
+        if not dependencies:
+            raise HTTPException(status_code=404, detail="Task not found")
+        return dependencies
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching dependencies: {str(e)}")
+
+async def _graph_tasks(request: Request, db: AsyncSession, kind: str, page_name: Optional[str], after: Optional[int], limit: int):
+    try:
+        return await cached_json(
+            request, db, ALL_PAGES,
+            lambda: async_crud.get_graph_tasks(db, kind, page_name, after, limit),
+            limiter=heavy_reads,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching {kind} tasks: {str(e)}")
+
+@router.get("/tasks/ready", response_model=schemas.GraphTaskPage)
+async def get_ready_tasks(
+    request: Request,
+    page_name: Optional[str] = None,
+    after: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Pending tasks whose prerequisites are all completed."""
+    return await _graph_tasks(request, db, "ready", page_name, after, limit)
+
+@router.get("/tasks/blocked", response_model=schemas.GraphTaskPage)
+async def get_blocked_tasks(
+    request: Request,
+    page_name: Optional[str] = None,
+    after: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Open tasks waiting for at least one prerequisite (see blocked_by)."""
+    return await _graph_tasks(request, db, "blocked", page_name, after, limit)
+
+@router.get("/tasks/critical-path", response_model=schemas.CriticalPath)
+async def get_critical_path(request: Request, db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await cached_json(request, db, ALL_PAGES, lambda: async_crud.get_critical_path(db), limiter=heavy_reads)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching critical path: {str(e)}")
+
 
 # Subtask endpoints
-@router.post("/tasks/{task_id}/subtasks", response_model=schemas.SubtaskResponse)
-def create_subtask(task_id: int, subtask: schemas.SubtaskCreate, db: Session = Depends(get_db)):
+@router.post("/tasks/{task_id}/subtasks", response_model=schemas.SubtaskChange)
+async def create_subtask(task_id: int, subtask: schemas.SubtaskCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         # Verify task exists
-        task = crud.get_task(db, task_id)
+        task = await async_crud.get_task(db, task_id)
         if not task:
             raise HTTPException(status_code=404, detail="Task not found")
         
-        db_subtask = crud.create_subtask(db, subtask, task_id)
+        db_subtask = await async_crud.create_subtask(db, subtask, task_id)
         return db_subtask
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating subtask: {str(e)}")
 
-@router.put("/subtasks/{subtask_id}/status", response_model=schemas.SubtaskResponse)
-def update_subtask_status(subtask_id: int, status_update: StatusUpdate, db: Session = Depends(get_db)):
+@router.put("/subtasks/{subtask_id}/status", response_model=schemas.SubtaskChange)
+async def update_subtask_status(subtask_id: int, status_update: StatusUpdate, db: AsyncSession = Depends(get_async_db)):
     try:
         # Validate status
         valid_statuses = ["Pending", "In progress", "Completed"]
         if status_update.status not in valid_statuses:
             raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
         
-        db_subtask = crud.update_subtask_status(db, subtask_id, status_update.status)
+        db_subtask = await async_crud.update_subtask_status(db, subtask_id, status_update.status)
         if not db_subtask:
             raise HTTPException(status_code=404, detail="Subtask not found")
         return db_subtask
     except HTTPException:
         raise
+    except crud.InvalidTransition as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating subtask status: {str(e)}")
 
-@router.delete("/subtasks/{subtask_id}")
-def delete_subtask(subtask_id: int, db: Session = Depends(get_db)):
+@router.put("/subtasks/status:batch", response_model=schemas.SubtaskTransitionResult)
+async def transition_subtasks(update: SubtaskBatchStatusUpdate, db: AsyncSession = Depends(get_async_db)):
     try:
-        db_subtask = crud.delete_subtask(db, subtask_id)
-        if not db_subtask:
+        return await async_crud.transition_subtasks(db, update.subtask_ids, update.status)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating subtasks: {str(e)}")
+
+@router.delete("/subtasks/{subtask_id}", response_model=schemas.DeleteChange)
+async def delete_subtask(subtask_id: int, db: AsyncSession = Depends(get_async_db)):
+    try:
+        change = await async_crud.delete_subtask(db, subtask_id)
+        if not change:
             raise HTTPException(status_code=404, detail="Subtask not found")
-        return {"message": "Subtask deleted successfully"}
+        return change
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error deleting subtask: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error deleting subtask: {str(e)}")
+
+@router.post("/batch", response_model=schemas.BatchResult)
+async def run_batch(batch: schemas.BatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """Runs up to 500 mutations in one transaction, see batches.run_batch."""
+    try:
+        result = await async_crud.run_batch(db, batch)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running batch: {str(e)}")
+    if batch.mode == "all_or_nothing" and not result.committed:
+        failed = next(item for item in result.results if item.status == "failed")
+        return JSONResponse(status_code=failed.status_code, content=result.model_dump(mode="json"))
+    return result
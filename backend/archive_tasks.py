@@ -0,0 +1,26 @@
+"""
+Moves tasks completed more than --days ago (default ARCHIVE_AFTER_DAYS) to
+the archive tables, the same archival the app runs every
+ARCHIVE_INTERVAL_SECONDS. For running it from cron with the in-app job off
+(ARCHIVE_INTERVAL_SECONDS=0), or once to archive an existing backlog.
+"""
+from datetime import timedelta
+import argparse
+
+from database_setup.database import SessionLocal
+from database_setup import archive
+from app.background import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+
+def archive_tasks(days: float = ARCHIVE_AFTER_DAYS):
+    db = SessionLocal()
+    try:
+        count = archive.archive_completed_tasks(db, timedelta(days=days), ARCHIVE_BATCH_SIZE)
+    finally:
+        db.close()
+    print(f"✓ Archived {count} completed task(s)")
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=float, default=ARCHIVE_AFTER_DAYS)
+    archive_tasks(parser.parse_args().days)
@@ -0,0 +1,419 @@
+"""
+Load and latency benchmark for the whole task API.
+
+Seeds a temporary SQLite file with --pages x --tasks x --subtasks, points the
+app at it (DATABASE_URL is set before the app is imported, so every engine
+and session factory in database.py uses it) and drives the real app
+in-process through httpx at each --concurrency level. Every endpoint gets a
+scenario. SSE feeds are the exception: they never finish a response, so they
+have no latency to measure. Per scenario and concurrency it reports
+successful requests, errors, throughput, p50/p95/p99 latency, SQL statements
+per request and the process's peak RSS so far.
+
+Scenarios that change state prepare their own targets (e.g. fresh pending
+tasks for /start) through database_setup before the timer starts, so every
+request exercises the success path.
+
+--save writes the JSON report. --baseline compares against a saved one and
+exits 1 when a p95 or the queries per request grow, or a throughput drops, by
+more than --tolerance. benchmarks/baseline.json was saved with the defaults.
+Timings only compare on the same machine, so re-save it before comparing
+elsewhere.
+
+Usage (from backend/):
+    python -m benchmarks.api --pages 4 --tasks 250 --subtasks 3 --concurrency 1,8,32
+    python -m benchmarks.api --save benchmarks/baseline.json
+    python -m benchmarks.api --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+API = "/api/v1"
+
+
+def percentile(sorted_values, pct: float):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(int(round(pct / 100 * len(sorted_values))) - 1, 0))
+    return round(sorted_values[index] * 1000, 2)
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Dataset:
+    """Creates the seed data and per-scenario targets straight through database_setup."""
+
+    def __init__(self, SessionLocal, pages: int, tasks: int, subtasks: int):
+        # Imported here, once main has pointed DATABASE_URL at the benchmark database
+        from database_setup import archive, crud, dependencies, models, schemas
+
+        self.SessionLocal = SessionLocal
+        self.archive, self.crud, self.dependencies = archive, crud, dependencies
+        self.schemas, self.models = schemas, models
+        self.pages = [f"page-{n}" for n in range(pages)]
+        self.subtasks = subtasks
+        self._fresh = itertools.count()
+        self._chain = None
+        for page in self.pages:
+            self.create_tasks(page, tasks)
+
+    def create_tasks(self, page: str, count: int, subtasks: int = None):
+        subtasks = self.subtasks if subtasks is None else subtasks
+        batch = [
+            self.schemas.TaskCreate(
+                name=f"{page} task {n}",
+                description="synthetic benchmark task",
+                subtasks=[{"title": f"step {i}"} for i in range(subtasks)],
+            )
+            for n in range(count)
+        ]
+        db = self.SessionLocal()
+        try:
+            task_ids = []
+            for start in range(0, count, 500):
+                task_ids += self.crud.bulk_create_tasks(db, batch[start:start + 500], page)
+            return task_ids
+        finally:
+            db.close()
+
+    def fresh_pages(self, count: int, tasks: int = 10):
+        """`count` new pages of `tasks` pending tasks each, for page-wide writes."""
+        pages = [f"fresh-{next(self._fresh)}" for _ in range(count)]
+        for page in pages:
+            self.create_tasks(page, tasks, subtasks=1)
+        return pages
+
+    def archived_tasks(self, count: int, tier: str):
+        """(page, task id) of `count` tasks on a new page, archived in place
+        ("hot") or moved to the archive tables ("cold")."""
+        page = self.fresh_pages(1, tasks=0)[0]
+        task_ids = self.create_tasks(page, count, subtasks=1)
+        db = self.SessionLocal()
+        try:
+            if tier == "hot":
+                self.crud.archive_page_tasks(db, page, self.models.TaskStatus.pending)
+            else:
+                Task = self.models.Task
+                self.crud.transition_tasks(db, task_ids, self.models.TaskStatus.in_progress)
+                self.crud.transition_tasks(db, task_ids, self.models.TaskStatus.completed)
+                # Old enough for the archival job
+                db.query(Task).filter(Task.id.in_(task_ids)).update(
+                    {Task.completed_at: datetime.utcnow() - self.archive.MIN_ARCHIVE_AGE - timedelta(days=1)},
+                    synchronize_session=False,
+                )
+                db.commit()
+                self.archive.archive_completed_tasks(db, self.archive.MIN_ARCHIVE_AGE)
+        finally:
+            db.close()
+        return [(page, task_id) for task_id in task_ids]
+
+    def dependency_chain(self, length: int = 200):
+        """Ids of a chain of tasks, each depending on the one before, created
+        on the first call."""
+        if self._chain is None:
+            self._chain = self.create_tasks("graph", length, subtasks=0)
+            db = self.SessionLocal()
+            try:
+                for task_id, depends_on_id in zip(self._chain[1:], self._chain):
+                    self.dependencies.add_dependency(db, task_id, depends_on_id)
+            finally:
+                db.close()
+        return self._chain
+
+    def task_pairs(self, count: int, linked: bool):
+        """`count` (task id, task id) pairs of new tasks, the first depending
+        on the second if `linked`."""
+        task_ids = self.create_tasks("graph-edges", count * 2, subtasks=0)
+        pairs = list(zip(task_ids[::2], task_ids[1::2]))
+        if linked:
+            db = self.SessionLocal()
+            try:
+                for task_id, depends_on_id in pairs:
+                    self.dependencies.add_dependency(db, task_id, depends_on_id)
+            finally:
+                db.close()
+        return pairs
+
+    def started_tasks(self, page: str, count: int):
+        task_ids = self.create_tasks(page, count, subtasks=0)
+        db = self.SessionLocal()
+        try:
+            self.crud.transition_tasks(db, task_ids, self.models.TaskStatus.in_progress)
+        finally:
+            db.close()
+        return task_ids
+
+    def subtask_ids(self, page: str, count: int):
+        task_ids = self.create_tasks(page, count, subtasks=1)
+        db = self.SessionLocal()
+        try:
+            return [
+                subtask_id for (subtask_id,) in
+                db.query(self.models.Subtask.id).filter(self.models.Subtask.task_id.in_(task_ids)).order_by(self.models.Subtask.id)
+            ]
+        finally:
+            db.close()
+
+
+def scenarios(data: Dataset):
+    """
+    name -> (prepare(count) -> targets or None, request(n, target) -> (method, path, kwargs)).
+    `n` numbers the requests of a run, `target` is the n-th prepared target.
+    """
+    pages = data.pages
+    page = lambda n: pages[n % len(pages)]
+    # Creates a task and walks it and a new subtask through to completed
+    batch = lambda n: {"operations": [
+        {"op": "create_task", "page_name": page(n), "task": {"name": f"batched {n}"}},
+        {"op": "create_subtask", "task_id": "$0", "subtask": {"title": "s"}},
+        {"op": "start_task", "task_id": "$0"},
+        {"op": "update_subtask_status", "subtask_id": "$1", "status": "Completed"},
+        {"op": "complete_task", "task_id": "$0"},
+    ]}
+    ndjson = "".join(json.dumps({"name": f"bulk {i}", "subtasks": [{"title": "s"}]}) + "\n" for i in range(50))
+
+    return {
+        # Reads
+        "list_page": (None, lambda n, t: ("GET", f"{API}/pages/{page(n)}/tasks", {})),
+        "list_page_limit": (None, lambda n, t: ("GET", f"{API}/pages/{page(n)}/tasks?limit=50", {})),
+        "list_page_projected": (None, lambda n, t: (
+            "GET", f"{API}/pages/{page(n)}/tasks?fields=id,name,status&include_subtasks=false", {})),
+        "list_page_summary": (None, lambda n, t: ("GET", f"{API}/pages/{page(n)}/tasks/summary", {})),
+        "page_changes": (None, lambda n, t: ("GET", f"{API}/pages/{page(n)}/tasks/changes?since=1", {})),
+        "list_pages": (None, lambda n, t: ("GET", f"{API}/pages", {})),
+        "list_all": (None, lambda n, t: ("GET", f"{API}/tasks/all", {})),
+        "list_all_limit": (None, lambda n, t: ("GET", f"{API}/tasks/all?limit=100", {})),
+        "all_summary": (None, lambda n, t: ("GET", f"{API}/tasks/summary?limit=100", {})),
+        "analytics": (None, lambda n, t: ("GET", f"{API}/tasks/analytics", {})),
+        "analytics_daily": (None, lambda n, t: ("GET", f"{API}/tasks/analytics/daily?days=30", {})),
+        "analytics_daily_page": (None, lambda n, t: ("GET", f"{API}/tasks/analytics/daily?days=30&page_name={page(n)}", {})),
+        "analytics_durations": (None, lambda n, t: ("GET", f"{API}/tasks/analytics/durations?days=30", {})),
+        "search": (None, lambda n, t: ("GET", f"{API}/tasks/search?q=task {n % 100}", {})),
+        "dependencies": (
+            lambda count: list(itertools.islice(itertools.cycle(data.dependency_chain()), count)),
+            lambda n, t: ("GET", f"{API}/tasks/{t}/dependencies", {})),
+        "ready_tasks": (
+            lambda count: [data.dependency_chain()] * count,
+            lambda n, t: ("GET", f"{API}/tasks/ready", {})),
+        "blocked_tasks": (
+            lambda count: [data.dependency_chain()] * count,
+            lambda n, t: ("GET", f"{API}/tasks/blocked", {})),
+        "critical_path": (
+            lambda count: [data.dependency_chain()] * count,
+            lambda n, t: ("GET", f"{API}/tasks/critical-path", {})),
+        "export_ndjson": (None, lambda n, t: ("GET", f"{API}/pages/{page(n)}/tasks:export", {})),
+        "export_csv": (None, lambda n, t: ("GET", f"{API}/pages/{page(n)}/tasks:export?format=csv", {})),
+        "metrics": (None, lambda n, t: ("GET", "/metrics", {})),
+        # Writes
+        "create_task": (None, lambda n, t: (
+            "POST", f"{API}/pages/{page(n)}/tasks",
+            {"json": {"name": f"new {n}", "subtasks": [{"title": "s"}] * data.subtasks}})),
+        "bulk_import_50": (None, lambda n, t: ("POST", f"{API}/pages/{page(n)}/tasks:bulk", {"content": ndjson})),
+        "start_task": (
+            lambda count: data.create_tasks(pages[0], count, subtasks=0),
+            lambda n, t: ("PUT", f"{API}/pages/{pages[0]}/tasks/{t}/start", {})),
+        "complete_task": (
+            lambda count: data.started_tasks(pages[0], count),
+            lambda n, t: ("PUT", f"{API}/pages/{pages[0]}/tasks/{t}/complete", {})),
+        "batch_status_10": (
+            lambda count: [ids for ids in zip(*[iter(data.create_tasks(pages[0], count * 10, subtasks=0))] * 10)],
+            lambda n, t: ("PUT", f"{API}/tasks/status:batch", {"json": {"task_ids": list(t), "status": "In progress"}})),
+        "delete_task": (
+            lambda count: data.create_tasks(pages[0], count),
+            lambda n, t: ("DELETE", f"{API}/pages/{pages[0]}/tasks/{t}", {})),
+        "delete_page_tasks": (
+            lambda count: data.fresh_pages(count),
+            lambda n, t: ("DELETE", f"{API}/pages/{t}/tasks", {})),
+        "archive_page_tasks": (
+            lambda count: data.fresh_pages(count),
+            lambda n, t: ("POST", f"{API}/pages/{t}/tasks:archive?status=Pending", {})),
+        "restore_task": (
+            lambda count: data.archived_tasks(count, "hot"),
+            lambda n, t: ("POST", f"{API}/pages/{t[0]}/tasks/{t[1]}/restore", {})),
+        "restore_archived_task": (
+            lambda count: data.archived_tasks(count, "cold"),
+            lambda n, t: ("POST", f"{API}/pages/{t[0]}/tasks/{t[1]}/restore", {})),
+        "create_subtask": (
+            lambda count: data.create_tasks(pages[0], count, subtasks=0),
+            lambda n, t: ("POST", f"{API}/tasks/{t}/subtasks", {"json": {"title": f"sub {n}"}})),
+        "subtask_status": (
+            lambda count: data.subtask_ids(pages[0], count),
+            lambda n, t: ("PUT", f"{API}/subtasks/{t}/status", {"json": {"status": "Completed"}})),
+        "subtask_batch_status_10": (
+            lambda count: [ids for ids in zip(*[iter(data.subtask_ids(pages[0], count * 10))] * 10)],
+            lambda n, t: ("PUT", f"{API}/subtasks/status:batch", {"json": {"subtask_ids": list(t), "status": "In progress"}})),
+        "delete_subtask": (
+            lambda count: data.subtask_ids(pages[0], count),
+            lambda n, t: ("DELETE", f"{API}/subtasks/{t}", {})),
+        "add_dependency": (
+            lambda count: data.task_pairs(count, linked=False),
+            lambda n, t: ("PUT", f"{API}/tasks/{t[0]}/dependencies/{t[1]}", {})),
+        "remove_dependency": (
+            lambda count: data.task_pairs(count, linked=True),
+            lambda n, t: ("DELETE", f"{API}/tasks/{t[0]}/dependencies/{t[1]}", {})),
+        "batch_5": (None, lambda n, t: ("POST", f"{API}/batch", {"json": batch(n)})),
+    }
+
+
+async def run(app, prepare, request, concurrency: int, total: int, statements):
+    targets = prepare(total) if prepare else itertools.repeat(None)
+    # Shared by all clients, so each target is used exactly once
+    work = itertools.islice(enumerate(targets), total)
+    latencies = []
+    errors = 0
+    transport = httpx.ASGITransport(app=app)
+
+    async def client_loop():
+        nonlocal errors
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for n, target in work:
+                method, path, kwargs = request(n, target)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **kwargs)
+                    response.raise_for_status()
+                except Exception:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+    statements[0] = 0
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    issued = statements[0]
+    latencies.sort()
+    done = len(latencies) + errors
+    return {
+        "requests": done,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+        "queries_per_request": round(issued / done, 2) if done else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float):
+    """Per scenario/concurrency deltas against `baseline`, plus the regressions:
+    p95 or queries per request up, or throughput down, by more than `tolerance`."""
+    deltas, regressions = {}, []
+    for name, levels in report["results"].items():
+        for level, current in levels.items():
+            before = baseline.get("results", {}).get(name, {}).get(level)
+            if not before:
+                continue
+            for metric, sign in (("p95_ms", 1), ("queries_per_request", 1), ("throughput_rps", -1)):
+                old, new = before.get(metric), current.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                deltas.setdefault(name, {}).setdefault(level, {})[metric] = {
+                    "baseline": old, "current": new, "change_pct": round(change * 100, 1),
+                }
+                if sign * change > tolerance:
+                    regressions.append(f"{name} @ {level} clients: {metric} {old} -> {new}")
+    return deltas, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--tasks", type=int, default=250, help="tasks per page")
+    parser.add_argument("--subtasks", type=int, default=3, help="subtasks per task")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated client counts")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--profile", default=None, help="SQLite profile from database.SQLITE_PROFILES")
+    parser.add_argument("--cache", action="store_true",
+                        help="keep the response cache on (off by default so reads hit crud.py)")
+    parser.add_argument("--save", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95/throughput regression")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must happen before anything imports database_setup.database
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        if args.profile:
+            os.environ["DATABASE_PROFILE"] = args.profile
+        from sqlalchemy import event
+        from app.main import app
+        from database_setup import database
+        from database_setup.cache import response_cache
+        from database_setup.models import Base
+
+        # The app only checks the schema revision; a throwaway database is
+        # simpler to create from the models
+        Base.metadata.create_all(database.engine)
+
+        if not args.cache:
+            response_cache.max_entries = 0
+        statements = [0]
+
+        def count_statement(*_):
+            statements[0] += 1
+        # The export endpoint reads through the sync engine, everything else async
+        for engine in (database.engine, database.async_engine.sync_engine):
+            event.listen(engine, "before_cursor_execute", count_statement)
+
+        data = Dataset(database.SessionLocal, args.pages, args.tasks, args.subtasks)
+        selected = scenarios(data)
+        if args.only:
+            selected = {name: selected[name] for name in args.only.split(",")}
+
+        async def run_all():
+            # One event loop for every run: pooled aiosqlite connections are
+            # bound to the loop that opened them
+            results = {}
+            for name, (prepare, request) in selected.items():
+                for level in levels:
+                    result = await run(app, prepare, request, level, args.requests, statements)
+                    results.setdefault(name, {})[str(level)] = result
+                    print(f"{name:<24} c={level:<4} {result}", file=sys.stderr)
+            await database.async_engine.dispose()
+            return results
+
+        results = asyncio.run(run_all())
+        database.engine.dispose()
+
+    report = {
+        "dataset": {"pages": args.pages, "tasks_per_page": args.tasks, "subtasks_per_task": args.subtasks},
+        "requests_per_run": args.requests,
+        "cache": args.cache,
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["baseline"], regressions = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({k: v for k, v in report.items() if k not in ("baseline", "regressions")}, f, indent=2)
+    print(json.dumps(report, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Concurrency benchmark for the async database path.
+
+Drives the API in-process with N parallel clients, each creating a task and
+then listing its page, against two apps sharing the same kind of temporary
+SQLite file:
+    blocking: the previous implementation, an `async def` endpoint calling the
+              synchronous crud functions on a plain Session (stalls the loop)
+    async:    the real router, running crud through AsyncSession.run_sync
+
+Usage (from backend/):
+    python -m benchmarks.concurrency --clients 32 --requests 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from database_setup import crud, database, schemas
+from database_setup.models import Base
+
+
+def blocking_app(url: str) -> FastAPI:
+    # A short pool timeout: under load this design can starve the pool (the
+    # blocked loop can't finish the requests holding connections), which is
+    # reported as errors rather than a 30s hang per request
+    engine = create_engine(url, connect_args={"check_same_thread": False}, pool_timeout=2)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.post("/api/v1/pages/{page_name}/tasks")
+    async def create_task(page_name: str, task: schemas.TaskCreate, db: Session = Depends(get_db)):
+        return schemas.TaskResponse.model_validate(crud.create_task(db, task, page_name))
+
+    @app.get("/api/v1/pages/{page_name}/tasks")
+    def get_tasks_by_page(page_name: str, db: Session = Depends(get_db)):
+        return [schemas.TaskResponse.model_validate(t) for t in crud.get_tasks_by_page(db, page_name)]
+
+    return app
+
+
+def async_app(url: str) -> FastAPI:
+    from app.main import app
+
+    async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False)
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[database.get_async_db] = get_async_db
+    return app
+
+
+async def drive(app: FastAPI, clients: int, requests: int):
+    latencies = []
+    errors = 0
+    transport = httpx.ASGITransport(app=app)
+
+    async def client_loop(n: int):
+        nonlocal errors
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            page = f"bench-{n % 4}"
+            for i in range(requests):
+                for method, path, body in (
+                    ("POST", f"/api/v1/pages/{page}/tasks", {"name": f"task {n}.{i}", "subtasks": [{"title": "s"}]}),
+                    ("GET", f"/api/v1/pages/{page}/tasks", None),
+                ):
+                    started = time.perf_counter()
+                    try:
+                        response = await client.request(method, path, json=body)
+                        response.raise_for_status()
+                    except Exception:
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(n) for n in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),  # successful requests only
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "p95_ms": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000, 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20, help="create+list rounds per client")
+    args = parser.parse_args()
+
+    results = {}
+    for name, build in (("blocking", blocking_app), ("async", async_app)):
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            Base.metadata.create_all(create_engine(url))
+            results[name] = asyncio.run(drive(build(url), args.clients, args.requests))
+    print(json.dumps({"clients": args.clients, "requests_per_client": args.requests * 2, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Serialisation benchmark for the task list path.
+
+Seeds a temporary SQLite file with N tasks (with subtasks) on one page and
+times building and serialising the full listing three ways:
+    orm:       ORM objects with selectinload, validated into
+               schemas.TaskResponse and dumped through a TypeAdapter
+    rows:      crud.get_task_rows dicts dumped through a TypeAdapter(Any),
+               what the list endpoints serve now
+    projected: the same with ?fields=id,name,status&include_subtasks=false
+
+"load" covers the queries and building the objects, "dump" the JSON bytes.
+Each figure is the median over --repeats runs.
+
+Usage (from backend/):
+    python -m benchmarks.serialization --tasks 10000 --subtasks 3
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database_setup import crud, schemas
+from database_setup.models import Base
+
+PAGE = "bench"
+
+task_list_adapter = TypeAdapter(List[schemas.TaskResponse])
+json_adapter = TypeAdapter(Any)
+
+
+def seed(SessionLocal, tasks: int, subtasks: int):
+    db = SessionLocal()
+    try:
+        batch = [
+            schemas.TaskCreate(
+                name=f"task {n}",
+                description="benchmark task " * 4,
+                subtasks=[{"title": f"subtask {n}.{i}", "description": "step"} for i in range(subtasks)],
+            )
+            for n in range(tasks)
+        ]
+        for start in range(0, tasks, 500):
+            crud.bulk_create_tasks(db, batch[start:start + 500], PAGE)
+    finally:
+        db.close()
+
+
+def load_orm(db):
+    return [schemas.TaskResponse.model_validate(task) for task in crud.get_tasks_by_page(db, PAGE)]
+
+def load_rows(db):
+    return crud.get_task_rows(db, PAGE)
+
+def load_projected(db):
+    return crud.get_task_rows(db, PAGE, fields=["id", "name", "status"], include_subtasks=False)
+
+VARIANTS = {
+    "orm": (load_orm, task_list_adapter.dump_json),
+    "rows": (load_rows, json_adapter.dump_json),
+    "projected": (load_projected, json_adapter.dump_json),
+}
+
+
+def measure(SessionLocal, load, dump, repeats: int):
+    load_times, dump_times = [], []
+    for _ in range(repeats):
+        # A fresh session each run so the ORM variant can't reuse its identity map
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            result = load(db)
+            loaded = time.perf_counter()
+            body = dump(result)
+            load_times.append(loaded - started)
+            dump_times.append(time.perf_counter() - loaded)
+        finally:
+            db.close()
+    load_ms = statistics.median(load_times) * 1000
+    dump_ms = statistics.median(dump_times) * 1000
+    return {
+        "load_ms": round(load_ms, 1),
+        "dump_ms": round(dump_ms, 1),
+        "total_ms": round(load_ms + dump_ms, 1),
+        "bytes": len(body),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--subtasks", type=int, default=3, help="subtasks per task")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        SessionLocal = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        seed(SessionLocal, args.tasks, args.subtasks)
+        results = {
+            name: measure(SessionLocal, load, dump, args.repeats)
+            for name, (load, dump) in VARIANTS.items()
+        }
+        engine.dispose()
+    print(json.dumps({"tasks": args.tasks, "subtasks_per_task": args.subtasks, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Write-contention benchmark for the SQLite engine profiles in database.py.
+
+Runs writer threads (crud.create_task, one commit each) alongside reader
+threads (crud.get_tasks_by_page) against a fresh SQLite file for a fixed
+duration, once per profile, and reports committed writes, reads and
+"database is locked" style errors.
+
+Usage (from backend/):
+    python -m benchmarks.write_contention --writers 8 --readers 4 --seconds 5
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database_setup import crud, schemas
+from database_setup.database import SQLITE_PROFILES, make_engine
+from database_setup.models import Base
+
+
+def run_profile(profile: str, writers: int, readers: int, seconds: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = make_engine(url, profile)
+        Base.metadata.create_all(engine)
+        SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+        counts = {"writes": 0, "reads": 0, "errors": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def worker(kind: str, n: int):
+            db = SessionLocal()
+            task = schemas.TaskCreate(name=f"bench {n}", subtasks=[{"title": "s"}, {"title": "t"}])
+            try:
+                while time.perf_counter() < deadline:
+                    try:
+                        if kind == "writes":
+                            crud.create_task(db, task, f"page-{n % 4}")
+                        else:
+                            crud.get_tasks_by_page(db, f"page-{n % 4}", limit=50)
+                            db.rollback()  # end the read transaction
+                        key = kind
+                    except OperationalError:
+                        db.rollback()
+                        key = "errors"
+                    with lock:
+                        counts[key] += 1
+            finally:
+                db.close()
+
+        threads = [threading.Thread(target=worker, args=("writes", n)) for n in range(writers)]
+        threads += [threading.Thread(target=worker, args=("reads", n)) for n in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    return {
+        **counts,
+        "writes_per_s": round(counts["writes"] / seconds, 1),
+        "reads_per_s": round(counts["reads"] / seconds, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    results = {
+        profile: run_profile(profile, args.writers, args.readers, args.seconds)
+        for profile in SQLITE_PROFILES
+    }
+    print(json.dumps({"writers": args.writers, "readers": args.readers, "seconds": args.seconds, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
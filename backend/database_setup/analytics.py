@@ -0,0 +1,289 @@
+"""
+Analytics: the counts behind /tasks/analytics, read live from the task
+tables and task_archive_stats, and the daily series and duration
+percentiles, read from the task_daily_stats rollups that the mutations in
+crud.py keep up to date.
+"""
+from sqlalchemy import case, delete, exists, func, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from collections import Counter
+from datetime import date, datetime, timedelta
+from itertools import chain
+from typing import Optional
+from . import models
+from .crud import (
+    DAILY_COLUMNS, DURATION_BUCKETS, KEPT_TASK, SUBTASK_OF_KEPT_TASK, _STATUS_KEYS,
+    _duration_bucket, _empty_status_counts,
+)
+
+
+# Windows reported by get_task_analytics, label -> lookback
+ANALYTICS_WINDOWS = {
+    "last_24h": timedelta(days=1),
+    "last_7d": timedelta(days=7),
+    "last_30d": timedelta(days=30),
+}
+
+def get_task_analytics(db: Session):
+    """Task and subtask counts in a fixed number of queries, archived tasks included."""
+    try:
+        now = datetime.utcnow()
+        has_subtasks = exists().where(models.Subtask.task_id == models.Task.id)
+
+        # Tasks grouped by page and status, with the number that have subtasks
+        task_rows = (
+            db.query(
+                models.Task.page_name,
+                models.Task.status,
+                func.count(models.Task.id),
+                func.sum(case((has_subtasks, 1), else_=0)),
+            )
+            .filter(KEPT_TASK)
+            .group_by(models.Task.page_name, models.Task.status)
+            .all()
+        )
+
+        overall = _empty_status_counts()
+        by_page = {}
+        with_subtasks = 0
+        for page_name, status, count, with_subs in task_rows:
+            key = _STATUS_KEYS[status.value if status else "Pending"]
+            page = by_page.setdefault(page_name, _empty_status_counts())
+            for bucket in (overall, page):
+                bucket["total"] += count
+                bucket[key] += count
+            with_subtasks += with_subs or 0
+
+        archived_subtasks = Counter()
+        for row in db.query(models.TaskArchiveStats).filter(models.TaskArchiveStats.tasks > 0):
+            page = by_page.setdefault(row.page_name, _empty_status_counts())
+            for bucket in (overall, page):
+                bucket["total"] += row.tasks
+                bucket["completed"] += row.tasks
+            with_subtasks += row.with_subtasks
+            archived_subtasks.update(
+                pending=row.subtasks_pending, in_progress=row.subtasks_in_progress, completed=row.subtasks_completed
+            )
+
+        subtask_rows = (
+            db.query(models.Subtask.status, func.count(models.Subtask.id))
+            .filter(SUBTASK_OF_KEPT_TASK)
+            .group_by(models.Subtask.status)
+            .all()
+        )
+        subtasks = _empty_status_counts()
+        for status, count in subtask_rows:
+            subtasks["total"] += count
+            subtasks[_STATUS_KEYS[status.value if status else "Pending"]] += count
+        for key, count in archived_subtasks.items():
+            subtasks["total"] += count
+            subtasks[key] += count
+
+        # Created/started/completed counts per window in a single pass
+        columns = []
+        for delta in ANALYTICS_WINDOWS.values():
+            cutoff = now - delta
+            for column in (models.Task.created_at, models.Task.started_at, models.Task.completed_at):
+                columns.append(func.sum(case((column >= cutoff, 1), else_=0)))
+        window_row = db.query(*columns).filter(KEPT_TASK).one()
+
+        windows = {}
+        values = iter(window_row)
+        for label in ANALYTICS_WINDOWS:
+            windows[label] = {
+                "created": next(values) or 0,
+                "started": next(values) or 0,
+                "completed": next(values) or 0,
+            }
+
+        return {
+            "overall": overall,
+            "by_subtasks": {
+                "with_subtasks": with_subtasks,
+                "without_subtasks": overall["total"] - with_subtasks,
+            },
+            "subtasks": subtasks,
+            "by_page": by_page,
+            "windows": windows,
+        }
+    except SQLAlchemyError as e:
+        raise e
+
+# Longest window the /tasks/analytics/daily and /durations endpoints serve
+MAX_ANALYTICS_DAYS = 366
+DURATION_PERCENTILES = (50, 85, 95)
+
+def _window_start(days: int, today: Optional[date] = None) -> date:
+    if not 1 <= days <= MAX_ANALYTICS_DAYS:
+        raise ValueError(f"days must be between 1 and {MAX_ANALYTICS_DAYS}")
+    return (today or datetime.utcnow().date()) - timedelta(days=days - 1)
+
+def _as_date(value) -> date:
+    # func.date() comes back as text on SQLite
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def get_daily_series(db: Session, days: int = 30, page_name: Optional[str] = None):
+    """Per-day counts and open tasks for the last `days` days, from task_daily_stats."""
+    try:
+        start = _window_start(days)
+        stats = models.TaskDailyStats
+        page_filter = [stats.page_name == page_name] if page_name is not None else []
+
+        # Open tasks before the window
+        open_before = db.scalar(
+            select(func.coalesce(func.sum(stats.created - stats.completed - stats.removed), 0))
+            .where(stats.day < start, *page_filter)
+        )
+        rows = db.execute(
+            select(
+                stats.day,
+                func.sum(stats.created),
+                func.sum(stats.started),
+                func.sum(stats.completed),
+                func.sum(stats.removed),
+            )
+            .where(stats.day >= start, *page_filter)
+            .group_by(stats.day)
+        ).all()
+        by_day = {_as_date(day): counts for day, *counts in rows}
+
+        series = []
+        open_tasks = open_before
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            created, started, completed, removed = by_day.get(day, (0, 0, 0, 0))
+            open_tasks += created - completed - removed
+            series.append({
+                "day": day.isoformat(),
+                "created": created,
+                "started": started,
+                "completed": completed,
+                "removed": removed,
+                "open": open_tasks,
+            })
+        return {"page_name": page_name, "days": days, "series": series}
+    except SQLAlchemyError as e:
+        raise e
+
+def _histogram_percentile(counts, total: int, percentile: int):
+    """Upper bound (hours) of the percentile's bucket; None in the open-ended bucket."""
+    target = total * percentile / 100
+    seen = 0
+    for bucket, bound in enumerate(DURATION_BUCKETS):
+        seen += counts.get(bucket, 0)
+        if seen >= target:
+            return bound
+    return None
+
+def get_duration_stats(db: Session, days: int = 30, page_name: Optional[str] = None):
+    """Lead and cycle time count, mean and percentiles per page over the last `days` days."""
+    try:
+        start = _window_start(days)
+        stats, histogram = models.TaskDailyStats, models.TaskDurationBucket
+
+        totals = select(
+            stats.page_name,
+            func.sum(stats.completed),
+            func.sum(stats.lead_seconds),
+            func.sum(stats.cycle_seconds),
+        ).where(stats.day >= start).group_by(stats.page_name)
+        buckets = select(
+            histogram.page_name,
+            histogram.kind,
+            histogram.bucket,
+            func.sum(histogram.count),
+        ).where(histogram.day >= start).group_by(histogram.page_name, histogram.kind, histogram.bucket)
+        if page_name is not None:
+            totals = totals.where(stats.page_name == page_name)
+            buckets = buckets.where(histogram.page_name == page_name)
+
+        counts = {}
+        for page, kind, bucket, count in db.execute(buckets):
+            counts.setdefault((page, kind), {})[bucket] = count
+
+        pages = {}
+        for page, completed, lead_seconds, cycle_seconds in db.execute(totals):
+            if not completed:
+                continue
+            pages[page] = {}
+            for kind, seconds in (("lead", lead_seconds), ("cycle", cycle_seconds)):
+                pages[page][f"{kind}_time"] = {
+                    "count": completed,
+                    "mean_hours": round(seconds / completed / 3600, 2),
+                    **{
+                        f"p{percentile}_hours": _histogram_percentile(counts.get((page, kind), {}), completed, percentile)
+                        for percentile in DURATION_PERCENTILES
+                    },
+                }
+        return {"days": days, "bucket_bounds_hours": list(DURATION_BUCKETS), "pages": pages}
+    except SQLAlchemyError as e:
+        raise e
+
+def rebuild_daily_stats(db: Session, batch_size: int = 1000):
+    """Recomputes task_daily_stats and task_duration_bucket; returns the number of rows."""
+    try:
+        days = {}
+
+        def row(page_name, day):
+            return days.setdefault((page_name, _as_date(day)), dict.fromkeys(DAILY_COLUMNS, 0))
+
+        for model in (models.Task, models.TaskArchive):
+            for column, counter in ((model.created_at, "created"), (model.started_at, "started")):
+                day = func.date(column)
+                for page_name, value, count in db.execute(
+                    select(model.page_name, day, func.count())
+                    .where(column.is_not(None))
+                    .group_by(model.page_name, day)
+                ):
+                    row(page_name, value)[counter] += count
+
+        hidden_at = func.coalesce(models.Task.deleted_at, models.Task.archived_at)
+        day = func.date(hidden_at)
+        for page_name, value, count in db.execute(
+            select(models.Task.page_name, day, func.count())
+            .where(hidden_at.is_not(None), models.Task.completed_at.is_(None))
+            .group_by(models.Task.page_name, day)
+        ):
+            row(page_name, value)["removed"] = count
+
+        buckets = Counter()
+        completed = chain.from_iterable(
+            db.execute(
+                select(model.page_name, model.created_at, model.started_at, model.completed_at)
+                .where(model.completed_at.is_not(None))
+                .execution_options(yield_per=batch_size)
+            )
+            for model in (models.Task, models.TaskArchive)
+        )
+        for page_name, created_at, started_at, completed_at in completed:
+            day = completed_at.date()
+            lead = (completed_at - created_at).total_seconds()
+            cycle = (completed_at - (started_at or completed_at)).total_seconds()
+            counts = row(page_name, day)
+            counts["completed"] += 1
+            counts["lead_seconds"] += lead
+            counts["cycle_seconds"] += cycle
+            buckets[(page_name, day, "lead", _duration_bucket(lead))] += 1
+            buckets[(page_name, day, "cycle", _duration_bucket(cycle))] += 1
+
+        db.execute(delete(models.TaskDurationBucket))
+        db.execute(delete(models.TaskDailyStats))
+        if days:
+            db.execute(
+                insert(models.TaskDailyStats),
+                [{"page_name": page_name, "day": day, **counts} for (page_name, day), counts in days.items()],
+            )
+        if buckets:
+            db.execute(
+                insert(models.TaskDurationBucket),
+                [
+                    {"page_name": page_name, "day": day, "kind": kind, "bucket": bucket, "count": count}
+                    for (page_name, day, kind, bucket), count in buckets.items()
+                ],
+            )
+        db.commit()
+        return len(days)
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
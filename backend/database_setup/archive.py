@@ -0,0 +1,173 @@
+"""
+Hot/cold archival. Old completed tasks move, with their subtasks, to
+task_archive/subtask_archive; analytics keeps counting them through
+task_archive_stats.
+"""
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from datetime import datetime, timedelta
+from . import models
+from .analytics import ANALYTICS_WINDOWS
+from .crud import (
+    KEPT_TASK, ROLLUP_AGGREGATES, _bump_daily_stats, _commit, _delete_cascades,
+    _foreign_keys_enforced, _log_change, _log_changes_by_page, _record_change, _rollback, _upsert,
+)
+
+
+# The /tasks/analytics windows only read `task`, so nothing in them may be archived yet
+MIN_ARCHIVE_AGE = max(ANALYTICS_WINDOWS.values())
+# Columns task/subtask share with their archive tables
+ARCHIVE_TASK_COLUMNS = (
+    "id", "page_id", "page_name", "name", "description", "status", "created_at", "started_at", "completed_at",
+    *ROLLUP_AGGREGATES,
+)
+ARCHIVE_SUBTASK_COLUMNS = ("id", "task_id", "title", "description", "status", "created_at", "started_at", "completed_at", "updated_at")
+ARCHIVE_STATS_COLUMNS = ("tasks", "with_subtasks", "subtasks_pending", "subtasks_in_progress", "subtasks_completed")
+
+def _archive_stats_aggregates(model):
+    """task_archive_stats counters of the `model` rows, in ARCHIVE_STATS_COLUMNS order."""
+    return (
+        func.count(),
+        func.count().filter(model.subtask_total > 0),
+        func.coalesce(func.sum(model.subtask_pending), 0),
+        func.coalesce(func.sum(model.subtask_in_progress), 0),
+        func.coalesce(func.sum(model.subtask_completed), 0),
+    )
+
+def _bump_archive_stats(db: Session, model, criteria, sign: int):
+    """Adds (sign=1) or removes (sign=-1) the matching rows in task_archive_stats."""
+    rows = db.execute(
+        select(model.page_name, *_archive_stats_aggregates(model)).where(criteria).group_by(model.page_name)
+    ).all()
+    if not rows:
+        return
+    stats = models.TaskArchiveStats.__table__
+    upsert = _upsert(db, stats)
+    db.execute(
+        upsert.on_conflict_do_update(
+            index_elements=["page_name"],
+            set_={column: stats.c[column] + upsert.excluded[column] for column in ARCHIVE_STATS_COLUMNS},
+        ),
+        [
+            {"page_name": page_name, **{column: sign * value for column, value in zip(ARCHIVE_STATS_COLUMNS, values)}}
+            for page_name, *values in rows
+        ],
+    )
+
+def _copy_rows(db: Session, source, target, columns, criteria, **extra):
+    """INSERT INTO target ... SELECT columns FROM source WHERE criteria."""
+    db.execute(
+        insert(target).from_select(
+            [*columns, *extra],
+            select(*(getattr(source, column) for column in columns), *extra.values()).where(criteria),
+        )
+    )
+
+def archive_completed_tasks(db: Session, older_than: timedelta, batch_size: int = 500) -> int:
+    """Moves tasks completed over `older_than` ago to the archive tables; returns the count."""
+    if older_than < MIN_ARCHIVE_AGE:
+        raise ValueError(f"Tasks can only be archived {MIN_ARCHIVE_AGE.days} days or more after completion")
+    cutoff = datetime.utcnow() - older_than
+    cascades = _foreign_keys_enforced(db)
+    archived = 0
+    try:
+        while True:
+            rows = db.execute(
+                select(models.Task.id, models.Task.page_name, models.Task.archived_at)
+                .where(
+                    models.Task.status == models.TaskStatus.completed,
+                    models.Task.completed_at < cutoff,
+                    models.Task.deleted_at.is_(None),
+                )
+                .order_by(models.Task.completed_at)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return archived
+            task_ids = [row.id for row in rows]
+            in_batch = models.Task.id.in_(task_ids)
+            now = datetime.utcnow()
+            _copy_rows(
+                db, models.Task, models.TaskArchive, ARCHIVE_TASK_COLUMNS, in_batch,
+                archived_at=func.coalesce(models.Task.archived_at, now),
+            )
+            _copy_rows(db, models.Subtask, models.SubtaskArchive, ARCHIVE_SUBTASK_COLUMNS, models.Subtask.task_id.in_(task_ids))
+            _bump_archive_stats(db, models.Task, in_batch, 1)
+            if not cascades:
+                _delete_cascades(db, task_ids)
+            db.execute(delete(models.Task).where(in_batch))
+            shown = [(row.page_name, row.id) for row in rows if row.archived_at is None]
+            _log_changes_by_page(db, shown, deleted=True)
+            db.commit()
+            archived += len(task_ids)
+
+            by_page = {}
+            for page_name, task_id in shown:
+                by_page.setdefault(page_name, []).append(task_id)
+            for page_name, page_task_ids in by_page.items():
+                revision = db.info["revisions"][page_name]
+                _record_change(db, page_name, "task.bulk_archived", task_ids=page_task_ids, revision=revision)
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+class RestoreConflict(Exception):
+    """An archived task's or subtask's id is already taken in the hot tables."""
+    def __init__(self, task_id: int):
+        self.task_id = task_id
+        super().__init__(f"Task {task_id} or one of its subtasks has an id already in use")
+
+def restore_task(db: Session, task_id: int):
+    """Puts an archived task back on its page; None if not archived. Raises RestoreConflict."""
+    try:
+        task = db.scalars(
+            update(models.Task)
+            .where(models.Task.id == task_id, KEPT_TASK, models.Task.archived_at.is_not(None))
+            .values(archived_at=None)
+            .returning(models.Task)
+        ).first()
+        if task is not None:
+            if task.status != models.TaskStatus.completed:
+                # Counted as removed when it was archived
+                _bump_daily_stats(db, datetime.utcnow().date(), {task.page_name: {"removed": -1}})
+        else:
+            in_archive = models.TaskArchive.id == task_id
+            if db.scalar(select(models.TaskArchive.id).where(in_archive)) is None:
+                return None
+            try:
+                _copy_rows(db, models.TaskArchive, models.Task, ARCHIVE_TASK_COLUMNS, in_archive)
+                _copy_rows(db, models.SubtaskArchive, models.Subtask, ARCHIVE_SUBTASK_COLUMNS, models.SubtaskArchive.task_id == task_id)
+            except IntegrityError as e:
+                _rollback(db)
+                raise RestoreConflict(task_id) from e
+            _bump_archive_stats(db, models.TaskArchive, in_archive, -1)
+            db.execute(delete(models.SubtaskArchive).where(models.SubtaskArchive.task_id == task_id))
+            db.execute(delete(models.TaskArchive).where(in_archive))
+            task = db.get(models.Task, task_id, populate_existing=True)
+        _log_change(db, task.page_name, [task.id])
+        _commit(db)
+        _record_change(db, task.page_name, "task.restored", task=task, revision=db.info["revision"])
+        return task
+    except SQLAlchemyError as e:
+        _rollback(db)
+        raise e
+
+def rebuild_archive_stats(db: Session) -> int:
+    """Recomputes task_archive_stats; returns the number of pages."""
+    try:
+        rows = db.execute(
+            select(models.TaskArchive.page_name, *_archive_stats_aggregates(models.TaskArchive))
+            .group_by(models.TaskArchive.page_name)
+        ).all()
+        db.execute(delete(models.TaskArchiveStats))
+        if rows:
+            db.execute(
+                insert(models.TaskArchiveStats),
+                [{"page_name": page_name, **dict(zip(ARCHIVE_STATS_COLUMNS, values))} for page_name, *values in rows],
+            )
+        db.commit()
+        return len(rows)
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
@@ -0,0 +1,280 @@
+"""
+Async counterparts of the functions in crud.py and its sibling modules
+(analytics.py, archive.py, batches.py, dependencies.py), used by the FastAPI
+router.
+
+Each wrapper runs the synchronous function on the AsyncSession's underlying
+Session with run_sync, so the query logic stays in the sync modules and the
+event loop is never blocked on the database. ORM results are converted to
+their response schemas inside that call: an AsyncSession can't lazy-load
+later, while FastAPI serialises the response.
+"""
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import analytics, archive, batches, crud, dependencies, models, schemas
+
+
+def _task_response(task):
+    return schemas.TaskResponse.model_validate(task) if task else None
+
+def _subtask_response(subtask):
+    return schemas.SubtaskResponse.model_validate(subtask) if subtask else None
+
+# The mutations below return change sets: the response fields the endpoints
+# always had, plus the page revision left in session.info by crud._log_change
+
+def _task_change(s, task):
+    if not task:
+        return None
+    return schemas.TaskChange(revision=s.info["revision"], **dict(_task_response(task)))
+
+def _subtask_change(s, subtask):
+    if not subtask:
+        return None
+    return schemas.SubtaskChange(
+        revision=s.info["revisions"][subtask.task.page_name],
+        task=_task_response(subtask.task),
+        **dict(_subtask_response(subtask)),
+    )
+
+
+async def create_task(db: AsyncSession, task: schemas.TaskCreate, page_name: str):
+    return await db.run_sync(lambda s: _task_change(s, crud.create_task(s, task, page_name)))
+
+async def bulk_create_tasks(db: AsyncSession, tasks: List[schemas.TaskCreate], page_name: str):
+    return await db.run_sync(crud.bulk_create_tasks, tasks, page_name)
+
+async def get_tasks(db: AsyncSession, **filters):
+    return await db.run_sync(
+        lambda s: [_task_response(task) for task in crud.get_tasks(s, **filters)]
+    )
+
+async def get_task(db: AsyncSession, task_id: int):
+    return await db.run_sync(lambda s: _task_response(crud.get_task(s, task_id)))
+
+async def get_tasks_by_page(db: AsyncSession, page_name: str, **filters):
+    return await db.run_sync(
+        lambda s: [_task_response(task) for task in crud.get_tasks_by_page(s, page_name, **filters)]
+    )
+
+async def get_task_rows(db: AsyncSession, page_name=None, **options):
+    # Plain dicts, nothing left to convert
+    return await db.run_sync(lambda s: crud.get_task_rows(s, page_name, **options))
+
+async def get_task_summaries(db: AsyncSession, page_name=None, **filters):
+    return await db.run_sync(
+        lambda s: [
+            schemas.TaskSummary.model_validate(task)
+            for task in crud.get_task_summaries(s, page_name, **filters)
+        ]
+    )
+
+async def search_tasks(db: AsyncSession, q: str, **options):
+    return await db.run_sync(lambda s: crud.search_tasks(s, q, **options))
+
+async def get_revision(db: AsyncSession, page_name: Optional[str] = None):
+    return await db.run_sync(lambda s: crud.get_revision(s, page_name))
+
+async def get_pages(db: AsyncSession):
+    # Plain dicts, nothing left to convert
+    return await db.run_sync(crud.get_pages)
+
+async def get_task_analytics(db: AsyncSession):
+    return await db.run_sync(analytics.get_task_analytics)
+
+async def get_daily_series(db: AsyncSession, days: int, page_name: Optional[str] = None):
+    return await db.run_sync(lambda s: analytics.get_daily_series(s, days, page_name))
+
+async def get_duration_stats(db: AsyncSession, days: int, page_name: Optional[str] = None):
+    return await db.run_sync(lambda s: analytics.get_duration_stats(s, days, page_name))
+
+async def start_task(db: AsyncSession, task_id: int):
+    return await db.run_sync(lambda s: _task_change(s, crud.start_task(s, task_id)))
+
+async def complete_task(db: AsyncSession, task_id: int):
+    return await db.run_sync(lambda s: _task_change(s, crud.complete_task(s, task_id)))
+
+async def transition_tasks(db: AsyncSession, task_ids: List[int], status: models.TaskStatus):
+    def run(s):
+        tasks, conflicts, missing = crud.transition_tasks(s, task_ids, status)
+        return schemas.TaskTransitionResult(
+            updated=[_task_response(task) for task in tasks], conflicts=conflicts, not_found=missing,
+            revisions=s.info.get("revisions", {}),
+        )
+    return await db.run_sync(run)
+
+def _task_delete_change(s, task):
+    if not task:
+        return None
+    return schemas.DeleteChange(
+        message="Task deleted successfully",
+        revision=s.info["revision"],
+        page_name=task.page_name,
+        deleted_task_id=task.id,
+    )
+
+async def delete_task(db: AsyncSession, task_id: int):
+    return await db.run_sync(lambda s: _task_delete_change(s, crud.delete_task(s, task_id)))
+
+def _page_bulk_change(message: str, page_name: str, result):
+    task_ids, revision = result
+    return schemas.PageBulkChange(message=message, page_name=page_name, task_ids=task_ids, revision=revision)
+
+async def delete_page_tasks(db: AsyncSession, page_name: str, status: Optional[models.TaskStatus] = None):
+    return await db.run_sync(lambda s: _page_bulk_change(
+        "Tasks deleted successfully", page_name, crud.delete_page_tasks(s, page_name, status)
+    ))
+
+async def archive_page_tasks(db: AsyncSession, page_name: str, status: Optional[models.TaskStatus]):
+    return await db.run_sync(lambda s: _page_bulk_change(
+        "Tasks archived successfully", page_name, crud.archive_page_tasks(s, page_name, status)
+    ))
+
+async def restore_task(db: AsyncSession, task_id: int):
+    return await db.run_sync(lambda s: _task_change(s, archive.restore_task(s, task_id)))
+
+def _dependency_change(s, task, depends_on_id: int, changed: bool):
+    return schemas.DependencyChange(
+        task_id=task.id,
+        depends_on_id=depends_on_id,
+        page_name=task.page_name,
+        revision=s.info["revision"] if changed else None,
+    )
+
+async def add_dependency(db: AsyncSession, task_id: int, depends_on_id: int):
+    def run(s):
+        result = dependencies.add_dependency(s, task_id, depends_on_id)
+        if result is None:
+            return None
+        task, added = result
+        return _dependency_change(s, task, depends_on_id, added)
+    return await db.run_sync(run)
+
+async def remove_dependency(db: AsyncSession, task_id: int, depends_on_id: int):
+    def run(s):
+        task = dependencies.remove_dependency(s, task_id, depends_on_id)
+        return _dependency_change(s, task, depends_on_id, True) if task else None
+    return await db.run_sync(run)
+
+async def get_dependencies(db: AsyncSession, task_id: int):
+    def run(s):
+        found = dependencies.get_dependencies(s, task_id)
+        if found is None:
+            return None
+        depends_on, dependents, blocked_by = found
+        return schemas.TaskDependencies(
+            task_id=task_id, depends_on=depends_on, dependents=dependents, blocked_by=blocked_by
+        )
+    return await db.run_sync(run)
+
+async def get_graph_tasks(db: AsyncSession, kind: str, page_name: Optional[str] = None, after: Optional[int] = None, limit: int = 100):
+    def run(s):
+        tasks, next_after = dependencies.get_graph_tasks(s, kind, page_name, after, limit)
+        return schemas.GraphTaskPage(items=tasks, next_after=next_after)
+    return await db.run_sync(run)
+
+async def get_critical_path(db: AsyncSession):
+    def run(s):
+        seconds, tasks = dependencies.get_critical_path(s)
+        return schemas.CriticalPath(seconds=seconds, tasks=tasks)
+    return await db.run_sync(run)
+
+async def create_subtask(db: AsyncSession, subtask: schemas.SubtaskCreate, task_id: int):
+    return await db.run_sync(lambda s: _subtask_change(s, crud.create_subtask(s, subtask, task_id)))
+
+async def update_subtask_status(db: AsyncSession, subtask_id: int, status: str):
+    return await db.run_sync(
+        lambda s: _subtask_change(s, crud.update_subtask_status(s, subtask_id, status))
+    )
+
+async def transition_subtasks(db: AsyncSession, subtask_ids: List[int], status: models.SubtaskStatus):
+    def run(s):
+        subtasks, conflicts, missing = crud.transition_subtasks(s, subtask_ids, status)
+        return schemas.SubtaskTransitionResult(
+            updated=[_subtask_response(subtask) for subtask in subtasks], conflicts=conflicts, not_found=missing,
+            revisions=s.info.get("revisions", {}),
+        )
+    return await db.run_sync(run)
+
+def _subtask_delete_change(s, subtask):
+    if not subtask:
+        return None
+    task = crud.get_task(s, subtask.task_id)
+    s.refresh(task, attribute_names=["subtasks"])
+    return schemas.DeleteChange(
+        message="Subtask deleted successfully",
+        revision=s.info["revision"],
+        page_name=task.page_name,
+        deleted_subtask_id=subtask.id,
+        task=_task_response(task),
+    )
+
+async def delete_subtask(db: AsyncSession, subtask_id: int):
+    return await db.run_sync(lambda s: _subtask_delete_change(s, crud.delete_subtask(s, subtask_id)))
+
+async def get_task_changes(db: AsyncSession, page_name: str, since: int):
+    def run(s):
+        revision, tasks, deleted = crud.get_task_changes(s, page_name, since)
+        return schemas.TaskChangesSince(
+            page_name=page_name,
+            since=since,
+            revision=revision,
+            tasks=[_task_response(task) for task in tasks],
+            deleted_task_ids=deleted,
+        )
+    return await db.run_sync(run)
+
+
+def _batch_task_change(s, task):
+    # Earlier operations of the batch may have changed the subtasks
+    s.refresh(task, attribute_names=["subtasks"])
+    return _task_change(s, task)
+
+def _batch_subtask_change(s, subtask):
+    s.refresh(subtask.task, attribute_names=["subtasks"])
+    return _subtask_change(s, subtask)
+
+# operation.op -> change set of its result, as the single-operation endpoint
+# returns it
+BATCH_RESPONSES = {
+    "create_task": _batch_task_change,
+    "start_task": _batch_task_change,
+    "complete_task": _batch_task_change,
+    "delete_task": _task_delete_change,
+    "create_subtask": _batch_subtask_change,
+    "update_subtask_status": _batch_subtask_change,
+    "delete_subtask": _subtask_delete_change,
+}
+
+# Status codes the single-operation endpoints answer these errors with
+BATCH_ERROR_CODES = ((LookupError, 404), (crud.InvalidTransition, 409), (ValueError, 400))
+
+def _batch_error_code(error) -> int:
+    return next((code for kind, code in BATCH_ERROR_CODES if isinstance(error, kind)), 500)
+
+async def run_batch(db: AsyncSession, batch: schemas.BatchRequest):
+    def run(s):
+        outcomes = batches.run_batch(
+            s, batch.operations, atomic=batch.mode == "all_or_nothing",
+            respond=lambda operation, value: BATCH_RESPONSES[operation.op](s, value),
+        )
+        results, revisions = [], {}
+        for index, (operation, (status, result, error)) in enumerate(zip(batch.operations, outcomes)):
+            if status == batches.BATCH_OK:
+                page_name = result.task.page_name if isinstance(result, schemas.SubtaskChange) else result.page_name
+                revisions[page_name] = max(revisions.get(page_name, 0), result.revision)
+            results.append(schemas.BatchOperationResult(
+                index=index,
+                op=operation.op,
+                status=status,
+                status_code=200 if status == batches.BATCH_OK else _batch_error_code(error) if error else None,
+                result=result,
+                error=str(error) if error else None,
+            ))
+        return schemas.BatchResult(
+            mode=batch.mode,
+            committed=bool(revisions),
+            revisions=revisions,
+            results=results,
+        )
+    return await db.run_sync(run)
@@ -0,0 +1,90 @@
+"""
+Batches: several of the crud.py mutations in one transaction, either all or
+nothing (atomic) or each under its own SAVEPOINT. Change events are queued
+while the batch runs and published once it has committed.
+"""
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from . import models
+from .crud import (
+    BATCH_EVENTS, InvalidTransition, LIVE_TASK, _record_change, complete_task, create_subtask,
+    create_task, delete_subtask, delete_task, start_task, update_subtask_status,
+)
+
+
+BATCH_OK, BATCH_FAILED, BATCH_ROLLED_BACK, BATCH_SKIPPED = "ok", "failed", "rolled_back", "skipped"
+# What a failed operation may raise; anything else aborts the whole batch
+BATCH_ERRORS = (LookupError, ValueError, InvalidTransition, SQLAlchemyError)
+
+def _batch_ref(value, ids: list) -> int:
+    """The id an operation names: an int, or "$n" for operation n's result."""
+    if isinstance(value, int):
+        return value
+    index = int(value[1:])
+    if index >= len(ids):
+        raise ValueError(f"{value} refers to an operation that hasn't run yet")
+    if ids[index] is None:
+        raise ValueError(f"{value} refers to a failed operation")
+    return ids[index]
+
+def _found(value, what: str):
+    if value is None:
+        raise LookupError(f"{what} not found")
+    return value
+
+def _batch_create_subtask(db: Session, operation, ids):
+    task_id = _batch_ref(operation.task_id, ids)
+    _found(db.scalar(select(models.Task.id).where(models.Task.id == task_id, LIVE_TASK)), "Task")
+    return create_subtask(db, operation.subtask, task_id)
+
+# operation.op -> fn(db, operation, ids) returning the task or subtask it changed
+BATCH_OPERATIONS = {
+    "create_task": lambda db, operation, ids: create_task(db, operation.task, operation.page_name),
+    "create_subtask": _batch_create_subtask,
+    "start_task": lambda db, operation, ids: _found(start_task(db, _batch_ref(operation.task_id, ids)), "Task"),
+    "complete_task": lambda db, operation, ids: _found(complete_task(db, _batch_ref(operation.task_id, ids)), "Task"),
+    "update_subtask_status": lambda db, operation, ids: _found(
+        update_subtask_status(db, _batch_ref(operation.subtask_id, ids), operation.status), "Subtask"
+    ),
+    "delete_task": lambda db, operation, ids: _found(delete_task(db, _batch_ref(operation.task_id, ids)), "Task"),
+    "delete_subtask": lambda db, operation, ids: _found(delete_subtask(db, _batch_ref(operation.subtask_id, ids)), "Subtask"),
+}
+
+def run_batch(db: Session, operations, atomic: bool = True, respond=lambda operation, value: value):
+    """Runs `operations` in one transaction; returns [(status, result, exception)] in order."""
+    outcomes, ids = [], []
+    events = db.info[BATCH_EVENTS] = []
+    try:
+        if db.get_bind().dialect.name == "sqlite":
+            # pysqlite needs an explicit transaction for SAVEPOINTs; this also takes the write lock
+            db.execute(text("BEGIN IMMEDIATE"))
+        for index, operation in enumerate(operations):
+            queued = len(events)
+            try:
+                if atomic:
+                    value = BATCH_OPERATIONS[operation.op](db, operation, ids)
+                else:
+                    with db.begin_nested():
+                        value = BATCH_OPERATIONS[operation.op](db, operation, ids)
+            except BATCH_ERRORS as e:
+                del events[queued:]
+                outcomes.append((BATCH_FAILED, None, e))
+                ids.append(None)
+                if atomic:
+                    db.rollback()
+                    rolled_back = [(BATCH_ROLLED_BACK, result, None) for _, result, _ in outcomes[:-1]]
+                    skipped = [(BATCH_SKIPPED, None, None)] * (len(operations) - index - 1)
+                    return rolled_back + outcomes[-1:] + skipped
+                continue
+            outcomes.append((BATCH_OK, respond(operation, value), None))
+            ids.append(value.id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        del db.info[BATCH_EVENTS]
+    for page_name, event_type, task, subtask, fields in events:
+        _record_change(db, page_name, event_type, task=task, subtask=subtask, **fields)
+    return outcomes
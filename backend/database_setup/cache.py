@@ -0,0 +1,118 @@
+"""
+In-process cache of serialised read responses.
+
+Entries are grouped by scope: a page name for the per-page task lists, or
+ALL_PAGES for the cross-page reads (/tasks/all, /tasks/analytics). Every scope
+has a version counter. The mutation paths in crud.py call invalidate() with
+the affected page after they commit. That bumps the page's version and the
+ALL_PAGES version and drops their entries, so other pages stay cached.
+
+The version is also the ETag: a client that sends back the current ETag in
+If-None-Match gets a 304 without the database being touched.
+
+The cache lives in one process, and with several workers each one only sees
+the writes it served itself. RESPONSE_CACHE_VERSIONS=database (set by run.py
+when it starts more than one worker) makes the versions the scope's latest
+task_change revision instead (crud.get_revision), read with one indexed
+query per request. Every worker then agrees on them, and on the ETags.
+"""
+from collections import OrderedDict
+from typing import Optional
+import os
+import threading
+import uuid
+import weakref
+import zlib
+
+ALL_PAGES = "*"
+
+# "process": in-process counters bumped by invalidate(); "database": the
+# caller passes the database revision of the scope
+VERSION_SOURCES = ("process", "database")
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256, version_source: str = "process"):
+        if version_source not in VERSION_SOURCES:
+            raise ValueError(f"version_source must be one of {VERSION_SOURCES}, not {version_source!r}")
+        self.max_entries = max_entries
+        self.version_source = version_source
+        self._entries = OrderedDict()  # (scope, key) -> (version, body)
+        self._versions = {}            # scope -> int
+        # ETags from an earlier process must never match this one's counters.
+        # Database revisions are shared by every process.
+        self._epoch = uuid.uuid4().hex[:8] if version_source == "process" else "db"
+        self._lock = threading.Lock()
+
+    def version(self, scope: str) -> int:
+        with self._lock:
+            return self._versions.get(scope, 0)
+
+    def etag(self, scope: str, key: str, version: Optional[int] = None) -> str:
+        if version is None:
+            version = self.version(scope)
+        digest = zlib.crc32(f"{scope}\0{key}".encode())
+        return f'W/"{self._epoch}-{version}-{digest:08x}"'
+
+    def get(self, scope: str, key: str, version: Optional[int] = None) -> Optional[bytes]:
+        with self._lock:
+            if version is None:
+                version = self._versions.get(scope, 0)
+            entry = self._entries.get((scope, key))
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end((scope, key))
+            return entry[1]
+
+    def set(self, scope: str, key: str, version: int, body: bytes):
+        """Stores `body` computed at `version`. If the scope was invalidated in
+        the meantime the entry is simply never served."""
+        with self._lock:
+            if self.version_source == "process" and version != self._versions.get(scope, 0):
+                return
+            self._entries[(scope, key)] = (version, body)
+            self._entries.move_to_end((scope, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, page_name: str):
+        with self._lock:
+            for scope in (page_name, ALL_PAGES):
+                self._versions[scope] = self._versions.get(scope, 0) + 1
+            for entry_key in [k for k in self._entries if k[0] in (page_name, ALL_PAGES)]:
+                del self._entries[entry_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for scope in self._versions:
+                self._versions[scope] += 1
+
+
+response_cache = ResponseCache(
+    int(os.environ.get("RESPONSE_CACHE_SIZE", 256)),
+    os.environ.get("RESPONSE_CACHE_VERSIONS", "process"),
+)
+
+
+class PageIds:
+    """
+    In-process page name -> id map behind crud._page_id. Pages are never
+    renamed or deleted, so entries never go stale and every worker can keep
+    its own copy. Kept per engine, since one process may open several
+    databases (the benchmarks, check_schema.py).
+    """
+    def __init__(self):
+        self._ids = weakref.WeakKeyDictionary()  # engine -> {name: id}
+        self._lock = threading.Lock()
+
+    def get(self, engine, name: str) -> Optional[int]:
+        with self._lock:
+            return self._ids.get(engine, {}).get(name)
+
+    def update(self, engine, ids: dict):
+        with self._lock:
+            self._ids.setdefault(engine, {}).update(ids)
+
+
+page_ids = PageIds()
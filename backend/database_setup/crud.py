@@ -1,7 +1,250 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, bindparam, delete, event, exists, false, func, insert, or_, select, text, true, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.exc import SQLAlchemyError
-from datetime import datetime
+from collections import Counter
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import List, Optional
+import base64
+import bisect
+import enum
+import heapq
+import json
+import re
 from . import models, schemas
+from .cache import page_ids, response_cache
+from .events import change_broker
+from . import search  # noqa: F401  (registers the FTS tables/triggers with create_all)
+
+
+# Tasks neither soft-deleted nor archived: all reads and status changes see only these
+LIVE_TASK = and_(models.Task.deleted_at.is_(None), models.Task.archived_at.is_(None))
+# Subtasks of such a task, one primary key lookup per subtask
+SUBTASK_OF_LIVE_TASK = exists().where(models.Task.id == models.Subtask.task_id, LIVE_TASK)
+# Tasks that count in /tasks/analytics: archived ones too, in either tier
+KEPT_TASK = models.Task.deleted_at.is_(None)
+SUBTASK_OF_KEPT_TASK = exists().where(models.Task.id == models.Subtask.task_id, KEPT_TASK)
+
+# session.info key of the change events queued by a running run_batch
+BATCH_EVENTS = "batch_events"
+
+
+def _commit(db: Session):
+    """Commits, or only flushes inside run_batch, which commits once."""
+    if BATCH_EVENTS in db.info:
+        db.flush()
+    else:
+        db.commit()
+
+def _rollback(db: Session):
+    # Inside run_batch the batch decides what to roll back
+    if BATCH_EVENTS not in db.info:
+        db.rollback()
+
+def _record_change(db: Session, page_name: str, event_type: str, task=None, subtask=None, **fields):
+    """Invalidates the page's cached responses and publishes the change event (queued inside run_batch)."""
+    if BATCH_EVENTS in db.info:
+        db.info[BATCH_EVENTS].append((page_name, event_type, task, subtask, fields))
+        return
+    response_cache.invalidate(page_name)
+    if not change_broker.has_subscribers(page_name):
+        return
+    event = {"type": event_type, **fields}
+    if task is not None:
+        event["task_id"] = task.id
+        event["task"] = schemas.TaskResponse.model_validate(task).model_dump(mode="json")
+    if subtask is not None:
+        event["task_id"] = subtask.task_id
+        event["subtask"] = schemas.SubtaskResponse.model_validate(subtask).model_dump(mode="json")
+    change_broker.publish(page_name, event)
+
+
+# Advisory lock ordering revisions on PostgreSQL; SQLite has one writer at a time
+REVISION_LOCK_KEY = 0x72657673
+
+def _log_change(db: Session, page_name: str, task_ids: List[int], deleted: bool = False) -> int:
+    """Logs `task_ids` as changed in task_change; returns the new revision. Call it after the other writes."""
+    if db.get_bind().dialect.name == "postgresql":
+        # Sequence ids can commit out of order; the lock, held until commit, orders them
+        db.execute(select(func.pg_advisory_xact_lock(REVISION_LOCK_KEY)))
+    now = datetime.utcnow()
+    db.execute(delete(models.TaskChange).where(models.TaskChange.task_id.in_(task_ids)))
+    revisions = db.scalars(
+        insert(models.TaskChange).returning(models.TaskChange.id, sort_by_parameter_order=True),
+        [{"task_id": task_id, "page_name": page_name, "deleted": deleted, "changed_at": now} for task_id in task_ids],
+    ).all()
+    db.info["revision"] = max(revisions)
+    db.info.setdefault("revisions", {})[page_name] = db.info["revision"]
+    return db.info["revision"]
+
+def get_revision(db: Session, page_name: Optional[str] = None) -> int:
+    """Latest task_change revision of a page, or of all pages; 0 if none."""
+    query = select(func.coalesce(func.max(models.TaskChange.id), 0))
+    if page_name is not None:
+        query = query.where(models.TaskChange.page_name == page_name)
+    return db.scalar(query)
+
+def _log_changes_by_page(db: Session, page_task_ids, deleted: bool = False):
+    """_log_change for (page_name, task_id) pairs spanning several pages."""
+    by_page = {}
+    for page_name, task_id in page_task_ids:
+        by_page.setdefault(page_name, set()).add(task_id)
+    for page_name, task_ids in by_page.items():
+        _log_change(db, page_name, sorted(task_ids), deleted=deleted)
+
+
+# session.info key: page ids this transaction created, cached once it commits
+PAGE_IDS = "page_ids"
+
+def _page_id(db: Session, page_name: str, create: bool = False) -> Optional[int]:
+    """Cached id of page `page_name`, None if unknown unless `create` registers it."""
+    engine = db.get_bind()
+    page_id = page_ids.get(engine, page_name)
+    if page_id is None:
+        page_id = db.info.get(PAGE_IDS, {}).get(page_name)
+    if page_id is not None:
+        return page_id
+    page_id = db.scalar(select(models.Page.id).where(models.Page.name == page_name))
+    if page_id is None:
+        if not create:
+            return None
+        page_id = db.scalar(
+            _upsert(db, models.Page.__table__)
+            .values(name=page_name, created_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(models.Page.id)
+        )
+        if page_id is None:
+            # Registered by a concurrent transaction that just committed
+            page_id = db.scalar(select(models.Page.id).where(models.Page.name == page_name))
+        db.info.setdefault(PAGE_IDS, {})[page_name] = page_id
+    elif PAGE_IDS in db.info:
+        # Possibly the row this transaction created
+        db.info[PAGE_IDS][page_name] = page_id
+    else:
+        page_ids.update(engine, {page_name: page_id})
+    return page_id
+
+@event.listens_for(Session, "after_commit")
+def _cache_new_page_ids(session):
+    ids = session.info.pop(PAGE_IDS, None)
+    if ids:
+        page_ids.update(session.get_bind(), ids)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_new_page_ids(session, previous_transaction):
+    if PAGE_IDS not in session.info:
+        return
+    if previous_transaction.nested:
+        # Pages created before the savepoint are still uncommitted: forget their ids
+        session.info[PAGE_IDS] = {}
+    else:
+        del session.info[PAGE_IDS]
+
+
+# Task column -> aggregate over the task's subtasks, see models.Task
+ROLLUP_AGGREGATES = {
+    "subtask_total": func.count(),
+    "subtask_pending": func.count().filter(models.Subtask.status == models.SubtaskStatus.pending),
+    "subtask_in_progress": func.count().filter(models.Subtask.status == models.SubtaskStatus.in_progress),
+    "subtask_completed": func.count().filter(models.Subtask.status == models.SubtaskStatus.completed),
+    "first_subtask_started_at": func.min(models.Subtask.started_at),
+    "last_subtask_completed_at": func.max(models.Subtask.completed_at),
+}
+
+def _rollup_values():
+    """Correlated subqueries recomputing every rollup column of a task row."""
+    return {
+        column: select(aggregate).where(models.Subtask.task_id == models.Task.id).scalar_subquery()
+        for column, aggregate in ROLLUP_AGGREGATES.items()
+    }
+
+def _refresh_rollups(db: Session, task_ids):
+    """Recomputes the subtask rollups of `task_ids` in one UPDATE; returns the refreshed tasks."""
+    if not task_ids:
+        return []
+    db.flush()
+    return db.scalars(
+        update(models.Task)
+        .where(models.Task.id.in_(task_ids))
+        .values(**_rollup_values())
+        .returning(models.Task)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    ).all()
+
+def rebuild_task_rollups(db: Session, batch_size: int = 1000, dry_run: bool = False) -> int:
+    """Repairs drifted subtask rollups in batches; returns how many drifted."""
+    values = _rollup_values()
+    drifted = or_(*(getattr(models.Task, column).is_distinct_from(value) for column, value in values.items()))
+    repaired = 0
+    last_id = 0
+    try:
+        while True:
+            batch = db.scalars(
+                select(models.Task.id).where(models.Task.id > last_id).order_by(models.Task.id).limit(batch_size)
+            ).all()
+            if not batch:
+                return repaired
+            last_id = batch[-1]
+            in_batch = models.Task.id.between(batch[0], last_id)
+            if dry_run:
+                repaired += db.scalar(select(func.count()).select_from(models.Task).where(in_batch, drifted))
+                continue
+            result = db.execute(
+                update(models.Task).where(in_batch, drifted).values(**values),
+                execution_options={"synchronize_session": False},
+            )
+            db.commit()
+            repaired += result.rowcount
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+# Counters of models.TaskDailyStats
+DAILY_COLUMNS = ("created", "started", "completed", "removed", "lead_seconds", "cycle_seconds")
+# Upper bounds, in hours, of the duration histogram buckets; the last one is open-ended
+DURATION_BUCKETS = (1, 4, 8, 24, 48, 72, 120, 168, 336, 720, 1440, 2160)
+
+def _duration_bucket(seconds: float) -> int:
+    return bisect.bisect_left(DURATION_BUCKETS, seconds / 3600)
+
+# INSERT ... ON CONFLICT per backend, for the upserts
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def _upsert(db: Session, table):
+    return UPSERT_INSERTS[db.get_bind().dialect.name](table)
+
+def _bump_daily_stats(db: Session, day: date, counts, durations=()):
+    """Adds `counts` and `durations` to the pages' task_daily_stats rows and histograms for `day`."""
+    if counts:
+        stats = models.TaskDailyStats.__table__
+        upsert = _upsert(db, stats)
+        db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=["page_name", "day"],
+                set_={column: stats.c[column] + upsert.excluded[column] for column in DAILY_COLUMNS},
+            ),
+            [
+                {"page_name": page_name, "day": day, **dict.fromkeys(DAILY_COLUMNS, 0), **deltas}
+                for page_name, deltas in counts.items()
+            ],
+        )
+    buckets = Counter((page_name, kind, _duration_bucket(seconds)) for page_name, kind, seconds in durations)
+    if buckets:
+        histogram = models.TaskDurationBucket.__table__
+        upsert = _upsert(db, histogram)
+        db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=["page_name", "day", "kind", "bucket"],
+                set_={"count": histogram.c.count + upsert.excluded.count},
+            ),
+            [
+                {"page_name": page_name, "day": day, "kind": kind, "bucket": bucket, "count": count}
+                for (page_name, kind, bucket), count in buckets.items()
+            ],
+        )
 
 
 def create_task(db: Session, task: schemas.TaskCreate, page_name:str):
@@ -9,73 +252,648 @@ def create_task(db: Session, task: schemas.TaskCreate, page_name:str):
         db_task = models.Task(
             name = task.name,
             description = task.description,
+            page_id = _page_id(db, page_name, create=True),
             page_name = page_name,
             status = models.TaskStatus.pending
         )
         db.add(db_task)
-        db.commit()
-        db.refresh(db_task)
+        # Flush to get the task id, then commit task and subtasks together
+        db.flush()
 
-        for subtask in task.subtasks:
+        # subtasks may be null in the request body
+        for subtask in task.subtasks or []:
             db_sub = models.Subtask(**subtask.model_dump(), task_id=db_task.id)
             db.add(db_sub)
-        db.commit()
+        if task.subtasks:
+            _refresh_rollups(db, [db_task.id])
+        _bump_daily_stats(db, db_task.created_at.date(), {page_name: {"created": 1}})
+        _log_change(db, page_name, [db_task.id])
+        _commit(db)
+        _record_change(db, page_name, "task.created", task=db_task, revision=db.info["revision"])
         return db_task
     except SQLAlchemyError as e:
-        db.rollback()
+        _rollback(db)
         raise e
 
-def get_tasks(db: Session):
+def bulk_create_tasks(db: Session, tasks: List[schemas.TaskCreate], page_name: str):
+    """Inserts tasks and their subtasks with two executemany INSERTs; returns the ids in order."""
+    try:
+        now = datetime.utcnow()
+        page_id = _page_id(db, page_name, create=True)
+        task_ids = db.scalars(
+            insert(models.Task).returning(models.Task.id, sort_by_parameter_order=True),
+            [
+                {
+                    "name": task.name,
+                    "description": task.description,
+                    "page_id": page_id,
+                    "page_name": page_name,
+                    "status": models.TaskStatus.pending,
+                    "created_at": now,
+                }
+                for task in tasks
+            ],
+        ).all()
+
+        subtask_rows = [
+            {**subtask.model_dump(), "task_id": task_id, "created_at": now, "updated_at": now}
+            for task, task_id in zip(tasks, task_ids)
+            for subtask in task.subtasks or []
+        ]
+        if subtask_rows:
+            db.execute(insert(models.Subtask), subtask_rows)
+            # No Task objects to refresh here, so a plain UPDATE without RETURNING
+            db.execute(
+                update(models.Task).where(models.Task.id.in_(task_ids)).values(**_rollup_values()),
+                execution_options={"synchronize_session": False},
+            )
+        _bump_daily_stats(db, now.date(), {page_name: {"created": len(task_ids)}})
+        _log_change(db, page_name, task_ids)
+        _commit(db)
+        _record_change(db, page_name, "task.bulk_created", task_ids=list(task_ids), revision=db.info["revision"])
+        return task_ids
+    except SQLAlchemyError as e:
+        _rollback(db)
+        raise e
+
+EXPORT_TASK_COLUMNS = ("id", "page_name", "name", "description", "status", "created_at", "started_at", "completed_at")
+EXPORT_SUBTASK_COLUMNS = ("id", "title", "description", "status", "created_at", "started_at", "completed_at", "updated_at")
+
+def _export_value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def iter_task_export(db: Session, page_name: str, batch_size: int = 1000):
+    """Streams a page's tasks with their subtasks as dicts, in id order, in constant memory."""
+    task_table = models.Task.__table__
+    subtask_table = models.Subtask.__table__
+    stmt = (
+        select(
+            *[task_table.c[name] for name in EXPORT_TASK_COLUMNS],
+            *[subtask_table.c[name].label(f"subtask_{name}") for name in EXPORT_SUBTASK_COLUMNS],
+        )
+        .outerjoin(subtask_table, subtask_table.c.task_id == task_table.c.id)
+        .where(task_table.c.page_id == _page_id(db, page_name), LIVE_TASK)
+        .order_by(task_table.c.id, subtask_table.c.id)
+    )
+    current = None
+    result = db.execute(stmt, execution_options={"yield_per": batch_size})
+    for row in result:
+        values = [_export_value(value) for value in row]
+        task = dict(zip(EXPORT_TASK_COLUMNS, values))
+        if current is None or current["id"] != task["id"]:
+            if current is not None:
+                yield current
+            current = {**task, "subtasks": []}
+        subtask = dict(zip(EXPORT_SUBTASK_COLUMNS, values[len(EXPORT_TASK_COLUMNS):]))
+        if subtask["id"] is not None:
+            current["subtasks"].append(subtask)
+    if current is not None:
+        yield current
+
+def encode_cursor(task) -> str:
+    """Opaque page token pointing just past `task` in (created_at, id) order."""
+    if isinstance(task, dict):
+        created_at, task_id = task["created_at"], task["id"]
+    else:
+        created_at, task_id = task.created_at, task.id
+    raw = json.dumps({"created_at": created_at.isoformat(), "id": task_id})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(token: str):
+    """Inverse of encode_cursor. Raises ValueError for malformed tokens."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return datetime.fromisoformat(data["created_at"]), int(data["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid page token") from e
+
+def _task_list_query(
+    db: Session,
+    page_name: Optional[str] = None,
+    status: Optional[models.TaskStatus] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    with_subtasks: bool = True,
+    model=models.Task,
+    visible=LIVE_TASK,
+):
+    """The list query over models.Task, or models.TaskArchive for the archive tier."""
+    query = db.query(model).filter(visible)
+    if with_subtasks:
+        # Load every task's subtasks in one extra SELECT instead of one per task
+        query = query.options(selectinload(model.subtasks))
+    if page_name is not None:
+        page_id = _page_id(db, page_name)
+        query = query.filter(model.page_id == page_id if page_id is not None else false())
+    if status is not None:
+        query = query.filter(model.status == status)
+    if created_after is not None:
+        query = query.filter(model.created_at >= created_after)
+    if created_before is not None:
+        query = query.filter(model.created_at < created_before)
+    if q:
+        # Wildcards in q match themselves
+        escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.filter(model.name.ilike(f"%{escaped}%", escape="\\"))
+    if cursor:
+        # Keyset pagination: a row value comparison seeks the (created_at, id) indexes
+        query = query.filter(
+            tuple_(model.created_at, model.id) > tuple_(*decode_cursor(cursor))
+        )
+    query = query.order_by(model.created_at, model.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def get_tasks(db: Session, **filters):
     try:
-        return db.query(models.Task).all()
+        return _task_list_query(db, **filters).all()
     except SQLAlchemyError as e:
         raise e
 
 def get_task(db: Session, task_id: int):
     try:
-        return db.query(models.Task).filter(models.Task.id == task_id).first()
+        return db.query(models.Task).filter(models.Task.id == task_id, LIVE_TASK).first()
     except SQLAlchemyError as e:
         raise e
 
-def get_tasks_by_page(db: Session, page_name: str):
+def get_tasks_by_page(db: Session, page_name: str, **filters):
     try:
-        return db.query(models.Task).filter(models.Task.page_name == page_name).all()
+        return _task_list_query(db, page_name=page_name, **filters).all()
     except SQLAlchemyError as e:
         raise e
 
-def start_task(db: Session, task_id: int):
+# Columns ?fields= can project; id and created_at are always returned
+TASK_FIELDS = ("name", "description", "status", "started_at", "completed_at", "id", "created_at", "page_name")
+REQUIRED_TASK_FIELDS = ("id", "created_at")
+SUBTASK_FIELDS = ("id", "title", "description", "status", "created_at", "started_at", "completed_at", "updated_at")
+
+# Task ids per subtask SELECT, the same chunking selectinload uses
+SUBTASK_CHUNK_SIZE = 500
+
+def _list_tiers(include_archived: bool):
+    """(task model, subtask model, visible) of each tier a list reads."""
+    if not include_archived:
+        return [(models.Task, models.Subtask, LIVE_TASK)]
+    return [(models.Task, models.Subtask, KEPT_TASK), (models.TaskArchive, models.SubtaskArchive, true())]
+
+def _merge_tiers(tiers, limit: Optional[int], key):
+    """Merges the tiers' sorted lists and keeps the first `limit`."""
+    if len(tiers) == 1:
+        return tiers[0]
+    return list(islice(heapq.merge(*tiers, key=key), limit))
+
+def get_task_rows(
+    db: Session,
+    page_name: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    include_subtasks: bool = True,
+    include_archived: bool = False,
+    **filters,
+):
+    """The list query as plain dicts of `fields`, without ORM objects. Raises ValueError for unknown fields."""
+    if fields:
+        unknown = set(fields) - set(TASK_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}. Valid: {', '.join(TASK_FIELDS)}")
+        names = [name for name in TASK_FIELDS if name in fields or name in REQUIRED_TASK_FIELDS]
+    else:
+        names = list(TASK_FIELDS)
+    if include_archived:
+        names.append("archived_at")
     try:
-        task = db.query(models.Task).filter(models.Task.id == task_id).first()
-        if task:
-            task.status = models.TaskStatus.in_progress
-            task.started_at = datetime.utcnow()
-            db.commit()
-            db.refresh(task)
-        return task
+        tiers = []
+        for model, subtask_model, visible in _list_tiers(include_archived):
+            query = _task_list_query(db, page_name=page_name, with_subtasks=False, model=model, visible=visible, **filters)
+            rows = query.with_entities(*(getattr(model, name) for name in names)).all()
+            tiers.append([(dict(zip(names, row)), subtask_model) for row in rows])
+        rows = _merge_tiers(tiers, filters.get("limit"), key=lambda row: (row[0]["created_at"], row[0]["id"]))
+        tasks = [task for task, _ in rows]
+        if not include_subtasks:
+            return tasks
+
+        for task in tasks:
+            task["subtasks"] = []
+        for subtask_model in {subtask_model for _, subtask_model in rows}:
+            by_task = {task["id"]: task for task, model in rows if model is subtask_model}
+            subtask_columns = [getattr(subtask_model, name) for name in SUBTASK_FIELDS]
+            ids = list(by_task)
+            for start in range(0, len(ids), SUBTASK_CHUNK_SIZE):
+                subtask_rows = db.execute(
+                    select(subtask_model.task_id, *subtask_columns)
+                    .where(subtask_model.task_id.in_(ids[start:start + SUBTASK_CHUNK_SIZE]))
+                    .order_by(subtask_model.task_id, subtask_model.id)
+                )
+                for task_id, *values in subtask_rows:
+                    by_task[task_id]["subtasks"].append(dict(zip(SUBTASK_FIELDS, values)))
+        return tasks
     except SQLAlchemyError as e:
-        db.rollback()
         raise e
 
-def complete_task(db: Session, task_id: int):
+def get_task_summaries(db: Session, page_name: Optional[str] = None, include_archived: bool = False, **filters):
+    """Task list without subtasks, for schemas.TaskSummary."""
     try:
-        task = db.query(models.Task).filter(models.Task.id == task_id).first()
-        if task:
-            task.status = models.TaskStatus.completed
-            task.completed_at = datetime.utcnow()
-            db.commit()
-            db.refresh(task)
-        return task
+        tiers = [
+            _task_list_query(db, page_name=page_name, with_subtasks=False, model=model, visible=visible, **filters).all()
+            for model, _, visible in _list_tiers(include_archived)
+        ]
+        return _merge_tiers(tiers, filters.get("limit"), key=lambda task: (task.created_at, task.id))
+    except SQLAlchemyError as e:
+        raise e
+
+def get_task_changes(db: Session, page_name: str, since: int):
+    """(revision, tasks changed since `since`, ids deleted since); since=0 is a full snapshot."""
+    try:
+        revision = (
+            db.query(func.max(models.TaskChange.id))
+            .filter(models.TaskChange.page_name == page_name)
+            .scalar()
+        ) or 0
+        if since <= 0:
+            return revision, get_tasks_by_page(db, page_name), []
+
+        changes = (
+            db.query(models.TaskChange.task_id, models.TaskChange.deleted)
+            .filter(models.TaskChange.page_name == page_name, models.TaskChange.id > since)
+            .all()
+        )
+        deleted = [task_id for task_id, is_deleted in changes if is_deleted]
+        changed = [task_id for task_id, is_deleted in changes if not is_deleted]
+        tasks = []
+        if changed:
+            tasks = (
+                db.query(models.Task)
+                .options(selectinload(models.Task.subtasks))
+                .filter(models.Task.id.in_(changed), LIVE_TASK)
+                .order_by(models.Task.created_at, models.Task.id)
+                .all()
+            )
+        return revision, tasks, deleted
     except SQLAlchemyError as e:
-        db.rollback()
         raise e
 
+def _search_words(q: str) -> List[str]:
+    words = re.findall(r"\w+", q)
+    if not words:
+        raise ValueError("The search query has no words")
+    return words
+
+def _match_expression(q: str) -> str:
+    """FTS5 MATCH expression: every word quoted, the last one as a prefix."""
+    terms = [f'"{word}"' for word in _search_words(q)]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def _tsquery_expression(q: str) -> str:
+    """The same for PostgreSQL's to_tsquery: word & word & last:*."""
+    terms = _search_words(q)
+    terms[-1] += ":*"
+    return " & ".join(terms)
+
+# bm25 column weights, task name first; lower bm25 is better
+SEARCH_HITS = text("""
+    WITH hits AS (
+        SELECT rowid AS task_id, bm25(task_fts, 10.0, 2.0) AS rank
+        FROM task_fts WHERE task_fts MATCH :match
+        UNION ALL
+        SELECT subtask.task_id, bm25(subtask_fts, 4.0, 1.0)
+        FROM subtask_fts JOIN subtask ON subtask.id = subtask_fts.rowid
+        WHERE subtask_fts MATCH :match
+    )
+    SELECT task.id, sum(hits.rank) AS rank
+    FROM hits JOIN task ON task.id = hits.task_id
+    WHERE task.deleted_at IS NULL AND task.archived_at IS NULL
+      AND (:page_name IS NULL OR task.page_name = :page_name)
+      AND (:status IS NULL OR task.status = :status)
+    GROUP BY task.id
+    ORDER BY rank, task.id
+    LIMIT :limit OFFSET :offset
+""")
+
+SEARCH_TASK_TEXT = text("""
+    SELECT rowid, highlight(task_fts, 0, :open, :close), snippet(task_fts, 1, :open, :close, '…', 16)
+    FROM task_fts WHERE task_fts MATCH :match AND rowid IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+SEARCH_SUBTASK_TEXT = text("""
+    SELECT subtask.task_id, subtask.id,
+           highlight(subtask_fts, 0, :open, :close), snippet(subtask_fts, 1, :open, :close, '…', 16)
+    FROM subtask_fts JOIN subtask ON subtask.id = subtask_fts.rowid
+    WHERE subtask_fts MATCH :match AND subtask.task_id IN :ids
+    ORDER BY subtask.task_id, subtask.id
+""").bindparams(bindparam("ids", expanding=True))
+
+# PostgreSQL: the same ranking over tsvectors of the raw columns, negated (no index)
+PG_TASK_DOCUMENT = (
+    "setweight(to_tsvector('simple', task.name), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(task.description, '')), 'C')"
+)
+PG_SUBTASK_DOCUMENT = (
+    "setweight(to_tsvector('simple', subtask.title), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(subtask.description, '')), 'D')"
+)
+
+PG_SEARCH_HITS = text(f"""
+    WITH hits AS (
+        SELECT task.id AS task_id, -ts_rank({PG_TASK_DOCUMENT}, to_tsquery('simple', :match)) AS rank
+        FROM task WHERE {PG_TASK_DOCUMENT} @@ to_tsquery('simple', :match)
+        UNION ALL
+        SELECT subtask.task_id, -ts_rank({PG_SUBTASK_DOCUMENT}, to_tsquery('simple', :match))
+        FROM subtask WHERE {PG_SUBTASK_DOCUMENT} @@ to_tsquery('simple', :match)
+    )
+    SELECT task.id, sum(hits.rank) AS rank
+    FROM hits JOIN task ON task.id = hits.task_id
+    WHERE task.deleted_at IS NULL AND task.archived_at IS NULL
+      AND (CAST(:page_name AS VARCHAR) IS NULL OR task.page_name = :page_name)
+      AND (CAST(:status AS VARCHAR) IS NULL OR CAST(task.status AS VARCHAR) = :status)
+    GROUP BY task.id
+    ORDER BY rank, task.id
+    LIMIT :limit OFFSET :offset
+""")
+
+PG_SEARCH_TASK_TEXT = text("""
+    SELECT task.id,
+           ts_headline('simple', task.name, to_tsquery('simple', :match), :whole),
+           ts_headline('simple', task.description, to_tsquery('simple', :match), :fragment)
+    FROM task WHERE task.id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+PG_SEARCH_SUBTASK_TEXT = text(f"""
+    SELECT subtask.task_id, subtask.id,
+           ts_headline('simple', subtask.title, to_tsquery('simple', :match), :whole),
+           ts_headline('simple', subtask.description, to_tsquery('simple', :match), :fragment)
+    FROM subtask
+    WHERE {PG_SUBTASK_DOCUMENT} @@ to_tsquery('simple', :match) AND subtask.task_id IN :ids
+    ORDER BY subtask.task_id, subtask.id
+""").bindparams(bindparam("ids", expanding=True))
+
+# Backend -> (query expression, hits, task text, subtask text)
+SEARCH_QUERIES = {
+    "sqlite": (_match_expression, SEARCH_HITS, SEARCH_TASK_TEXT, SEARCH_SUBTASK_TEXT),
+    "postgresql": (_tsquery_expression, PG_SEARCH_HITS, PG_SEARCH_TASK_TEXT, PG_SEARCH_SUBTASK_TEXT),
+}
+
+def _headline_options(highlight, fragment: bool) -> str:
+    options = f'StartSel="{highlight[0]}", StopSel="{highlight[1]}"'
+    return options + (", MaxWords=16, MinWords=8" if fragment else ", HighlightAll=true")
+
+SEARCH_HIT_FIELDS = ("id", "page_name", "name", "description", "status", "created_at", "started_at", "completed_at")
+
+def search_tasks(
+    db: Session,
+    q: str,
+    page_name: Optional[str] = None,
+    status: Optional[models.TaskStatus] = None,
+    limit: int = 20,
+    offset: int = 0,
+    highlight=("<mark>", "</mark>"),
+):
+    """Ranked full-text search; returns (hits, has_more). Raises ValueError when `q` has no words."""
+    expression, hits_query, task_text, subtask_text = SEARCH_QUERIES[db.get_bind().dialect.name]
+    match = expression(q)
+    try:
+        ranked = db.execute(hits_query, {
+            "match": match,
+            "page_name": page_name,
+            "status": status.name if status is not None else None,
+            "limit": limit + 1,
+            "offset": offset,
+        }).all()
+        has_more = len(ranked) > limit
+        ranked = ranked[:limit]
+        if not ranked:
+            return [], False
+
+        ids = [task_id for task_id, _ in ranked]
+        columns = [getattr(models.Task, name) for name in SEARCH_HIT_FIELDS]
+        tasks = {row[0]: dict(zip(SEARCH_HIT_FIELDS, row)) for row in db.execute(select(*columns).where(models.Task.id.in_(ids)))}
+        params = {
+            "match": match,
+            "ids": ids,
+            "open": highlight[0],
+            "close": highlight[1],
+            "whole": _headline_options(highlight, fragment=False),
+            "fragment": _headline_options(highlight, fragment=True),
+        }
+        for task_id, name, snippet in db.execute(task_text, params):
+            tasks[task_id]["name"] = name
+            if snippet:
+                tasks[task_id]["description"] = snippet
+        for task in tasks.values():
+            task["subtasks"] = []
+        for task_id, subtask_id, title, snippet in db.execute(subtask_text, params):
+            tasks[task_id]["subtasks"].append({"id": subtask_id, "title": title, "description": snippet or None})
+
+        hits = []
+        for task_id, rank in ranked:
+            hits.append({**tasks[task_id], "rank": rank})
+        return hits, has_more
+    except SQLAlchemyError as e:
+        raise e
+
+_STATUS_KEYS = {
+    "Pending": "pending",
+    "In progress": "in_progress",
+    "Completed": "completed",
+}
+
+def _empty_status_counts():
+    return {"total": 0, "pending": 0, "in_progress": 0, "completed": 0}
+
+def get_pages(db: Session):
+    """Every page with its live tasks counted per status."""
+    counts = {}
+    rows = db.execute(
+        select(models.Task.page_id, models.Task.status, func.count())
+        .where(LIVE_TASK)
+        .group_by(models.Task.page_id, models.Task.status)
+    )
+    for page_id, status, count in rows:
+        page = counts.setdefault(page_id, _empty_status_counts())
+        page["total"] += count
+        page[_STATUS_KEYS[status.value]] += count
+
+    pages = db.execute(select(models.Page.id, models.Page.name, models.Page.created_at).order_by(models.Page.name)).all()
+    page_ids.update(db.get_bind(), {page.name: page.id for page in pages})
+    return [
+        {"id": page.id, "name": page.name, "created_at": page.created_at, **counts.get(page.id, _empty_status_counts())}
+        for page in pages
+    ]
+
+class InvalidTransition(Exception):
+    """The task or subtask is in a status it may not move from."""
+    def __init__(self, current_status, target_status):
+        self.current_status = current_status
+        self.target_status = target_status
+        super().__init__(f"Cannot move from '{current_status.value}' to '{target_status.value}'")
+
+# Target status -> statuses a task may move into it from
+TASK_TRANSITIONS = {
+    models.TaskStatus.in_progress: (models.TaskStatus.pending,),
+    models.TaskStatus.completed: (models.TaskStatus.pending, models.TaskStatus.in_progress),
+}
+
+def transition_tasks(db: Session, task_ids: List[int], status: models.TaskStatus):
+    """Moves tasks to `status` with one guarded UPDATE; returns (updated, conflicts, missing ids)."""
+    try:
+        now = datetime.utcnow()
+        values = {"status": status}
+        if status == models.TaskStatus.in_progress:
+            values["started_at"] = now
+        else:
+            values["started_at"] = func.coalesce(models.Task.started_at, now)
+            values["completed_at"] = now
+
+        tasks = db.scalars(
+            update(models.Task)
+            .where(models.Task.id.in_(task_ids), models.Task.status.in_(TASK_TRANSITIONS[status]), LIVE_TASK)
+            .values(**values)
+            .returning(models.Task)
+        ).all()
+        _count_transitions(db, now, status, tasks)
+        _log_changes_by_page(db, [(task.page_name, task.id) for task in tasks])
+        _commit(db)
+
+        conflicts, missing = _transition_misses(db, models.Task, task_ids, tasks, LIVE_TASK)
+        event_type = "task.started" if status == models.TaskStatus.in_progress else "task.completed"
+        for task in tasks:
+            _record_change(db, task.page_name, event_type, task=task, revision=db.info["revisions"][task.page_name])
+        return tasks, conflicts, missing
+    except SQLAlchemyError as e:
+        _rollback(db)
+        raise e
+
+def _count_transitions(db: Session, now: datetime, status: models.TaskStatus, tasks):
+    """task_daily_stats side of transition_tasks."""
+    counts, durations = {}, []
+    for task in tasks:
+        page = counts.setdefault(task.page_name, {})
+        if task.started_at == now:
+            page["started"] = page.get("started", 0) + 1
+        if status == models.TaskStatus.completed:
+            lead = (now - task.created_at).total_seconds()
+            cycle = (now - task.started_at).total_seconds()
+            page["completed"] = page.get("completed", 0) + 1
+            page["lead_seconds"] = page.get("lead_seconds", 0) + lead
+            page["cycle_seconds"] = page.get("cycle_seconds", 0) + cycle
+            durations += [(task.page_name, "lead", lead), (task.page_name, "cycle", cycle)]
+    _bump_daily_stats(db, now.date(), counts, durations)
+
+def _transition_misses(db: Session, model, ids: List[int], updated, visible):
+    """Splits the ids a guarded UPDATE missed into conflicts and missing ids."""
+    missed = set(ids) - {row.id for row in updated}
+    if not missed:
+        return {}, []
+    current = dict(db.query(model.id, model.status).filter(model.id.in_(missed), visible).all())
+    return current, sorted(missed - current.keys())
+
+def _transition_task(db: Session, task_id: int, status: models.TaskStatus):
+    tasks, conflicts, _ = transition_tasks(db, [task_id], status)
+    if conflicts:
+        raise InvalidTransition(conflicts[task_id], status)
+    return tasks[0] if tasks else None
+
+def start_task(db: Session, task_id: int):
+    return _transition_task(db, task_id, models.TaskStatus.in_progress)
+
+def complete_task(db: Session, task_id: int):
+    return _transition_task(db, task_id, models.TaskStatus.completed)
+
+def _hide_tasks(db: Session, column, now: datetime, *criteria):
+    """Sets `column` (deleted_at or archived_at) on the matching live tasks; returns them."""
+    tasks = db.scalars(
+        update(models.Task)
+        .where(LIVE_TASK, *criteria)
+        .values({column: now})
+        .returning(models.Task)
+        .execution_options(synchronize_session=False)
+    ).all()
+    removed = {}
+    for task in tasks:
+        if task.status != models.TaskStatus.completed:
+            removed[task.page_name] = removed.get(task.page_name, 0) + 1
+    _bump_daily_stats(db, now.date(), {page_name: {"removed": count} for page_name, count in removed.items()})
+    _log_changes_by_page(db, [(task.page_name, task.id) for task in tasks], deleted=True)
+    return tasks
+
 def delete_task(db: Session, task_id: int):
+    """Soft-deletes a task. Its row and subtasks stay until the purge."""
+    try:
+        tasks = _hide_tasks(db, "deleted_at", datetime.utcnow(), models.Task.id == task_id)
+        if not tasks:
+            return None
+        _commit(db)
+        _record_change(db, tasks[0].page_name, "task.deleted", task_id=task_id, revision=db.info["revision"])
+        return tasks[0]
+    except SQLAlchemyError as e:
+        _rollback(db)
+        raise e
+
+def _hide_page_tasks(db: Session, column: str, event_type: str, page_name: str, status: Optional[models.TaskStatus]):
+    try:
+        criteria = [models.Task.page_id == _page_id(db, page_name)]
+        if status is not None:
+            criteria.append(models.Task.status == status)
+        task_ids = [task.id for task in _hide_tasks(db, column, datetime.utcnow(), *criteria)]
+        if not task_ids:
+            return [], None
+        _commit(db)
+        revision = db.info["revision"]
+        _record_change(db, page_name, event_type, task_ids=task_ids, revision=revision)
+        return task_ids, revision
+    except SQLAlchemyError as e:
+        _rollback(db)
+        raise e
+
+def delete_page_tasks(db: Session, page_name: str, status: Optional[models.TaskStatus] = None):
+    """Soft-deletes a page's tasks (or those in `status`); returns (task ids, revision)."""
+    return _hide_page_tasks(db, "deleted_at", "task.bulk_deleted", page_name, status)
+
+def archive_page_tasks(db: Session, page_name: str, status: Optional[models.TaskStatus] = models.TaskStatus.completed):
+    """Archives a page's tasks in place (completed ones by default); returns (task ids, revision)."""
+    return _hide_page_tasks(db, "archived_at", "task.bulk_archived", page_name, status)
+
+def _foreign_keys_enforced(db: Session) -> bool:
+    if db.get_bind().dialect.name != "sqlite":
+        return True
+    return bool(db.execute(text("PRAGMA foreign_keys")).scalar())
+
+def _delete_cascades(db: Session, task_ids: List[int]):
+    """Deletes what ON DELETE CASCADE would, for SQLite without foreign_keys=ON."""
+    db.execute(delete(models.Subtask).where(models.Subtask.task_id.in_(task_ids)))
+    db.execute(
+        delete(models.TaskDependency).where(
+            or_(models.TaskDependency.task_id.in_(task_ids), models.TaskDependency.depends_on_id.in_(task_ids))
+        )
+    )
+
+def purge_deleted_tasks(db: Session, older_than: timedelta, batch_size: int = 500) -> int:
+    """Hard-deletes tasks soft-deleted over `older_than` ago, in batches; returns the count."""
+    cutoff = datetime.utcnow() - older_than
+    cascades = _foreign_keys_enforced(db)
+    purged = 0
     try:
-        task = db.query(models.Task).filter(models.Task.id == task_id).first()
-        if task:
-            db.delete(task)
+        while True:
+            task_ids = db.scalars(
+                select(models.Task.id)
+                .where(models.Task.deleted_at < cutoff)
+                .order_by(models.Task.deleted_at)
+                .limit(batch_size)
+            ).all()
+            if not task_ids:
+                return purged
+            if not cascades:
+                _delete_cascades(db, task_ids)
+            db.execute(delete(models.Task).where(models.Task.id.in_(task_ids)))
             db.commit()
-        return task
+            purged += len(task_ids)
     except SQLAlchemyError as e:
         db.rollback()
         raise e
@@ -85,53 +903,67 @@ def create_subtask(db: Session, subtask: schemas.SubtaskCreate, task_id: int):
     try:
         db_subtask = models.Subtask(**subtask.model_dump(), task_id=task_id)
         db.add(db_subtask)
-        db.commit()
-        db.refresh(db_subtask)
+        db.flush()
+        page_name = db_subtask.task.page_name
+        _refresh_rollups(db, [task_id])
+        _log_change(db, page_name, [task_id])
+        _commit(db)
+        _record_change(db, page_name, "subtask.created", subtask=db_subtask, revision=db.info["revision"])
         return db_subtask
     except SQLAlchemyError as e:
-        db.rollback()
+        _rollback(db)
         raise e
 
-def update_subtask_status(db: Session, subtask_id: int, status: str):
+def transition_subtasks(db: Session, subtask_ids: List[int], status: models.SubtaskStatus):
+    """Subtask counterpart of transition_tasks."""
     try:
-        subtask = db.query(models.Subtask).filter(models.Subtask.id == subtask_id).first()
-        if subtask:
-            # Convert string status to enum
-            if status == "Pending":
-                subtask.status = models.SubtaskStatus.pending
-                # Reset dates when going back to pending
-                subtask.started_at = None
-                subtask.completed_at = None
-            elif status == "In progress":
-                subtask.status = models.SubtaskStatus.in_progress
-                # Set started_at if not already set
-                if not subtask.started_at:
-                    subtask.started_at = datetime.utcnow()
-                # Clear completed_at if it was set
-                subtask.completed_at = None
-            elif status == "Completed":
-                subtask.status = models.SubtaskStatus.completed
-                # Set started_at if not already set
-                if not subtask.started_at:
-                    subtask.started_at = datetime.utcnow()
-                # Set completed_at
-                subtask.completed_at = datetime.utcnow()
-            
-            subtask.updated_at = datetime.utcnow()
-            db.commit()
-            db.refresh(subtask)
-        return subtask
+        now = datetime.utcnow()
+        values = {"status": status, "updated_at": now}
+        if status == models.SubtaskStatus.pending:
+            values["started_at"] = None
+            values["completed_at"] = None
+        else:
+            values["started_at"] = func.coalesce(models.Subtask.started_at, now)
+            values["completed_at"] = now if status == models.SubtaskStatus.completed else None
+
+        subtasks = db.scalars(
+            update(models.Subtask)
+            .where(models.Subtask.id.in_(subtask_ids), models.Subtask.status != status, SUBTASK_OF_LIVE_TASK)
+            .values(**values)
+            .returning(models.Subtask)
+        ).all()
+        # Keeps the parents in the identity map for subtask.task below
+        tasks = {task.id: task for task in _refresh_rollups(db, sorted({subtask.task_id for subtask in subtasks}))}
+        _log_changes_by_page(db, [(tasks[subtask.task_id].page_name, subtask.task_id) for subtask in subtasks])
+        _commit(db)
+
+        conflicts, missing = _transition_misses(db, models.Subtask, subtask_ids, subtasks, SUBTASK_OF_LIVE_TASK)
+        for subtask in subtasks:
+            page_name = subtask.task.page_name
+            _record_change(db, page_name, "subtask.updated", subtask=subtask, revision=db.info["revisions"][page_name])
+        return subtasks, conflicts, missing
     except SQLAlchemyError as e:
-        db.rollback()
+        _rollback(db)
         raise e
+
+def update_subtask_status(db: Session, subtask_id: int, status: str):
+    status = models.SubtaskStatus(status)
+    subtasks, conflicts, _ = transition_subtasks(db, [subtask_id], status)
+    if conflicts:
+        raise InvalidTransition(conflicts[subtask_id], status)
+    return subtasks[0] if subtasks else None
     
 def delete_subtask(db: Session, subtask_id: int):
     try:
-        subtask = db.query(models.Subtask).filter(models.Subtask.id == subtask_id).first()
+        subtask = db.query(models.Subtask).filter(models.Subtask.id == subtask_id, SUBTASK_OF_LIVE_TASK).first()
         if subtask:
+            page_name, task_id = subtask.task.page_name, subtask.task_id
             db.delete(subtask)
-            db.commit()
+            _refresh_rollups(db, [task_id])
+            _log_change(db, page_name, [task_id])
+            _commit(db)
+            _record_change(db, page_name, "subtask.deleted", task_id=task_id, subtask_id=subtask_id, revision=db.info["revision"])
         return subtask
     except SQLAlchemyError as e:
-        db.rollback()
-        raise e
\ No newline at end of file
+        _rollback(db)
+        raise e
@@ -5,19 +5,211 @@ Base:
     Adds ORM functionality to models (like .query, relationships, and more).
 Session:
     Makes a session instance from this configured class whenever you need to talk to the DB.
+AsyncSession:
+    Same database through the backend's asyncio driver (aiosqlite, asyncpg),
+    for the async FastAPI endpoints. The router reaches it through
+    get_async_db and the wrappers in async_crud.py.
+
+DATABASE_URL picks the backend: SQLite (the default file) or PostgreSQL.
+Nothing connects or touches the filesystem at import. The engines are created
+by init_engines(), which the app's lifespan calls and the session factories
+call on first use; `database.engine` and `database.async_engine` do the same.
 """
 import os
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
-import os
+from .metrics import metrics
 
 DB_DIR = "./database"
-os.makedirs(DB_DIR, exist_ok=True)  # Ensure the directory exists!
-DATABASE_URL = f"sqlite:///{os.path.join(DB_DIR, 'buraq_manager.db')}"
+DATABASE_URL = os.environ.get("DATABASE_URL") or f"sqlite:///{os.path.join(DB_DIR, 'buraq_manager.db')}"
+
+# Engine profiles, picked with DATABASE_PROFILE. "default" leaves SQLite as it
+# ships (rollback journal, synchronous=FULL, no busy timeout); "tuned" switches
+# to WAL so readers don't block the writer, waits on locks instead of failing
+# with "database is locked", and enforces foreign keys. Any pragma can be
+# overridden with SQLITE_<NAME>, e.g. SQLITE_BUSY_TIMEOUT=10000.
+SQLITE_PROFILES = {
+    "default": {},
+    "tuned": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,          # ms
+        "cache_size": -65536,          # negative = KiB, so 64 MiB
+        "mmap_size": 268435456,        # 256 MiB
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+}
+DATABASE_PROFILE = os.environ.get("DATABASE_PROFILE", "tuned")
+
+def sqlite_pragmas(profile: str = DATABASE_PROFILE):
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name in SQLITE_PROFILES["tuned"]:
+        override = os.environ.get(f"SQLITE_{name.upper()}")
+        if override is not None:
+            pragmas[name] = override
+    return pragmas
+
+# Queue pools that report how long each checkout waited (including opening a
+# new connection when the pool has none idle) to metrics
+class _TimedCheckout:
+    engine_label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe_pool_wait(self.engine_label, time.perf_counter() - started)
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+def is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+def _engine_options(url: str, poolclass=TimedQueuePool):
+    """
+    Pool policy: one shared connection for in-memory SQLite, a bounded queue
+    pool (DB_POOL_SIZE + DB_MAX_OVERFLOW, DB_POOL_TIMEOUT) otherwise. The
+    sizes are per engine and per worker process. Server databases also
+    check connections before use and recycle them after DB_POOL_RECYCLE
+    seconds, so restarts and idle timeouts on the server side don't surface
+    as request errors.
+    """
+    parsed = make_url(url)
+    if is_memory_sqlite(url):
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    options = {
+        "poolclass": poolclass,
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+    }
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["pool_pre_ping"] = True
+        options["pool_recycle"] = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    return options
+
+def _apply_pragmas(sync_engine, pragmas):
+    if not pragmas or sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def _instrument(sync_engine):
+    """Times every statement into metrics (and the current request's stats)."""
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        metrics.record_query(statement, time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def drop_query_timer(exception_context):
+        timers = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if timers:
+            timers.pop()
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+def _ensure_sqlite_dir(url: str):
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:"):
+        directory = os.path.dirname(parsed.database)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+def make_engine(url: str = DATABASE_URL, profile: str = DATABASE_PROFILE):
+    _ensure_sqlite_dir(url)
+    sync_engine = create_engine(url, **_engine_options(url))
+    _apply_pragmas(sync_engine, sqlite_pragmas(profile))
+    _instrument(sync_engine)
+    return sync_engine
+
+def make_async_engine(url: str, profile: str = DATABASE_PROFILE):
+    _ensure_sqlite_dir(url)
+    async_engine = create_async_engine(url, **_engine_options(url, TimedAsyncQueuePool))
+    _apply_pragmas(async_engine.sync_engine, sqlite_pragmas(profile))
+    _instrument(async_engine.sync_engine)
+    return async_engine
+
+# Async driver per backend, for URLs that name only the backend or a sync driver
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+def async_url(url: str) -> str:
+    """The same database through the backend's asyncio driver, e.g.
+    postgresql://... -> postgresql+asyncpg://..."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS or parsed.get_driver_name() == ASYNC_DRIVERS[backend]:
+        return url
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+
+# Session factories that create the engines the first time they are called
+class _LazySessionmaker(sessionmaker):
+    def __call__(self, **local_kw):
+        init_engines()
+        return super().__call__(**local_kw)
+
+class _LazyAsyncSessionmaker(async_sessionmaker):
+    def __call__(self, **local_kw):
+        init_engines()
+        return super().__call__(**local_kw)
+
+# Objects keep their loaded state after commit: every request does one unit
+# of work and then only serialises, so re-SELECTing them would be wasted
+SessionLocal = _LazySessionmaker(autoflush=False, autocommit=False, expire_on_commit=False)
+AsyncSessionLocal = _LazyAsyncSessionmaker(autoflush=False, expire_on_commit=False)
+
+_engines = {}
+
+def init_engines():
+    """Creates the sync and async engines once and binds the session
+    factories to them. Returns (engine, async_engine)."""
+    if not _engines:
+        _engines["sync"] = make_engine(DATABASE_URL)
+        _engines["async"] = make_async_engine(ASYNC_DATABASE_URL)
+        SessionLocal.configure(bind=_engines["sync"])
+        AsyncSessionLocal.configure(bind=_engines["async"])
+    return _engines["sync"], _engines["async"]
+
+async def dispose_engines():
+    """Closes the pooled connections. The engines stay usable and reconnect
+    on their next checkout."""
+    if _engines:
+        await _engines["async"].dispose()
+        _engines["sync"].dispose()
+
+def __getattr__(name):
+    # `engine` and `async_engine` used to be module globals created at import
+    if name == "engine":
+        return init_engines()[0]
+    if name == "async_engine":
+        return init_engines()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 Base = declarative_base()
 
@@ -26,4 +218,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,185 @@
+"""
+Task dependencies. Writes check for cycles in SQL; reads go through the
+in-process task_graph.TaskGraph, caught up from the change log.
+"""
+from sqlalchemy import delete, exists, func, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+from itertools import chain
+from typing import List, Optional
+from . import models, schemas
+from .crud import LIVE_TASK, _commit, _log_change, _record_change, _rollback, _upsert, get_revision
+from .task_graph import GraphNode, task_graphs
+
+
+# Advisory lock serialising the cycle checks on PostgreSQL
+DEPENDENCY_LOCK_KEY = 0x7461736B
+# Past this many changes since its revision the graph is reloaded whole
+GRAPH_RELOAD_CHANGES = 5000
+# Task ids per IN list when loading part of the graph
+GRAPH_CHUNK_SIZE = 500
+GRAPH_TASK_KINDS = ("ready", "blocked")
+
+class DependencyCycle(Exception):
+    """The dependency would make a task wait for itself."""
+    def __init__(self, task_id: int, depends_on_id: int):
+        self.task_id = task_id
+        self.depends_on_id = depends_on_id
+        if task_id == depends_on_id:
+            message = f"Task {task_id} can't depend on itself"
+        else:
+            message = f"Task {depends_on_id} already depends on task {task_id}, directly or through other tasks"
+        super().__init__(message)
+
+def _depends_on(db: Session, task_id: int, other_id: int) -> bool:
+    """Whether `task_id` waits for `other_id` through any chain of edges."""
+    edge = models.TaskDependency
+    reached = select(edge.depends_on_id.label("task_id")).where(edge.task_id == task_id).cte("reached", recursive=True)
+    reached = reached.union(select(edge.depends_on_id).join(reached, edge.task_id == reached.c.task_id))
+    return db.scalar(select(exists().where(reached.c.task_id == other_id)))
+
+def add_dependency(db: Session, task_id: int, depends_on_id: int):
+    """Makes `task_id` wait for `depends_on_id`; returns (task, added) or None. Raises DependencyCycle."""
+    try:
+        tasks = {
+            task.id: task
+            for task in db.scalars(select(models.Task).where(models.Task.id.in_({task_id, depends_on_id}), LIVE_TASK))
+        }
+        if task_id not in tasks or depends_on_id not in tasks:
+            return None
+        if task_id == depends_on_id:
+            raise DependencyCycle(task_id, depends_on_id)
+        task = tasks[task_id]
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(select(func.pg_advisory_xact_lock(DEPENDENCY_LOCK_KEY)))
+        # On SQLite the insert takes the write lock before the cycle check commits
+        added = db.scalar(
+            _upsert(db, models.TaskDependency.__table__)
+            .values(task_id=task_id, depends_on_id=depends_on_id, created_at=datetime.utcnow())
+            .on_conflict_do_nothing()
+            .returning(models.TaskDependency.task_id)
+        )
+        if added is None:
+            _commit(db)
+            return task, False
+        if _depends_on(db, depends_on_id, task_id):
+            _rollback(db)
+            raise DependencyCycle(task_id, depends_on_id)
+        _log_change(db, task.page_name, [task_id])
+        _commit(db)
+        _record_change(
+            db, task.page_name, "task.dependency_added",
+            task_id=task_id, depends_on_id=depends_on_id, revision=db.info["revision"],
+        )
+        return task, True
+    except SQLAlchemyError as e:
+        _rollback(db)
+        raise e
+
+def remove_dependency(db: Session, task_id: int, depends_on_id: int):
+    """Removes the edge; returns the dependent task, or None if there was none."""
+    try:
+        removed = db.scalar(
+            delete(models.TaskDependency)
+            .where(models.TaskDependency.task_id == task_id, models.TaskDependency.depends_on_id == depends_on_id)
+            .returning(models.TaskDependency.task_id)
+        )
+        if removed is None:
+            _commit(db)
+            return None
+        task = db.get(models.Task, task_id)
+        _log_change(db, task.page_name, [task_id])
+        _commit(db)
+        _record_change(
+            db, task.page_name, "task.dependency_removed",
+            task_id=task_id, depends_on_id=depends_on_id, revision=db.info["revision"],
+        )
+        return task
+    except SQLAlchemyError as e:
+        _rollback(db)
+        raise e
+
+def _graph_nodes(db: Session, criteria) -> dict:
+    """task id -> GraphNode for the live tasks matching `criteria`."""
+    rows = db.execute(
+        select(models.Task.id, models.Task.page_name, models.Task.status, models.Task.started_at, models.Task.completed_at)
+        .where(criteria, LIVE_TASK)
+    )
+    nodes = {}
+    for task_id, page_name, status, started_at, completed_at in rows:
+        seconds = 0.0
+        if status == models.TaskStatus.completed and started_at and completed_at:
+            seconds = (completed_at - started_at).total_seconds()
+        nodes[task_id] = GraphNode(page_name, status.value, seconds)
+    return nodes
+
+def _task_graph(db: Session):
+    """The engine's TaskGraph, caught up with the change log. Never call it inside a write transaction."""
+    graph = task_graphs.get(db.get_bind())
+    edge = models.TaskDependency
+    if not graph.stale():
+        changes = db.execute(
+            select(models.TaskChange.id, models.TaskChange.task_id).where(models.TaskChange.id > graph.revision)
+        ).all()
+        if not changes:
+            return graph
+        if len(changes) <= GRAPH_RELOAD_CHANGES:
+            changed = [task_id for _, task_id in changes]
+            edges, ids = [], set(changed)
+            for start in range(0, len(changed), GRAPH_CHUNK_SIZE):
+                chunk = changed[start:start + GRAPH_CHUNK_SIZE]
+                rows = db.execute(
+                    select(edge.task_id, edge.depends_on_id)
+                    .where(or_(edge.task_id.in_(chunk), edge.depends_on_id.in_(chunk)))
+                ).all()
+                edges += rows
+                ids.update(chain.from_iterable(rows))
+            ids = sorted(ids)
+            nodes = {}
+            for start in range(0, len(ids), GRAPH_CHUNK_SIZE):
+                nodes.update(_graph_nodes(db, models.Task.id.in_(ids[start:start + GRAPH_CHUNK_SIZE])))
+            graph.apply(max(revision for revision, _ in changes), changed, nodes, edges)
+            return graph
+
+    # Read before the tables: a change committed meanwhile is applied again, harmlessly
+    revision = get_revision(db)
+    nodes = _graph_nodes(db, models.Task.id.in_(select(edge.task_id).union(select(edge.depends_on_id))))
+    graph.load(revision, nodes, db.execute(select(edge.task_id, edge.depends_on_id)).all())
+    return graph
+
+# What the graph reads return of each task: the schemas.TaskSummary fields
+GRAPH_TASK_FIELDS = tuple(schemas.TaskSummary.model_fields)
+
+def _tasks_by_id(db: Session, task_ids: List[int]):
+    """The live tasks among `task_ids`, in that order, as dicts."""
+    columns = [getattr(models.Task, name) for name in GRAPH_TASK_FIELDS]
+    tasks = {}
+    for start in range(0, len(task_ids), GRAPH_CHUNK_SIZE):
+        chunk = task_ids[start:start + GRAPH_CHUNK_SIZE]
+        for row in db.execute(select(*columns).where(models.Task.id.in_(chunk), LIVE_TASK)):
+            tasks[row.id] = dict(zip(GRAPH_TASK_FIELDS, row))
+    return [tasks[task_id] for task_id in task_ids if task_id in tasks]
+
+def get_dependencies(db: Session, task_id: int):
+    """(prerequisites, dependents, open prerequisites), or None if there is no such task."""
+    if db.scalar(select(models.Task.id).where(models.Task.id == task_id, LIVE_TASK)) is None:
+        return None
+    graph = _task_graph(db)
+    return (*graph.dependencies(task_id), graph.open_prerequisites(task_id))
+
+def get_graph_tasks(db: Session, kind: str, page_name: Optional[str] = None, after: Optional[int] = None, limit: int = 100):
+    """The "ready" or "blocked" tasks after id `after`; returns (tasks, next cursor or None)."""
+    if kind not in GRAPH_TASK_KINDS:
+        raise ValueError(f"kind must be one of {GRAPH_TASK_KINDS}, not {kind!r}")
+    graph = _task_graph(db)
+    task_ids, more = graph.tasks(kind, page_name, after, limit)
+    tasks = _tasks_by_id(db, task_ids)
+    for task in tasks:
+        task["blocked_by"] = graph.open_prerequisites(task["id"]) if kind == "blocked" else []
+    return tasks, task_ids[-1] if more else None
+
+def get_critical_path(db: Session):
+    """(seconds, tasks) of the heaviest dependency chain."""
+    seconds, task_ids = _task_graph(db).critical_path()
+    return seconds, _tasks_by_id(db, task_ids)
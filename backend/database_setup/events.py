@@ -0,0 +1,84 @@
+"""
+In-process change feed for task and subtask mutations.
+
+crud.py publishes an event after every committed mutation. ChangeBroker fans
+each event out to the asyncio queues of the subscribers of that page's channel
+and of the ALL_PAGES channel. The SSE endpoints in the router drain those
+queues.
+
+Backpressure: every subscriber queue is bounded. When a slow client's queue is
+full, its pending events are dropped and replaced by one "resync" event, which
+tells the client to reload the page instead of applying deltas. Publishing never
+blocks and memory per subscriber stays bounded.
+"""
+from typing import Optional
+import asyncio
+import itertools
+import os
+import threading
+
+from .cache import ALL_PAGES
+
+
+class Subscription:
+    def __init__(self, channel: str, maxsize: int):
+        self.channel = channel
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+
+class ChangeBroker:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._channels = {}  # channel -> set of Subscription
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str = ALL_PAGES) -> Subscription:
+        """Must be called from the event loop that will consume the events."""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(channel, self.queue_size)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def has_subscribers(self, page_name: str) -> bool:
+        return bool(self._channels.get(page_name) or self._channels.get(ALL_PAGES))
+
+    def publish(self, page_name: str, event: dict):
+        """Thread-safe; callable from crud code running on or off the loop."""
+        if self._loop is None or not self.has_subscribers(page_name):
+            return
+        event = {"id": next(self._sequence), "page_name": page_name, **event}
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._deliver(page_name, event)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._deliver, page_name, event)
+
+    def _deliver(self, page_name: str, event: dict):
+        with self._lock:
+            subscribers = list(self._channels.get(page_name, ())) + list(self._channels.get(ALL_PAGES, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.dropped += subscription.queue.qsize()
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait({"id": event["id"], "type": "resync", "page_name": page_name})
+
+
+change_broker = ChangeBroker(int(os.environ.get("CHANGE_FEED_QUEUE_SIZE", 100)))
@@ -0,0 +1,205 @@
+"""
+In-process request and SQL metrics, rendered in the Prometheus text format.
+
+The engine hooks in database.py call record_query() for every statement and
+observe_pool_wait() for every pool checkout. The middleware in
+app/middleware.py opens a RequestStats per request with track_request() and
+calls observe_request() when the response is done. SQL run while a request is
+active is also added to its RequestStats: the per-request query counts, and
+the db part of the Server-Timing header. app/admission.py reports its
+concurrency limiters (queue wait, hold time, in flight, queue depth) and the
+reads it coalesced.
+
+Like the response cache, the numbers are per process.
+"""
+from contextvars import ContextVar
+from typing import Optional
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this (ms) are logged with their text
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 200))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def _labels(names, values) -> str:
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}" if pairs else ""
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = {}          # (method, route, status) -> count
+            self._durations = {}         # (method, route) -> Histogram
+            self._request_queries = {}   # (method, route) -> Histogram
+            self._request_db_seconds = {}  # (method, route) -> float
+            self._queries = 0
+            self._query_time = Histogram(LATENCY_BUCKETS)
+            self._slow_queries = 0
+            self._pool_waits = {}        # engine -> Histogram
+            self._admissions = {}        # (limiter, outcome) -> count
+            self._admission_waits = {}   # limiter -> Histogram
+            self._admission_holds = {}   # limiter -> Histogram
+            self._admission_load = {}    # limiter -> (in flight, queued)
+            self._coalesced = {"computed": 0, "shared": 0}
+
+    def track_request(self) -> RequestStats:
+        stats = RequestStats()
+        _request_stats.set(stats)
+        return stats
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self._requests[(method, route, status)] = self._requests.get((method, route, status), 0) + 1
+            self._durations.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self._request_queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            self._request_db_seconds[key] = self._request_db_seconds.get(key, 0.0) + stats.db_seconds
+
+    def record_query(self, statement: str, seconds: float):
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += seconds
+        slow = seconds * 1000 >= SLOW_QUERY_MS
+        with self._lock:
+            self._queries += 1
+            self._query_time.observe(seconds)
+            if slow:
+                self._slow_queries += 1
+        if slow:
+            logger.warning("Slow query (%.1f ms): %s", seconds * 1000, " ".join(statement.split()))
+
+    def observe_pool_wait(self, engine: str, seconds: float):
+        with self._lock:
+            self._pool_waits.setdefault(engine, Histogram(LATENCY_BUCKETS)).observe(seconds)
+
+    def observe_admission(self, limiter: str, outcome: str, waited: float):
+        """A request left the queue of `limiter` (app/admission.py): admitted,
+        or shed when the queue was full or it waited too long."""
+        with self._lock:
+            self._admissions[(limiter, outcome)] = self._admissions.get((limiter, outcome), 0) + 1
+            self._admission_waits.setdefault(limiter, Histogram(LATENCY_BUCKETS)).observe(waited)
+
+    def observe_admission_hold(self, limiter: str, seconds: float):
+        with self._lock:
+            self._admission_holds.setdefault(limiter, Histogram(LATENCY_BUCKETS)).observe(seconds)
+
+    def set_admission_load(self, limiter: str, in_flight: int, queued: int):
+        with self._lock:
+            self._admission_load[limiter] = (in_flight, queued)
+
+    def count_coalesced(self, shared: bool):
+        with self._lock:
+            self._coalesced["shared" if shared else "computed"] += 1
+
+    def render(self) -> str:
+        """The Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, label_names, label_values, hist):
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(label_names + ('le',), label_values + (bound,))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(label_names + ('le',), label_values + ('+Inf',))} {hist.count}")
+            lines.append(f"{name}_sum{_labels(label_names, label_values)} {hist.sum}")
+            lines.append(f"{name}_count{_labels(label_names, label_values)} {hist.count}")
+
+        with self._lock:
+            header("http_requests_total", "counter", "Requests served, by route template and status.")
+            for (method, route, status), count in sorted(self._requests.items()):
+                lines.append(f"http_requests_total{_labels(('method', 'route', 'status'), (method, route, status))} {count}")
+
+            header("http_request_duration_seconds", "histogram", "Request latency until the last body chunk.")
+            for key, hist in sorted(self._durations.items()):
+                histogram("http_request_duration_seconds", ("method", "route"), key, hist)
+
+            header("http_request_db_queries", "histogram", "SQL statements issued per request.")
+            for key, hist in sorted(self._request_queries.items()):
+                histogram("http_request_db_queries", ("method", "route"), key, hist)
+
+            header("http_request_db_seconds_total", "counter", "Time spent in SQL statements, by route.")
+            for key, seconds in sorted(self._request_db_seconds.items()):
+                lines.append(f"http_request_db_seconds_total{_labels(('method', 'route'), key)} {seconds}")
+
+            header("db_queries_total", "counter", "SQL statements executed.")
+            lines.append(f"db_queries_total {self._queries}")
+
+            header("db_query_duration_seconds", "histogram", "SQL statement execution time.")
+            histogram("db_query_duration_seconds", (), (), self._query_time)
+
+            header("db_slow_queries_total", "counter", f"SQL statements slower than {SLOW_QUERY_MS:g} ms.")
+            lines.append(f"db_slow_queries_total {self._slow_queries}")
+
+            header("db_pool_checkout_wait_seconds", "histogram", "Time to get a connection from the pool.")
+            for engine, hist in sorted(self._pool_waits.items()):
+                histogram("db_pool_checkout_wait_seconds", ("engine",), (engine,), hist)
+
+            header("admission_requests_total", "counter", "Requests that went through a concurrency limiter, by outcome.")
+            for (limiter, outcome), count in sorted(self._admissions.items()):
+                lines.append(f"admission_requests_total{_labels(('limiter', 'outcome'), (limiter, outcome))} {count}")
+
+            header("admission_queue_wait_seconds", "histogram", "Time spent queued for a limiter slot.")
+            for limiter, hist in sorted(self._admission_waits.items()):
+                histogram("admission_queue_wait_seconds", ("limiter",), (limiter,), hist)
+
+            header("admission_hold_seconds", "histogram", "Time a limiter slot was held.")
+            for limiter, hist in sorted(self._admission_holds.items()):
+                histogram("admission_hold_seconds", ("limiter",), (limiter,), hist)
+
+            header("admission_in_flight", "gauge", "Requests holding a limiter slot.")
+            for limiter, (in_flight, _) in sorted(self._admission_load.items()):
+                lines.append(f"admission_in_flight{_labels(('limiter',), (limiter,))} {in_flight}")
+
+            header("admission_queue_depth", "gauge", "Requests queued for a limiter slot.")
+            for limiter, (_, queued) in sorted(self._admission_load.items()):
+                lines.append(f"admission_queue_depth{_labels(('limiter',), (limiter,))} {queued}")
+
+            header("cached_reads_total", "counter", "Cache misses of cached reads: computed, or shared with an identical read in flight.")
+            for kind, count in sorted(self._coalesced.items()):
+                lines.append(f"cached_reads_total{_labels(('kind',), (kind,))} {count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
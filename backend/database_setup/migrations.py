@@ -0,0 +1,68 @@
+"""
+Schema management through Alembic (alembic.ini and alembic/ at the repository
+root), the only code path that creates or changes tables.
+
+SCHEMA_MODE picks what the app does with the schema when it starts (see the
+lifespan in app/main.py):
+    check    (default) compare the database's revision with the head
+             revision and refuse to start when they differ. One small
+             SELECT and no DDL, so any number of workers can do it at once.
+    upgrade  run `alembic upgrade head` first. Meant for a single process:
+             concurrent upgrades race on the DDL. run.py does this once
+             before it starts the server.
+    off      neither.
+"""
+import os
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from .database import DATABASE_URL
+
+ALEMBIC_INI = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini"))
+SCHEMA_MODES = ("check", "upgrade", "off")
+SCHEMA_MODE = os.environ.get("SCHEMA_MODE", "check")
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database isn't at the head revision of the migrations."""
+
+
+def alembic_config(url: str = DATABASE_URL) -> Config:
+    config = Config(ALEMBIC_INI)
+    # ini values are %-interpolated
+    config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    # Keep the app's logging setup instead of alembic.ini's
+    config.attributes["configure_logger"] = False
+    return config
+
+def head_revisions(config: Config = None) -> set:
+    return set(ScriptDirectory.from_config(config or alembic_config()).get_heads())
+
+def current_revisions(connection) -> set:
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+def verify_schema_revision(engine):
+    """Raises SchemaOutOfDate unless the database is at the head revision."""
+    expected = head_revisions()
+    with engine.connect() as connection:
+        current = current_revisions(connection)
+    if current != expected:
+        found = ", ".join(sorted(current)) or "no revision"
+        raise SchemaOutOfDate(
+            f"Database schema is at {found}, expected {', '.join(sorted(expected))}. "
+            "Run `alembic upgrade head` (or start once with SCHEMA_MODE=upgrade)."
+        )
+
+def upgrade_schema(url: str = DATABASE_URL):
+    command.upgrade(alembic_config(url), "head")
+
+def prepare_schema(engine, mode: str = SCHEMA_MODE):
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"SCHEMA_MODE must be one of {SCHEMA_MODES}, not {mode!r}")
+    if mode == "upgrade":
+        upgrade_schema(engine.url.render_as_string(hide_password=False))
+    elif mode == "check":
+        verify_schema_revision(engine)
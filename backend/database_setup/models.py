@@ -13,7 +13,7 @@ How enum.Enum and enum work together:
     Using it inside a SQLAlchemy Enum column, which enforces it at the DB level.
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, ForeignKey, Index
+from sqlalchemy import Boolean, Column, Date, Float, Integer, String, Text, DateTime, Enum, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -31,10 +31,24 @@ class SubtaskStatus(str, enum.Enum):
     in_progress = "In progress"
     completed = "Completed"
 
+class Page(Base):
+    """
+    The page registry. Tasks belong to a page through page_id, the key every
+    page-scoped query filters on; crud._page_id resolves route names to ids
+    through an in-process cache. task.page_name stays as the display copy
+    that responses, the change log and the analytics rollups carry.
+    """
+    __tablename__ = "page"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
 class Task(Base):
     __tablename__ = "task"
 
     id = Column(Integer, primary_key=True)
+    page_id = Column(Integer, ForeignKey("page.id"), nullable=False)
     page_name = Column(String, nullable=False)
     name = Column(String, nullable=False)
     description = Column(Text)
@@ -43,10 +57,56 @@ class Task(Base):
     started_at = Column(DateTime)
     completed_at = Column(DateTime)
 
-    subtasks = relationship("Subtask", back_populates="task", cascade="all, delete-orphan")
+    # Subtask rollups, kept in step by every subtask write in crud.py (see
+    # crud._refresh_rollups) so progress can be shown without the subtasks
+    subtask_total = Column(Integer, nullable=False, default=0, server_default="0")
+    subtask_pending = Column(Integer, nullable=False, default=0, server_default="0")
+    subtask_in_progress = Column(Integer, nullable=False, default=0, server_default="0")
+    subtask_completed = Column(Integer, nullable=False, default=0, server_default="0")
+    first_subtask_started_at = Column(DateTime)
+    last_subtask_completed_at = Column(DateTime)
+
+    # Hidden from every crud.py read once set (see crud.LIVE_TASK). Deleted
+    # rows are hard-deleted later by crud.purge_deleted_tasks; archived ones
+    # stay.
+    deleted_at = Column(DateTime)
+    archived_at = Column(DateTime)
+
+    # Subtask rows go with their task through the foreign key's ON DELETE
+    # CASCADE; passive_deletes stops the ORM from loading them to delete
+    # them one by one
+    subtasks = relationship("Subtask", back_populates="task", cascade="all, delete-orphan", passive_deletes=True)
 
     __table_args__ = (
         Index("idx_task_status", "status"),
+        # Page views filter by page_id (optionally status) and page through
+        # rows in (created_at, id) order, see crud._task_list_query. The
+        # status index only holds live tasks (crud.LIVE_TASK); it also
+        # carries the two (always NULL) columns of its condition, which
+        # SQLite needs for GET /pages to count from the index alone.
+        Index(
+            "idx_task_live_page_status",
+            "page_id",
+            "status",
+            "deleted_at",
+            "archived_at",
+            sqlite_where=text("deleted_at IS NULL AND archived_at IS NULL"),
+            postgresql_where=text("deleted_at IS NULL AND archived_at IS NULL"),
+        ),
+        Index("idx_task_page_id_created", "page_id", "created_at", "id"),
+        Index("idx_task_created", "created_at", "id"),
+        # The archival job picks the oldest completions first
+        Index("idx_task_status_completed", "status", "completed_at"),
+        # Only the few rows waiting for the purge are indexed
+        Index(
+            "idx_task_deleted_at",
+            "deleted_at",
+            sqlite_where=text("deleted_at IS NOT NULL"),
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+        # Ids are never handed out twice, so the ids of archived and purged
+        # tasks stay theirs (SQLite would otherwise reuse max(id) + 1)
+        {"sqlite_autoincrement": True},
     )
 
 class Subtask(Base):
@@ -66,4 +126,147 @@ class Subtask(Base):
 
     __table_args__ = (
         Index("idx_subtask_status", "status"),
+        # Relationship loads and cascades look subtasks up by their task
+        Index("idx_subtask_task_id", "task_id", "status"),
+        {"sqlite_autoincrement": True},
+    )
+
+class TaskDependency(Base):
+    """
+    An edge of the dependency graph: task `task_id` is blocked until task
+    `depends_on_id` completes. Edges may cross pages.
+    dependencies.add_dependency refuses any edge that would close a cycle. An edge goes with either task
+    (ON DELETE CASCADE), so it doesn't follow a task into the archive.
+    """
+    __tablename__ = "task_dependency"
+
+    task_id = Column(Integer, ForeignKey("task.id", ondelete="CASCADE"), primary_key=True)
+    depends_on_id = Column(Integer, ForeignKey("task.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # The primary key finds a task's prerequisites, this its dependents
+        Index("idx_task_dependency_depends_on", "depends_on_id", "task_id"),
+    )
+
+class TaskArchive(Base):
+    """
+    Cold tier: completed tasks that archive.archive_completed_tasks moved out
+    of `task` (same ids and columns) once they were old enough, so the hot
+    tables and their indexes only hold the working set. Only list requests
+    with include_archived=true read it; archive.restore_task moves a task
+    back.
+    """
+    __tablename__ = "task_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    page_id = Column(Integer, ForeignKey("page.id"), nullable=False)
+    page_name = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    description = Column(Text)
+    status = Column(Enum(TaskStatus), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    subtask_total = Column(Integer, nullable=False, default=0, server_default="0")
+    subtask_pending = Column(Integer, nullable=False, default=0, server_default="0")
+    subtask_in_progress = Column(Integer, nullable=False, default=0, server_default="0")
+    subtask_completed = Column(Integer, nullable=False, default=0, server_default="0")
+    first_subtask_started_at = Column(DateTime)
+    last_subtask_completed_at = Column(DateTime)
+    archived_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("idx_task_archive_page_created", "page_id", "created_at", "id"),
+        Index("idx_task_archive_created", "created_at", "id"),
+    )
+
+class SubtaskArchive(Base):
+    __tablename__ = "subtask_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    task_id = Column(Integer, ForeignKey("task_archive.id", ondelete="CASCADE"), nullable=False)
+    title = Column(String, nullable=False)
+    description = Column(Text)
+    status = Column(Enum(SubtaskStatus), nullable=False)
+    created_at = Column(DateTime)
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("idx_subtask_archive_task_id", "task_id"),
+    )
+
+class TaskArchiveStats(Base):
+    """Per page: what task_archive holds, kept in step by the archive and
+    restore paths so /tasks/analytics counts both tiers without reading the
+    archive."""
+    __tablename__ = "task_archive_stats"
+
+    page_name = Column(String, primary_key=True)
+    tasks = Column(Integer, nullable=False, default=0, server_default="0")
+    with_subtasks = Column(Integer, nullable=False, default=0, server_default="0")
+    subtasks_pending = Column(Integer, nullable=False, default=0, server_default="0")
+    subtasks_in_progress = Column(Integer, nullable=False, default=0, server_default="0")
+    subtasks_completed = Column(Integer, nullable=False, default=0, server_default="0")
+
+class TaskChange(Base):
+    """
+    Latest change per task, the feed behind /pages/{page_name}/tasks/changes.
+    The id doubles as the revision number: AUTOINCREMENT never hands out an id
+    twice, and a task's row is replaced (getting a new id) on every change, so
+    the table holds one row per task ever touched, delete tombstones included.
+    task_id has no foreign key on purpose: tombstones outlive their task.
+    """
+    __tablename__ = "task_change"
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False, unique=True)
+    page_name = Column(String, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("idx_task_change_page", "page_name", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+class TaskDailyStats(Base):
+    """
+    Per page and UTC day: tasks created, started, completed and deleted
+    while still open, plus summed lead time (created -> completed) and
+    cycle time (started -> completed) of that day's completions. Maintained
+    by the crud.py write paths and served by the /tasks/analytics/daily and
+    /durations endpoints; rebuild_analytics.py recomputes it from task.
+    """
+    __tablename__ = "task_daily_stats"
+
+    page_name = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    created = Column(Integer, nullable=False, default=0, server_default="0")
+    started = Column(Integer, nullable=False, default=0, server_default="0")
+    completed = Column(Integer, nullable=False, default=0, server_default="0")
+    removed = Column(Integer, nullable=False, default=0, server_default="0")
+    lead_seconds = Column(Float, nullable=False, default=0, server_default="0")
+    cycle_seconds = Column(Float, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        # Cross-page series read a range of days
+        Index("idx_task_daily_stats_day", "day"),
+    )
+
+class TaskDurationBucket(Base):
+    """Histogram of the day's lead/cycle times: completions per
+    crud.DURATION_BUCKETS bucket. Percentiles merge the window's buckets."""
+    __tablename__ = "task_duration_bucket"
+
+    page_name = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    kind = Column(String, primary_key=True)  # "lead" or "cycle"
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("idx_task_duration_bucket_day", "day"),
     )
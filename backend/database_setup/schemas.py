@@ -2,8 +2,8 @@
 The pydantic models are defined here
 """
 
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field, computed_field
+from typing import Annotated, Dict, Literal, Optional, List, Union
 from datetime import datetime
 from .models import TaskStatus, SubtaskStatus
 
@@ -76,4 +76,208 @@ class TaskResponse(TaskBase):
     page_name: str
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TaskSummary(BaseModel):
+    """A task without its subtasks: progress comes from the rollup columns."""
+    id: int
+    page_name: str
+    name: str
+    status: TaskStatus
+    created_at: datetime
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
+    subtask_total: int
+    subtask_pending: int
+    subtask_in_progress: int
+    subtask_completed: int
+    first_subtask_started_at: Optional[datetime]
+    last_subtask_completed_at: Optional[datetime]
+
+    @computed_field
+    @property
+    def progress(self) -> float:
+        """Share of completed subtasks, or 0/1 by task status without any."""
+        if self.subtask_total:
+            return self.subtask_completed / self.subtask_total
+        return 1.0 if self.status == TaskStatus.completed else 0.0
+
+    class Config:
+        from_attributes = True
+
+class GraphTask(TaskSummary):
+    """A task of the dependency graph, see /tasks/ready and /tasks/blocked."""
+    blocked_by: List[int] = []  # prerequisites not completed yet
+
+class GraphTaskPage(BaseModel):
+    items: List[GraphTask]
+    next_after: Optional[int] = None  # pass as ?after= for the next page
+
+class CriticalPath(BaseModel):
+    """The heaviest chain of dependencies, first task first. Completed tasks
+    weigh their cycle time (started_at -> completed_at), the others 0."""
+    seconds: float
+    tasks: List[TaskSummary]
+
+class TaskDependencies(BaseModel):
+    task_id: int
+    depends_on: List[int]
+    dependents: List[int]
+    blocked_by: List[int]
+
+class SubtaskSearchMatch(BaseModel):
+    id: int
+    title: str                  # highlighted
+    description: Optional[str]  # highlighted snippet
+
+class TaskSearchHit(BaseModel):
+    """One /tasks/search result, see crud.search_tasks."""
+    id: int
+    page_name: str
+    name: str                   # highlighted
+    description: Optional[str]  # highlighted snippet
+    status: TaskStatus
+    created_at: datetime
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
+    rank: float                 # bm25, lower is better
+    subtasks: List[SubtaskSearchMatch] = []
+
+class TaskSearchResults(BaseModel):
+    items: List[TaskSearchHit]
+    next_offset: Optional[int] = None
+
+class TaskPage(BaseModel):
+    """One page of a keyset-paginated task listing."""
+    items: List[TaskResponse]
+    next_page_token: Optional[str] = None
+
+class TaskSummaryPage(BaseModel):
+    items: List[TaskSummary]
+    next_page_token: Optional[str] = None
+
+class PageResponse(BaseModel):
+    """A page with its live tasks counted per status."""
+    id: int
+    name: str
+    created_at: datetime
+    total: int
+    pending: int
+    in_progress: int
+    completed: int
+
+
+class TaskTransitionResult(BaseModel):
+    """Outcome of a batch status change: tasks that moved, ids whose current
+    status didn't allow the move (with that status), and unknown ids.
+    `revisions` is the new revision of every page that changed."""
+    updated: List[TaskResponse]
+    conflicts: Dict[int, TaskStatus] = {}
+    not_found: List[int] = []
+    revisions: Dict[str, int] = {}
+
+
+class SubtaskTransitionResult(BaseModel):
+    updated: List[SubtaskResponse]
+    conflicts: Dict[int, SubtaskStatus] = {}
+    not_found: List[int] = []
+    revisions: Dict[str, int] = {}
+
+
+# Mutation responses. They keep the fields the endpoints always returned and
+# add the page revision plus whatever a client needs to patch its copy of the
+# page without refetching it.
+class TaskChange(TaskResponse):
+    revision: int
+
+
+class SubtaskChange(SubtaskResponse):
+    revision: int
+    task: TaskResponse  # the parent task with all of its subtasks
+
+
+class DeleteChange(BaseModel):
+    message: str
+    revision: int
+    page_name: str
+    deleted_task_id: Optional[int] = None
+    deleted_subtask_id: Optional[int] = None
+    task: Optional[TaskResponse] = None  # parent task after a subtask delete
+
+
+class PageBulkChange(BaseModel):
+    """Response of the page-level bulk delete and archive endpoints."""
+    message: str
+    page_name: str
+    task_ids: List[int]
+    revision: Optional[int] = None  # None when no task matched
+
+
+class DependencyChange(BaseModel):
+    """Response of the dependency add/remove endpoints. The change is
+    logged on the dependent task's page."""
+    task_id: int
+    depends_on_id: int
+    page_name: str
+    revision: Optional[int] = None  # None when the edge was already there
+
+class TaskChangesSince(BaseModel):
+    """Response of /pages/{page_name}/tasks/changes."""
+    page_name: str
+    since: int
+    revision: int
+    tasks: List[TaskResponse]
+    deleted_task_ids: List[int]
+
+
+# POST /batch, see batches.run_batch. Ids in an operation are ints, or "$n" for
+# the id of the task/subtask that operation n of the batch created or changed.
+BatchRef = Union[int, Annotated[str, Field(pattern=r"^\$\d+$")]]
+
+class BatchCreateTask(BaseModel):
+    op: Literal["create_task"]
+    page_name: str
+    task: TaskCreate
+
+class BatchCreateSubtask(BaseModel):
+    op: Literal["create_subtask"]
+    task_id: BatchRef
+    subtask: SubtaskCreate
+
+class BatchTaskOperation(BaseModel):
+    op: Literal["start_task", "complete_task", "delete_task"]
+    task_id: BatchRef
+
+class BatchUpdateSubtaskStatus(BaseModel):
+    op: Literal["update_subtask_status"]
+    subtask_id: BatchRef
+    status: SubtaskStatus
+
+class BatchDeleteSubtask(BaseModel):
+    op: Literal["delete_subtask"]
+    subtask_id: BatchRef
+
+BatchOperation = Annotated[
+    Union[BatchCreateTask, BatchCreateSubtask, BatchTaskOperation, BatchUpdateSubtaskStatus, BatchDeleteSubtask],
+    Field(discriminator="op"),
+]
+
+class BatchRequest(BaseModel):
+    # all_or_nothing: the first failure rolls the whole batch back.
+    # best_effort: failed operations are undone one by one, the rest commits.
+    mode: Literal["all_or_nothing", "best_effort"] = "all_or_nothing"
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=500)
+
+class BatchOperationResult(BaseModel):
+    index: int
+    op: str
+    status: Literal["ok", "failed", "rolled_back", "skipped"]
+    status_code: Optional[int] = None  # what the single-operation endpoint would have answered
+    result: Optional[Union[TaskChange, SubtaskChange, DeleteChange]] = None
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    mode: str
+    committed: bool
+    revisions: Dict[str, int] = {}  # new revision of every page that changed
+    results: List[BatchOperationResult]
@@ -0,0 +1,66 @@
+"""
+SQLite FTS5 full-text index over task names/descriptions and subtask
+titles/descriptions, behind GET /tasks/search (crud.search_tasks).
+
+task_fts and subtask_fts are external-content FTS5 tables: they index the
+text of the task and subtask rows without keeping a second copy of it. The
+triggers below keep them in sync on every INSERT/UPDATE/DELETE, whichever
+code path issues it (the ORM, the bulk INSERTs, the cascades or raw SQL).
+The status and rollup UPDATEs don't touch the indexed columns, so they
+don't fire them.
+
+The DDL runs right after the subtask table is created by create_all. The
+migration that introduced it (d2a8f61c9b35) runs the same statements and
+fills the tables with 'rebuild'. A batch migration that recreates task or
+subtask drops their triggers and has to run search_triggers(table) again.
+"""
+from sqlalchemy import DDL, event
+
+from . import models
+
+# Indexed text columns per table; the FTS table is "<table>_fts"
+SEARCH_COLUMNS = {
+    "task": ("name", "description"),
+    "subtask": ("title", "description"),
+}
+
+# unicode61 folds case and diacritics; the prefix indexes serve "word*"
+# queries, which search_tasks uses for the last word
+FTS_OPTIONS = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+
+
+def _table_ddl(table: str, columns):
+    return (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5("
+        f"{', '.join(columns)}, content='{table}', content_rowid='id', {FTS_OPTIONS})"
+    )
+
+def _trigger_ddl(table: str, columns):
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    remove = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    add = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {cols} ON {table} BEGIN {remove} {add} END",
+    ]
+
+def search_triggers(table: str):
+    """The trigger DDL keeping `table`'s FTS table in sync."""
+    return _trigger_ddl(table, SEARCH_COLUMNS[table])
+
+SEARCH_TABLES = [_table_ddl(table, columns) for table, columns in SEARCH_COLUMNS.items()]
+SEARCH_TRIGGERS = [ddl for table in SEARCH_COLUMNS for ddl in search_triggers(table)]
+
+
+def rebuild_search_index(connection):
+    """Re-reads every task and subtask row into the FTS tables."""
+    for table in SEARCH_COLUMNS:
+        connection.exec_driver_sql(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+
+
+for statement in SEARCH_TABLES + SEARCH_TRIGGERS:
+    event.listen(models.Subtask.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
@@ -0,0 +1,314 @@
+"""
+In-memory task dependency graph behind /tasks/ready, /tasks/blocked and
+/tasks/critical-path. It is kept per process and per engine, like
+cache.PageIds.
+
+dependencies._task_graph feeds it from the database and never mutates it
+inside a write transaction. The first read loads every live task that takes part in
+a dependency. After that, each read applies the task_change rows written
+since the graph's revision. Every write that matters logs one:
+  - start, complete, delete, archive and restore log the task itself
+  - adding or removing a dependency logs the dependent task
+So a read only reloads the tasks that changed and their edges, and every
+worker process converges on the same graph. A change the log can't show
+(a write outside the API, a row restored from a backup) would otherwise
+stay missed, so the graph is also loaded whole again once it is
+GRAPH_RELOAD_SECONDS old.
+
+Each apply only recomputes what the change can reach:
+  - open prerequisite counts, for the changed tasks and their dependents
+  - longest paths, for the tasks downstream of a change
+This is what keeps the reads fast on graphs with tens of thousands of tasks.
+
+A task weighs its recorded cycle time (started_at -> completed_at) once
+completed, and nothing before. The critical path is the heaviest chain of
+dependencies. Ties go to the chain with more tasks, so before anything is
+completed it is simply the longest chain.
+
+Only plain Python runs under the lock, never a query: reads on the event
+loop interleave at their database awaits, and must not block each other.
+"""
+from bisect import bisect_right
+from collections import deque
+from itertools import chain
+from typing import NamedTuple, Optional
+import heapq
+import os
+import threading
+import time
+import weakref
+
+
+class GraphNode(NamedTuple):
+    page_name: str
+    status: str     # models.TaskStatus value
+    seconds: float  # cycle time once completed, else 0
+
+
+COMPLETED = "Completed"
+PENDING = "Pending"
+
+# Age after which the next read loads the graph whole instead of catching up
+GRAPH_RELOAD_SECONDS = float(os.environ.get("GRAPH_RELOAD_SECONDS", 300))
+
+
+class TaskGraph:
+    def __init__(self):
+        self.revision = None  # task_change revision last applied, None until loaded
+        self.loaded_at = None  # time.monotonic() of the last full load
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._nodes = {}       # task id -> GraphNode, only tasks with edges
+        self._prereqs = {}     # task id -> ids it depends on
+        self._dependents = {}  # task id -> ids depending on it
+        self._open = {}        # task id -> prerequisites not completed
+        self._finish = {}      # task id -> (seconds, tasks) of the heaviest chain ending at it
+        self._via = {}         # task id -> prerequisite before it on that chain
+        self._order = {}       # task id -> position, lower than its dependents'
+        self._next_order = 0
+        self._heaviest = []    # heap of (-seconds, -tasks, id), stale entries popped lazily
+        self._ready = set()    # pending, every prerequisite completed
+        self._blocked = set()  # not completed, some prerequisite open
+        self._sorted = {}      # "ready"/"blocked" -> sorted ids, dropped when the set changes
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def stale(self) -> bool:
+        """Whether the graph is due for a full load."""
+        return self.loaded_at is None or time.monotonic() - self.loaded_at >= GRAPH_RELOAD_SECONDS
+
+    def load(self, revision: int, nodes: dict, edges):
+        """Replaces the whole graph: `nodes` maps task id -> GraphNode,
+        `edges` are (task id, prerequisite id) pairs."""
+        with self._lock:
+            if self.revision is not None and revision < self.revision:
+                return
+            self._reset()
+            self._add(nodes, edges, reorder=False)
+            touched = self._prune(nodes)
+            self._sort_topologically()
+            self._refresh_open(touched)
+            self._refresh_finish(touched)
+            self.revision = revision
+            self.loaded_at = time.monotonic()
+
+    def apply(self, revision: int, changed, nodes: dict, edges):
+        """
+        Brings the graph to `revision`: `changed` are the task ids logged
+        since the graph's revision. `edges` are every edge touching them
+        and `nodes` their live endpoints, the changed tasks included. A
+        changed task missing from `nodes` is gone (deleted or archived).
+        Does nothing if the graph is already at `revision` or later.
+        """
+        with self._lock:
+            if self.revision is not None and revision <= self.revision:
+                return
+            touched = set(changed)
+            for task_id in changed:
+                for prereq in self._prereqs.pop(task_id, ()):
+                    self._dependents.get(prereq, set()).discard(task_id)
+                    touched.add(prereq)
+                for dependent in self._dependents.pop(task_id, ()):
+                    self._prereqs.get(dependent, set()).discard(task_id)
+                    touched.add(dependent)
+                self._nodes.pop(task_id, None)
+            self._add(nodes, edges)
+            touched = self._prune(touched.union(nodes))
+            # Open counts follow the prerequisites' status
+            recount = set(touched)
+            for task_id in touched:
+                recount.update(self._dependents[task_id])
+            self._refresh_open(recount)
+            self._refresh_finish(touched)
+            self.revision = revision
+
+    def tasks(self, kind: str, page_name: Optional[str] = None, after: Optional[int] = None, limit: int = 100):
+        """
+        Ids of the "ready" or "blocked" tasks, ascending, after id `after`,
+        optionally only those on `page_name`. Returns (ids, whether there
+        are more).
+        """
+        with self._lock:
+            ids = self._sorted.get(kind)
+            if ids is None:
+                ids = self._sorted[kind] = sorted(self._ready if kind == "ready" else self._blocked)
+            start = bisect_right(ids, after) if after is not None else 0
+            found = []
+            for task_id in ids[start:]:
+                if page_name is None or self._nodes[task_id].page_name == page_name:
+                    if len(found) == limit:
+                        return found, True
+                    found.append(task_id)
+            return found, False
+
+    def open_prerequisites(self, task_id: int):
+        with self._lock:
+            return sorted(
+                prereq for prereq in self._prereqs.get(task_id, ())
+                if self._nodes[prereq].status != COMPLETED
+            )
+
+    def dependencies(self, task_id: int):
+        """(ids the task depends on, ids depending on it)."""
+        with self._lock:
+            return sorted(self._prereqs.get(task_id, ())), sorted(self._dependents.get(task_id, ()))
+
+    def critical_path(self):
+        """(seconds, task ids from first to last) of the heaviest chain."""
+        with self._lock:
+            heaviest = self._heaviest
+            while heaviest:
+                seconds, tasks, task_id = heaviest[0]
+                if self._finish.get(task_id) == (-seconds, -tasks):
+                    break
+                heapq.heappop(heaviest)
+            if not heaviest:
+                return 0.0, []
+            seconds, _, task_id = heaviest[0]
+            path = []
+            while task_id is not None:
+                path.append(task_id)
+                task_id = self._via[task_id]
+            path.reverse()
+            return -seconds, path
+
+    def _add(self, nodes: dict, edges, reorder: bool = True):
+        self._nodes.update(nodes)
+        for task_id in nodes:
+            self._prereqs.setdefault(task_id, set())
+            self._dependents.setdefault(task_id, set())
+            if task_id not in self._order:
+                self._order[task_id] = self._next_order
+                self._next_order += 1
+        for task_id, prereq in edges:
+            if task_id in self._nodes and prereq in self._nodes and prereq not in self._prereqs[task_id]:
+                self._prereqs[task_id].add(prereq)
+                self._dependents[prereq].add(task_id)
+                if reorder:
+                    self._reorder(task_id, prereq)
+
+    def _sort_topologically(self):
+        """Numbers every task so prerequisites come first (Kahn's algorithm)."""
+        waiting = {task_id: len(prereqs) for task_id, prereqs in self._prereqs.items()}
+        queue = deque(task_id for task_id, count in waiting.items() if not count)
+        self._order, self._next_order = {}, 0
+        while queue:
+            task_id = queue.popleft()
+            self._order[task_id] = self._next_order
+            self._next_order += 1
+            for dependent in self._dependents[task_id]:
+                waiting[dependent] -= 1
+                if not waiting[dependent]:
+                    queue.append(dependent)
+        # Only a cycle, which add_dependency never lets in, leaves any behind
+        for task_id in self._nodes.keys() - self._order.keys():
+            self._order[task_id] = self._next_order
+            self._next_order += 1
+
+    def _reorder(self, task_id: int, prereq: int):
+        """
+        Restores the order after the edge task_id -> prereq when the
+        prerequisite came later (Pearce-Kelly): only the tasks between the
+        two positions that depend on task_id, or that prereq depends on, are
+        renumbered, among the positions they already hold.
+        """
+        order = self._order
+        lower, upper = order[task_id], order[prereq]
+        if upper < lower:
+            return
+        forward = self._reach(task_id, self._dependents, lambda position: position < upper)
+        backward = self._reach(prereq, self._prereqs, lambda position: position > lower)
+        positions = sorted(order[task] for task in chain(forward, backward))
+        moved = sorted(backward, key=order.get) + sorted(forward, key=order.get)
+        for task, position in zip(moved, positions):
+            order[task] = position
+
+    def _reach(self, start: int, edges: dict, within) -> set:
+        reached, stack = set(), [start]
+        while stack:
+            task_id = stack.pop()
+            if task_id not in reached:
+                reached.add(task_id)
+                stack.extend(other for other in edges[task_id] if within(self._order[other]))
+        return reached
+
+    def _prune(self, task_ids) -> set:
+        """Drops those of `task_ids` left without an edge, which are no
+        longer part of the graph. Returns the others."""
+        kept = set()
+        for task_id in task_ids:
+            if self._prereqs.get(task_id) or self._dependents.get(task_id):
+                kept.add(task_id)
+            else:
+                self._drop(task_id)
+        return kept
+
+    def _drop(self, task_id: int):
+        for index in (self._nodes, self._prereqs, self._dependents, self._open, self._finish, self._via, self._order):
+            index.pop(task_id, None)
+        for members, kind in ((self._ready, "ready"), (self._blocked, "blocked")):
+            if task_id in members:
+                members.discard(task_id)
+                self._sorted.pop(kind, None)
+
+    def _refresh_open(self, task_ids):
+        nodes = self._nodes
+        for task_id in task_ids:
+            node = nodes.get(task_id)
+            if node is None:
+                continue
+            count = sum(1 for prereq in self._prereqs[task_id] if nodes[prereq].status != COMPLETED)
+            self._open[task_id] = count
+            self._classify(task_id, self._ready, "ready", node.status == PENDING and not count)
+            self._classify(task_id, self._blocked, "blocked", node.status != COMPLETED and count > 0)
+
+    def _classify(self, task_id: int, members: set, kind: str, member: bool):
+        if member != (task_id in members):
+            (members.add if member else members.discard)(task_id)
+            self._sorted.pop(kind, None)
+
+    def _refresh_finish(self, starts):
+        """Recomputes the heaviest chain ending at each of `starts`, then at
+        the dependents of every task whose chain changed, in topological
+        order so each task is computed once."""
+        order, finish_of = self._order, self._finish
+        queue = [(order[task_id], task_id) for task_id in set(starts) if task_id in self._nodes]
+        heapq.heapify(queue)
+        queued = {task_id for _, task_id in queue}
+        while queue:
+            _, task_id = heapq.heappop(queue)
+            queued.discard(task_id)
+            via = max(self._prereqs[task_id], key=lambda prereq: (finish_of.get(prereq, (0.0, 0)), -prereq), default=None)
+            seconds, tasks = finish_of.get(via, (0.0, 0))
+            finish = (seconds + self._nodes[task_id].seconds, tasks + 1)
+            if finish_of.get(task_id) == finish and self._via.get(task_id) == via:
+                continue
+            finish_of[task_id], self._via[task_id] = finish, via
+            heapq.heappush(self._heaviest, (-finish[0], -finish[1], task_id))
+            for dependent in self._dependents[task_id]:
+                if dependent not in queued:
+                    queued.add(dependent)
+                    heapq.heappush(queue, (order[dependent], dependent))
+        if len(self._heaviest) > 2 * len(finish_of) + 64:
+            self._heaviest = [(-seconds, -tasks, task_id) for task_id, (seconds, tasks) in finish_of.items()]
+            heapq.heapify(self._heaviest)
+
+
+class TaskGraphs:
+    """One TaskGraph per engine, created on first use."""
+    def __init__(self):
+        self._graphs = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, engine) -> TaskGraph:
+        with self._lock:
+            graph = self._graphs.get(engine)
+            if graph is None:
+                graph = self._graphs[engine] = TaskGraph()
+            return graph
+
+
+task_graphs = TaskGraphs()
@@ -0,0 +1,26 @@
+"""
+Hard-deletes tasks soft-deleted more than --hours ago (default
+PURGE_AFTER_HOURS), the same purge the app runs every
+PURGE_INTERVAL_SECONDS. For running it from cron with the in-app job off
+(PURGE_INTERVAL_SECONDS=0).
+"""
+from datetime import timedelta
+import argparse
+
+from database_setup.database import SessionLocal
+from database_setup import crud
+from app.background import PURGE_AFTER_HOURS, PURGE_BATCH_SIZE
+
+def purge_deleted(hours: float = PURGE_AFTER_HOURS):
+    db = SessionLocal()
+    try:
+        count = crud.purge_deleted_tasks(db, timedelta(hours=hours), PURGE_BATCH_SIZE)
+    finally:
+        db.close()
+    print(f"✓ Purged {count} deleted task(s)")
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hours", type=float, default=PURGE_AFTER_HOURS)
+    purge_deleted(parser.parse_args().hours)
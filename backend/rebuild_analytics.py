@@ -0,0 +1,23 @@
+"""
+Rebuilds the daily analytics tables (task_daily_stats and
+task_duration_bucket, see analytics.rebuild_daily_stats) from the task
+rows, and the archive tier counters (task_archive_stats).
+Run it once after the migration that adds them, and whenever they may
+have drifted, e.g. after tasks were edited outside the API.
+"""
+from database_setup.database import SessionLocal
+from database_setup import analytics, archive
+
+def rebuild_analytics():
+    db = SessionLocal()
+    try:
+        count = analytics.rebuild_daily_stats(db)
+        pages = archive.rebuild_archive_stats(db)
+    finally:
+        db.close()
+    print(f"✓ Rebuilt daily analytics: {count} page/day row(s)")
+    print(f"✓ Rebuilt archive counters: {pages} page(s)")
+    return count
+
+if __name__ == "__main__":
+    rebuild_analytics()
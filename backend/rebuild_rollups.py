@@ -0,0 +1,26 @@
+"""
+Recomputes the subtask rollup columns on task (see crud.rebuild_task_rollups)
+for rows that drifted from their subtasks, e.g. after subtasks were edited
+outside the API. `--check` only reports how many tasks are off.
+"""
+from database_setup.database import SessionLocal
+from database_setup import crud
+import sys
+
+def rebuild_rollups(dry_run: bool = False):
+    db = SessionLocal()
+    try:
+        count = crud.rebuild_task_rollups(db, dry_run=dry_run)
+    finally:
+        db.close()
+    if dry_run:
+        print(f"{count} task(s) have stale subtask rollups")
+    else:
+        print(f"✓ Rebuilt subtask rollups for {count} task(s)")
+    return count
+
+if __name__ == "__main__":
+    check = "--check" in sys.argv
+    stale = rebuild_rollups(dry_run=check)
+    if check and stale:
+        sys.exit(1)
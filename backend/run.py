@@ -1,5 +1,53 @@
+"""
+Starts the API with uvicorn after bringing the schema up to date.
+
+--workers (or WEB_CONCURRENCY) sets the number of worker processes, one per
+core is a good start. The schema is migrated once here, before any worker
+exists; the workers only check its revision. With more than one worker:
+  - SQLite must be a file in WAL mode (the "tuned" DATABASE_PROFILE): other
+    journal modes block every reader while a worker writes, and each worker
+    would get its own in-memory database. Writes from different workers
+    still take turns, waiting up to SQLITE_BUSY_TIMEOUT for the lock.
+  - DB_POOL_SIZE and DB_MAX_OVERFLOW apply per worker, so size them to stay
+    under the server's connection limit on PostgreSQL.
+  - the response cache validates entries against the database revision
+    (RESPONSE_CACHE_VERSIONS=database), since each worker has its own copy.
+  - the /events change feeds only carry the writes served by the same
+    worker; clients that need every change poll /tasks/changes?since=.
+"""
+import argparse
+import os
+import sys
+
 import uvicorn
-from app.main import app
+from sqlalchemy.engine import make_url
+
+from database_setup.database import DATABASE_URL, is_memory_sqlite, sqlite_pragmas
+from database_setup.migrations import upgrade_schema
+
+
+def check_multi_worker(url: str = DATABASE_URL):
+    """Exits with a message when `url` can't be shared by several processes."""
+    if make_url(url).get_backend_name() != "sqlite":
+        return
+    if is_memory_sqlite(url):
+        sys.exit("Several workers can't share an in-memory SQLite database; use a file or PostgreSQL")
+    if str(sqlite_pragmas().get("journal_mode", "")).upper() != "WAL":
+        sys.exit("Several workers on SQLite need WAL mode: DATABASE_PROFILE=tuned (or SQLITE_JOURNAL_MODE=WAL)")
+
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", 1)))
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        check_multi_worker()
+        # Inherited by the worker processes, read when they import the cache
+        os.environ.setdefault("RESPONSE_CACHE_VERSIONS", "database")
+
+    # Migrate once here; the app itself only checks the revision at startup
+    upgrade_schema()
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
@@ -0,0 +1,45 @@
+import asyncio
+
+import httpx
+
+from app.admission import ConcurrencyLimiter
+from app.routers import task as task_router
+from database_setup import async_crud, database
+from database_setup.cache import response_cache
+
+API = "/api/v1"
+
+
+def test_queued_heavy_reads_leave_connections_to_writers(app, database_url, monkeypatch):
+    # Two connections in all, one heavy read at a time
+    monkeypatch.setenv("DB_POOL_SIZE", "2")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "0.5")
+    async_engine = database.make_async_engine(database.async_url(database_url))
+    monkeypatch.setitem(database._engines, "async", async_engine)
+    database.AsyncSessionLocal.configure(bind=async_engine)
+    monkeypatch.setattr(task_router, "heavy_reads", ConcurrencyLimiter("heavy_reads", 1, 32, 10))
+    monkeypatch.setattr(response_cache, "version_source", "database")
+
+    get_task_analytics = async_crud.get_task_analytics
+
+    async def slow_analytics(db):
+        await asyncio.sleep(0.5)
+        return await get_task_analytics(db)
+
+    monkeypatch.setattr(async_crud, "get_task_analytics", slow_analytics)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Distinct queries, so single_flight doesn't merge them
+            reads = [asyncio.create_task(client.get(f"{API}/tasks/analytics", params={"n": n})) for n in range(4)]
+            await asyncio.sleep(0.1)
+            created = await client.post(f"{API}/pages/Home/tasks", json={"name": "written"})
+            responses = await asyncio.gather(*reads)
+        await async_engine.dispose()
+        return created, responses
+
+    created, responses = asyncio.run(run())
+    assert created.status_code == 200
+    assert [response.status_code for response in responses] == [200] * 4
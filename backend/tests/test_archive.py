@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+import pytest
+from alembic import command
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from database_setup import archive, crud, models, schemas
+from database_setup.migrations import alembic_config
+
+API = "/api/v1"
+PAGE = "Home"
+
+
+def archive_tasks(db, *tasks):
+    """Completes `tasks` long enough ago and runs the archival job."""
+    for task in tasks:
+        crud.complete_task(db, task.id)
+    db.query(models.Task).filter(models.Task.id.in_([task.id for task in tasks])).update(
+        {models.Task.completed_at: datetime.utcnow() - archive.MIN_ARCHIVE_AGE - timedelta(days=1)}
+    )
+    db.commit()
+    return archive.archive_completed_tasks(db, archive.MIN_ARCHIVE_AGE)
+
+
+def test_archived_and_purged_ids_are_never_reused(db):
+    kept, purged, newest = [
+        crud.create_task(db, schemas.TaskCreate(name=name, subtasks=[{"title": "s"}]), PAGE)
+        for name in ("kept", "purged", "newest")
+    ]
+    newest_subtask_id = newest.subtasks[0].id
+    crud.delete_task(db, purged.id)
+    crud.purge_deleted_tasks(db, timedelta(0))
+    # The newest task moves to the archive like any other
+    assert archive_tasks(db, kept, newest) == 2
+
+    task = crud.create_task(db, schemas.TaskCreate(name="new", subtasks=[{"title": "s"}]), PAGE)
+    assert task.id > newest.id
+    assert task.subtasks[0].id > newest_subtask_id
+    ids = [row["id"] for row in crud.get_task_rows(db, PAGE, include_archived=True)]
+    assert sorted(ids) == [kept.id, newest.id, task.id]
+
+    assert archive.restore_task(db, newest.id).id == newest.id
+    assert archive.restore_task(db, kept.id).id == kept.id
+
+
+def test_restore_over_a_taken_id_is_a_conflict(client, db):
+    task = crud.create_task(db, schemas.TaskCreate(name="archived"), PAGE)
+    archive_tasks(db, task)
+    # As a database that reused ids before the AUTOINCREMENT migration
+    # would hold
+    db.execute(insert(models.Task).values(
+        id=task.id, page_name=PAGE, page_id=task.page_id, name="reused",
+        status=models.TaskStatus.pending, created_at=datetime.utcnow(),
+    ))
+    db.commit()
+
+    response = client.post(f"{API}/pages/{PAGE}/tasks/{task.id}/restore")
+    assert response.status_code == 409
+    assert db.get(models.TaskArchive, task.id) is not None
+
+
+@pytest.mark.parametrize("database_url", ["sqlite"], indirect=True)
+def test_migration_starts_ids_past_both_tiers(database_url, monkeypatch):
+    # alembic/env.py prefers DATABASE_URL over the configured url
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    config = alembic_config(database_url)
+    command.upgrade(config, "c3f7a1e05b92")
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO page (id, name, created_at) VALUES (1, 'Home', '2026-01-01')")
+        connection.exec_driver_sql(
+            "INSERT INTO task (id, page_name, page_id, name, status, created_at) "
+            "VALUES (3, 'Home', 1, 'live', 'pending', '2026-01-01')"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO task_archive (id, page_name, page_id, name, status, created_at, archived_at) "
+            "VALUES (9, 'Home', 1, 'archived', 'completed', '2026-01-01', '2026-02-01')"
+        )
+    command.upgrade(config, "head")
+
+    with Session(engine) as db:
+        task = crud.create_task(db, schemas.TaskCreate(name="new"), PAGE)
+        assert task.id == 10
+        # The rebuilt table kept its search triggers
+        hits, _ = crud.search_tasks(db, "new", page_name=PAGE)
+        assert [hit["id"] for hit in hits] == [task.id]
+    engine.dispose()
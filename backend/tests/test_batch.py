@@ -0,0 +1,144 @@
+from sqlalchemy import func, select
+
+from database_setup import batches, crud, models, schemas
+
+API = "/api/v1"
+PAGE = "Home"
+
+
+def run(client, mode, *operations):
+    return client.post(f"{API}/batch", json={"mode": mode, "operations": list(operations)})
+
+
+def create(name, **fields):
+    return {"op": "create_task", "page_name": PAGE, "task": {"name": name, **fields}}
+
+
+def outcomes(response):
+    return [(item["status"], item["status_code"]) for item in response.json()["results"]]
+
+
+def task_names(db):
+    return db.scalars(select(models.Task.name).order_by(models.Task.id)).all()
+
+
+def test_all_or_nothing_rolls_back_on_the_first_failure(client, db):
+    existing = crud.create_task(db, schemas.TaskCreate(name="existing"), PAGE)
+    response = run(
+        client, "all_or_nothing",
+        create("a"),
+        {"op": "create_subtask", "task_id": "$0", "subtask": {"title": "s"}},
+        {"op": "start_task", "task_id": existing.id},
+        {"op": "complete_task", "task_id": 999999},
+        {"op": "start_task", "task_id": "$0"},
+    )
+    # The failed operation's own status code
+    assert response.status_code == 404
+    body = response.json()
+    assert body["committed"] is False
+    assert body["revisions"] == {}
+    assert outcomes(response) == [
+        ("rolled_back", None), ("rolled_back", None), ("rolled_back", None), ("failed", 404), ("skipped", None),
+    ]
+    assert body["results"][3]["error"] == "Task not found"
+
+    db.expire_all()
+    assert task_names(db) == ["existing"]
+    assert db.get(models.Task, existing.id).status == models.TaskStatus.pending
+    assert crud.get_revision(db, PAGE) == 1
+
+
+def test_best_effort_keeps_what_succeeded(client, db):
+    response = run(
+        client, "best_effort",
+        create("a", subtasks=[{"title": "s"}]),
+        create("b"),
+        {"op": "start_task", "task_id": "$0"},
+        {"op": "start_task", "task_id": "$0"},
+        {"op": "complete_task", "task_id": 999999},
+        {"op": "update_subtask_status", "subtask_id": 999999, "status": "Completed"},
+        {"op": "complete_task", "task_id": "$1"},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["committed"] is True
+    assert outcomes(response) == [
+        ("ok", 200), ("ok", 200), ("ok", 200), ("failed", 409), ("failed", 404), ("failed", 404), ("ok", 200),
+    ]
+    assert body["results"][3]["error"] == "Cannot move from 'In progress' to 'In progress'"
+    # Every change set carries the revision the page had after it
+    revisions = [item["result"]["revision"] for item in body["results"] if item["status"] == "ok"]
+    assert revisions == sorted(revisions)
+    assert body["revisions"] == {PAGE: revisions[-1]} == {PAGE: crud.get_revision(db, PAGE)}
+
+    db.expire_all()
+    a, b = db.scalars(select(models.Task).order_by(models.Task.id)).all()
+    assert (a.status, b.status) == (models.TaskStatus.in_progress, models.TaskStatus.completed)
+    assert [subtask.title for subtask in a.subtasks] == ["s"]
+
+
+def test_a_failed_operation_is_undone_up_to_its_savepoint(client, db, monkeypatch):
+    # A create that fails after its INSERT leaves no row behind
+    def create_or_fail(db, operation, ids):
+        task = crud.create_task(db, operation.task, operation.page_name)
+        if task.name == "bad":
+            raise ValueError("rejected after the insert")
+        return task
+
+    monkeypatch.setitem(batches.BATCH_OPERATIONS, "create_task", create_or_fail)
+    response = run(client, "best_effort", create("a"), create("bad"), create("c"))
+    assert outcomes(response) == [("ok", 200), ("failed", 400), ("ok", 200)]
+    db.expire_all()
+    assert task_names(db) == ["a", "c"]
+    assert db.scalar(select(func.count()).select_from(models.TaskChange)) == 2
+
+
+def test_references_to_other_operations(client, db):
+    response = run(
+        client, "best_effort",
+        {"op": "start_task", "task_id": "$1"},
+        create("a", subtasks=[{"title": "s"}]),
+        {"op": "complete_task", "task_id": "$0"},
+        {"op": "create_subtask", "task_id": "$1", "subtask": {"title": "t"}},
+        {"op": "update_subtask_status", "subtask_id": "$3", "status": "Completed"},
+        {"op": "delete_subtask", "subtask_id": "$4"},
+        {"op": "start_task", "task_id": "$9"},
+    )
+    assert outcomes(response) == [
+        ("failed", 400), ("ok", 200), ("failed", 400), ("ok", 200), ("ok", 200), ("ok", 200), ("failed", 400),
+    ]
+    errors = [item["error"] for item in response.json()["results"]]
+    assert errors[0] == "$1 refers to an operation that hasn't run yet"
+    assert errors[2] == "$0 refers to a failed operation"
+    assert errors[6] == "$9 refers to an operation that hasn't run yet"
+
+    db.expire_all()
+    task = db.scalars(select(models.Task)).one()
+    assert [subtask.title for subtask in task.subtasks] == ["s"]
+
+    response = client.post(f"{API}/batch", json={"operations": [{"op": "start_task", "task_id": "#1"}]})
+    assert response.status_code == 422
+
+
+def test_events_are_published_once_the_batch_commits(engine, db, monkeypatch):
+    published = []
+
+    def publish(page_name, event):
+        with engine.connect() as connection:
+            committed = connection.scalar(select(func.count()).select_from(models.Task))
+        published.append((event["type"], committed))
+
+    monkeypatch.setattr(crud.change_broker, "has_subscribers", lambda page_name: True)
+    monkeypatch.setattr(crud.change_broker, "publish", publish)
+    operations = schemas.BatchRequest(operations=[create("a"), create("b"), {"op": "start_task", "task_id": "$0"}])
+
+    results = batches.run_batch(db, operations.operations)
+    assert [status for status, _, _ in results] == [batches.BATCH_OK] * 3
+    # All three after the commit, none from inside the transaction
+    assert published == [("task.created", 2), ("task.created", 2), ("task.started", 2)]
+
+    published.clear()
+    operations = schemas.BatchRequest(operations=[create("c"), {"op": "start_task", "task_id": 999999}])
+    results = batches.run_batch(db, operations.operations)
+    assert [status for status, _, _ in results] == [batches.BATCH_ROLLED_BACK, batches.BATCH_FAILED]
+    assert published == []
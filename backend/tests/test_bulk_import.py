@@ -0,0 +1,65 @@
+import json
+
+from app.routers import task as task_router
+from database_setup import async_crud
+
+API = "/api/v1"
+PAGE = "Home"
+
+
+def ndjson(*rows):
+    return "\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows)
+
+
+def page_tasks(client):
+    return {task["name"]: task for task in client.get(f"{API}/pages/{PAGE}/tasks").json()}
+
+
+def test_null_subtasks_import_as_an_empty_list(client):
+    response = client.post(f"{API}/pages/{PAGE}/tasks:bulk", content=ndjson({"name": "a", "subtasks": None}))
+    assert response.status_code == 200
+    assert response.json() == {"created": 1, "failed": 0, "errors": []}
+    assert page_tasks(client)["a"]["subtasks"] == []
+
+
+def test_invalid_lines_are_reported_by_number(client):
+    body = ndjson(
+        {"name": "a", "subtasks": [{"title": "s"}]},
+        "{not json",
+        {"description": "no name"},
+        "",
+        {"name": "b", "subtasks": None},
+        {"name": "c", "subtasks": "s"},
+        {"name": "d"},
+    )
+    response = client.post(f"{API}/pages/{PAGE}/tasks:bulk", content=body)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["failed"]) == (3, 3)
+    assert [error["line"] for error in result["errors"]] == [2, 3, 6]
+
+    tasks = page_tasks(client)
+    assert sorted(tasks) == ["a", "b", "d"]
+    assert [subtask["title"] for subtask in tasks["a"]["subtasks"]] == ["s"]
+
+
+def test_a_failed_batch_keeps_the_committed_ones(client, monkeypatch):
+    monkeypatch.setattr(task_router, "BULK_BATCH_SIZE", 2)
+    bulk_create_tasks = async_crud.bulk_create_tasks
+
+    async def fail_second_batch(db, tasks, page_name):
+        if tasks[0].name == "c":
+            raise TypeError("unexpected row")
+        return await bulk_create_tasks(db, tasks, page_name)
+
+    monkeypatch.setattr(async_crud, "bulk_create_tasks", fail_second_batch)
+    body = ndjson(*({"name": name} for name in "abcde"))
+    response = client.post(f"{API}/pages/{PAGE}/tasks:bulk", content=body)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["failed"]) == (3, 2)
+    assert [(error["line"], error["error"]) for error in result["errors"]] == [
+        (3, "Error creating task: unexpected row"),
+        (4, "Error creating task: unexpected row"),
+    ]
+    assert sorted(page_tasks(client)) == ["a", "b", "e"]
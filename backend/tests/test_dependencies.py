@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from database_setup import crud, dependencies, models, schemas, task_graph
+
+PAGE = "Home"
+
+
+def test_graph_follows_the_change_log(db):
+    first, second, third = crud.bulk_create_tasks(db, [schemas.TaskCreate(name=name) for name in "abc"], PAGE)
+    dependencies.add_dependency(db, second, first)
+    assert dependencies.get_dependencies(db, second) == ([first], [], [first])
+
+    dependencies.add_dependency(db, third, second)
+    crud.complete_task(db, first)
+    ready, _ = dependencies.get_graph_tasks(db, "ready")
+    blocked, _ = dependencies.get_graph_tasks(db, "blocked")
+    assert [task["id"] for task in ready] == [second]
+    assert [task["id"] for task in blocked] == [third]
+    assert [task["id"] for task in dependencies.get_critical_path(db)[1]] == [first, second, third]
+
+
+def test_stale_graph_is_loaded_whole(db, monkeypatch):
+    first, second, third = crud.bulk_create_tasks(db, [schemas.TaskCreate(name=name) for name in "abc"], PAGE)
+    dependencies.add_dependency(db, second, first)
+    assert dependencies.get_dependencies(db, third) == ([], [], [])
+
+    # An edge written without a change log entry, which catching up misses
+    db.execute(insert(models.TaskDependency).values(task_id=third, depends_on_id=second, created_at=datetime.utcnow()))
+    db.commit()
+    assert dependencies.get_dependencies(db, third) == ([], [], [])
+
+    monkeypatch.setattr(task_graph, "GRAPH_RELOAD_SECONDS", 0)
+    assert dependencies.get_dependencies(db, third) == ([second], [], [second])
@@ -0,0 +1,109 @@
+"""
+EXPLAIN QUERY PLAN over every statement the crud.py paths issue: none may
+fall back to a full scan of task, subtask or task_change. Analytics and the
+first load of the dependency graph read whole tables on purpose and are
+left out. Queries added to crud.py get a case here.
+"""
+from datetime import datetime, timedelta
+import re
+
+import pytest
+from sqlalchemy import event
+
+from database_setup import analytics, archive, crud, dependencies, models, schemas
+
+PAGE = "Home"
+# A plan step like "SCAN task" or "SCAN task_1" (no "USING ... INDEX")
+FULL_SCAN = re.compile(r"^SCAN (task|subtask|task_change)(_\d+)?$")
+EXPLAINED = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+# EXPLAIN QUERY PLAN is SQLite's
+pytestmark = pytest.mark.parametrize("database_url", ["sqlite"], indirect=True)
+
+
+def archive_and_restore(db, seed):
+    crud.complete_task(db, seed["task"].id)
+    db.query(models.Task).filter(models.Task.id == seed["task"].id).update(
+        {models.Task.completed_at: datetime.utcnow() - archive.MIN_ARCHIVE_AGE - timedelta(days=1)}
+    )
+    db.commit()
+    archive.archive_completed_tasks(db, archive.MIN_ARCHIVE_AGE)
+    archive.restore_task(db, seed["task"].id)
+
+def graph_reads(db, seed):
+    dependencies.add_dependency(db, seed["task"].id, seed["other"].id)
+    dependencies.get_critical_path(db)
+    # Caught up from the change log from here on
+    crud.start_task(db, seed["other"].id)
+    dependencies.get_graph_tasks(db, "blocked")
+    dependencies.get_dependencies(db, seed["task"].id)
+    dependencies.remove_dependency(db, seed["task"].id, seed["other"].id)
+    dependencies.get_graph_tasks(db, "ready")
+
+def delete_and_purge(db, seed):
+    crud.delete_task(db, seed["task"].id)
+    crud.purge_deleted_tasks(db, timedelta(0))
+
+# name -> fn(db, seed), seed being the fixture below
+CASES = {
+    "page_list": lambda db, seed: crud.get_tasks_by_page(db, PAGE),
+    "page_list_status": lambda db, seed: crud.get_tasks_by_page(db, PAGE, status=models.TaskStatus.pending),
+    "page_list_cursor": lambda db, seed: crud.get_tasks_by_page(db, PAGE, cursor=seed["cursor"], limit=50),
+    "page_list_q": lambda db, seed: crud.get_tasks_by_page(db, PAGE, q="plan", limit=50),
+    "all_list": lambda db, seed: crud.get_tasks(db, limit=50),
+    "all_list_cursor": lambda db, seed: crud.get_tasks(db, cursor=seed["cursor"], limit=50),
+    "task_rows": lambda db, seed: crud.get_task_rows(db, PAGE, cursor=seed["cursor"], limit=50),
+    "task_rows_archived": lambda db, seed: crud.get_task_rows(db, PAGE, cursor=seed["cursor"], limit=50, include_archived=True),
+    "summaries_archived": lambda db, seed: crud.get_task_summaries(db, PAGE, limit=50, include_archived=True),
+    "task": lambda db, seed: crud.get_task(db, seed["task"].id).subtasks,
+    "export": lambda db, seed: list(crud.iter_task_export(db, PAGE)),
+    "changes_since": lambda db, seed: crud.get_task_changes(db, PAGE, 1),
+    "search": lambda db, seed: crud.search_tasks(db, "plan", page_name=PAGE),
+    "pages": lambda db, seed: crud.get_pages(db),
+    "create_task": lambda db, seed: crud.create_task(db, schemas.TaskCreate(name="new", subtasks=[{"title": "s"}]), PAGE),
+    "transitions": lambda db, seed: (crud.start_task(db, seed["task"].id), crud.complete_task(db, seed["task"].id)),
+    "subtask_writes": lambda db, seed: (
+        crud.create_subtask(db, schemas.SubtaskCreate(title="more"), seed["task"].id),
+        crud.update_subtask_status(db, seed["subtask_id"], "Completed"),
+        crud.delete_subtask(db, seed["subtask_id"]),
+    ),
+    "page_delete": lambda db, seed: crud.delete_page_tasks(db, PAGE, models.TaskStatus.pending),
+    "page_archive": lambda db, seed: crud.archive_page_tasks(db, PAGE, models.TaskStatus.pending),
+    "delete_and_purge": delete_and_purge,
+    "archive_and_restore": archive_and_restore,
+    "daily_series": lambda db, seed: (analytics.get_daily_series(db, 30), analytics.get_daily_series(db, 30, PAGE)),
+    "duration_stats": lambda db, seed: analytics.get_duration_stats(db, 30),
+    "graph_reads": graph_reads,
+}
+
+
+@pytest.fixture
+def seed(db):
+    task = crud.create_task(db, schemas.TaskCreate(name="plan", subtasks=[{"title": "s"}]), PAGE)
+    other = crud.create_task(db, schemas.TaskCreate(name="prerequisite"), PAGE)
+    return {"task": task, "other": other, "subtask_id": task.subtasks[0].id, "cursor": crud.encode_cursor(task)}
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_queries_use_an_index(engine, db, seed, case):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(EXPLAINED):
+            # executemany gets a list of parameter sets, one explains them all
+            statements.append((statement, parameters[0] if isinstance(parameters, list) else parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        CASES[case](db, seed)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert statements
+
+    scans = []
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters):
+                if FULL_SCAN.match(row[-1]):
+                    scans.append(f"{row[-1]}: {' '.join(statement.split())}")
+    assert not scans
@@ -0,0 +1,92 @@
+from database_setup import crud, database, schemas
+from database_setup.cache import response_cache
+
+API = "/api/v1"
+PAGE = "Home"
+OTHER = "Other"
+
+
+def names(response):
+    return [task["name"] for task in response.json()]
+
+
+def test_etag_and_304(client, db, count_statements):
+    crud.create_task(db, schemas.TaskCreate(name="a"), PAGE)
+    url = f"{API}/pages/{PAGE}/tasks"
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    with count_statements(database.async_engine.sync_engine) as statements:
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        # Served from the cache
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.content == first.content
+    assert statements == []
+
+    assert client.post(url, json={"name": "b"}).status_code == 200
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert names(response) == ["a", "b"]
+
+
+def test_a_write_only_invalidates_its_page(client, db, count_statements):
+    for page in (PAGE, OTHER):
+        crud.create_task(db, schemas.TaskCreate(name=page), page)
+    urls = {scope: f"{API}/pages/{scope}/tasks" for scope in (PAGE, OTHER)}
+    urls["all"] = f"{API}/tasks/all"
+    etags = {scope: client.get(url).headers["etag"] for scope, url in urls.items()}
+
+    assert client.post(urls[OTHER], json={"name": "new"}).status_code == 200
+
+    with count_statements(database.async_engine.sync_engine) as statements:
+        response = client.get(urls[PAGE], headers={"If-None-Match": etags[PAGE]})
+        assert response.status_code == 304
+        assert client.get(urls[PAGE]).status_code == 200
+    assert statements == []
+
+    # The written page and the cross-page lists are recomputed
+    for scope in (OTHER, "all"):
+        response = client.get(urls[scope], headers={"If-None-Match": etags[scope]})
+        assert response.status_code == 200
+        assert "new" in names(response)
+
+
+def test_every_write_path_invalidates(client, db):
+    task = crud.create_task(db, schemas.TaskCreate(name="a", subtasks=[{"title": "s"}]), PAGE)
+    subtask_id = task.subtasks[0].id
+    url = f"{API}/pages/{PAGE}/tasks"
+    writes = [
+        lambda: client.put(f"{API}/pages/{PAGE}/tasks/{task.id}/start"),
+        lambda: client.put(f"{API}/subtasks/{subtask_id}/status", json={"status": "Completed"}),
+        lambda: client.post(f"{API}/tasks/{task.id}/subtasks", json={"title": "t"}),
+        lambda: client.post(f"{API}/pages/{PAGE}/tasks:bulk", content='{"name": "b"}'),
+        lambda: client.post(f"{API}/batch", json={"operations": [{"op": "complete_task", "task_id": task.id}]}),
+        lambda: client.delete(f"{API}/subtasks/{subtask_id}"),
+        lambda: client.delete(f"{API}/pages/{PAGE}/tasks/{task.id}"),
+    ]
+    for write in writes:
+        before = client.get(url)
+        assert write().status_code == 200
+        after = client.get(url, headers={"If-None-Match": before.headers["etag"]})
+        assert after.status_code == 200
+        assert after.content != before.content
+
+
+def test_database_versions_see_other_workers_writes(client, db, monkeypatch):
+    monkeypatch.setattr(response_cache, "version_source", "database")
+    crud.create_task(db, schemas.TaskCreate(name="a"), PAGE)
+    url = f"{API}/pages/{PAGE}/tasks"
+    first = client.get(url)
+    assert client.get(url, headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+    # A write served by another process doesn't invalidate this one's cache
+    monkeypatch.setattr(response_cache, "invalidate", lambda page_name: None)
+    crud.create_task(db, schemas.TaskCreate(name="b"), PAGE)
+    response = client.get(url, headers={"If-None-Match": first.headers["etag"]})
+    assert response.status_code == 200
+    assert names(response) == ["a", "b"]
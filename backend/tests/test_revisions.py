@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+from sqlalchemy.orm import Session
+
+from database_setup import crud, schemas
+
+PAGE = "Home"
+
+
+def test_every_write_gets_a_higher_revision(db):
+    task = crud.create_task(db, schemas.TaskCreate(name="task", subtasks=[{"title": "s"}]), PAGE)
+    revisions = [db.info["revision"]]
+    for write in (
+        lambda: crud.start_task(db, task.id),
+        lambda: crud.update_subtask_status(db, task.subtasks[0].id, "Completed"),
+        lambda: crud.complete_task(db, task.id),
+        lambda: crud.delete_task(db, task.id),
+    ):
+        write()
+        revisions.append(db.info["revision"])
+    assert revisions == sorted(set(revisions))
+    assert crud.get_revision(db, PAGE) == revisions[-1]
+    assert crud.get_task_changes(db, PAGE, revisions[-2]) == (revisions[-1], [], [task.id])
+
+
+@pytest.mark.parametrize("database_url", ["postgresql"], indirect=True)
+def test_revisions_become_visible_in_order(engine, db):
+    first_id, second_id = crud.bulk_create_tasks(db, [schemas.TaskCreate(name="a"), schemas.TaskCreate(name="b")], PAGE)
+    logged = threading.Event()
+
+    def log_second():
+        with Session(engine) as other:
+            crud._log_change(other, PAGE, [second_id])
+            other.commit()
+        logged.set()
+
+    # The first writer holds the lock until it commits, so the second draws
+    # its revision after the first one is visible
+    revision = crud._log_change(db, PAGE, [first_id])
+    writer = threading.Thread(target=log_second)
+    writer.start()
+    assert not logged.wait(0.5)
+    db.commit()
+    writer.join(5)
+    assert logged.is_set()
+    assert crud.get_revision(db, PAGE) > revision
@@ -0,0 +1,82 @@
+from sqlalchemy import func, select, update
+
+from database_setup import batches, crud, models, schemas
+from rebuild_rollups import rebuild_rollups
+
+PAGE = "Home"
+ROLLUP_COLUMNS = tuple(crud.ROLLUP_AGGREGATES)
+# What a task without subtasks holds
+NO_SUBTASKS = (0, 0, 0, 0, None, None)
+
+
+def rollups(db):
+    db.expire_all()
+    columns = [getattr(models.Task, column) for column in ROLLUP_COLUMNS]
+    return {row[0]: tuple(row[1:]) for row in db.execute(select(models.Task.id, *columns))}
+
+
+def grouped(db):
+    """The rollups computed from scratch with one GROUP BY over subtask."""
+    Subtask, Status = models.Subtask, models.SubtaskStatus
+    rows = db.execute(
+        select(
+            Subtask.task_id,
+            func.count(),
+            func.count().filter(Subtask.status == Status.pending),
+            func.count().filter(Subtask.status == Status.in_progress),
+            func.count().filter(Subtask.status == Status.completed),
+            func.min(Subtask.started_at),
+            func.max(Subtask.completed_at),
+        ).group_by(Subtask.task_id)
+    )
+    by_task = {row[0]: tuple(row[1:]) for row in rows}
+    return {task_id: by_task.get(task_id, NO_SUBTASKS) for task_id in db.scalars(select(models.Task.id))}
+
+
+def test_rollups_follow_every_subtask_write(app, db):
+    one = crud.create_task(db, schemas.TaskCreate(name="one", subtasks=[{"title": t} for t in "abc"]), PAGE)
+    two, three = crud.bulk_create_tasks(
+        db, [schemas.TaskCreate(name="two", subtasks=[{"title": t} for t in "ab"]), schemas.TaskCreate(name="three")], PAGE
+    )
+    a, b, c = (subtask.id for subtask in one.subtasks)
+
+    crud.update_subtask_status(db, a, "In progress")
+    crud.update_subtask_status(db, b, "Completed")
+    created = crud.create_subtask(db, schemas.SubtaskCreate(title="d"), three)
+    two_ids = db.scalars(select(models.Subtask.id).where(models.Subtask.task_id == two)).all()
+    crud.transition_subtasks(db, [c, *two_ids], models.SubtaskStatus.completed)
+    crud.update_subtask_status(db, c, "Pending")
+    crud.delete_subtask(db, a)
+    operations = schemas.BatchRequest(operations=[
+        {"op": "create_subtask", "task_id": two, "subtask": {"title": "e"}},
+        {"op": "update_subtask_status", "subtask_id": "$0", "status": "In progress"},
+        {"op": "update_subtask_status", "subtask_id": created.id, "status": "Completed"},
+        {"op": "delete_subtask", "subtask_id": two_ids[0]},
+    ]).operations
+    assert all(status == batches.BATCH_OK for status, _, _ in batches.run_batch(db, operations))
+
+    expected = grouped(db)
+    assert rollups(db) == expected
+    assert expected[one.id][:4] == (2, 1, 0, 1)
+    assert expected[two][:4] == (2, 0, 1, 1)
+    assert expected[three][:4] == (1, 0, 0, 1)
+    # rebuild_rollups.py agrees with the incremental values
+    assert rebuild_rollups(dry_run=True) == 0
+
+
+def test_rebuild_repairs_drifted_rollups(app, db):
+    task = crud.create_task(db, schemas.TaskCreate(name="one", subtasks=[{"title": "a"}]), PAGE)
+    empty = crud.create_task(db, schemas.TaskCreate(name="empty"), PAGE)
+    crud.update_subtask_status(db, task.subtasks[0].id, "Completed")
+    expected = grouped(db)
+    assert expected[empty.id] == NO_SUBTASKS
+
+    # As a write outside the API would leave them
+    db.execute(update(models.Task).values(subtask_total=5, subtask_completed=0, last_subtask_completed_at=None))
+    db.commit()
+    assert rebuild_rollups(dry_run=True) == 2
+    assert rollups(db) != expected
+
+    assert rebuild_rollups() == 2
+    assert rollups(db) == expected
+    assert rebuild_rollups(dry_run=True) == 0
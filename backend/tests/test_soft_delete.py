@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.orm import Session
+
+from database_setup import crud, dependencies, models, schemas
+
+API = "/api/v1"
+PAGE = "Home"
+
+
+def create_tasks(db, *names):
+    return [crud.create_task(db, schemas.TaskCreate(name=name, subtasks=[{"title": "step"}]), PAGE) for name in names]
+
+
+def count(db, model, *criteria):
+    return db.scalar(select(func.count()).select_from(model).where(*criteria))
+
+
+def test_deleted_tasks_are_hidden(client, db):
+    kept, deleted = create_tasks(db, "kept plan", "deleted plan")
+    since = crud.get_revision(db, PAGE)
+    assert client.delete(f"{API}/pages/{PAGE}/tasks/{deleted.id}").status_code == 200
+
+    for url in (f"{API}/pages/{PAGE}/tasks", f"{API}/tasks/all", f"{API}/pages/{PAGE}/tasks/summary", f"{API}/tasks/summary"):
+        assert [task["id"] for task in client.get(url).json()] == [kept.id], url
+    hits = client.get(f"{API}/tasks/search", params={"q": "plan"}).json()["items"]
+    assert [hit["id"] for hit in hits] == [kept.id]
+    assert client.get(f"{API}/pages").json()[0]["total"] == 1
+    assert client.get(f"{API}/tasks/analytics").json()["overall"]["total"] == 1
+
+    changes = client.get(f"{API}/pages/{PAGE}/tasks/changes", params={"since": since}).json()
+    assert changes["tasks"] == []
+    assert changes["deleted_task_ids"] == [deleted.id]
+    snapshot = client.get(f"{API}/pages/{PAGE}/tasks/changes").json()
+    assert [task["id"] for task in snapshot["tasks"]] == [kept.id]
+
+    # Gone for every other write too
+    assert client.delete(f"{API}/pages/{PAGE}/tasks/{deleted.id}").status_code == 404
+    assert client.put(f"{API}/pages/{PAGE}/tasks/{deleted.id}/start").status_code == 404
+    assert client.post(f"{API}/tasks/{deleted.id}/subtasks", json={"title": "t"}).status_code == 404
+
+
+def delete_and_purge(db):
+    tasks = create_tasks(db, "kept", "a", "b", "c", "recent")
+    kept, recent = tasks[0], tasks[-1]
+    dependencies.add_dependency(db, kept.id, tasks[1].id)
+    for task in tasks[1:]:
+        crud.delete_task(db, task.id)
+    old = [task.id for task in tasks[1:4]]
+    db.execute(update(models.Task).where(models.Task.id.in_(old)).values(deleted_at=datetime.utcnow() - timedelta(days=2)))
+    db.commit()
+
+    # Two batches of two and one; "recent" isn't old enough yet
+    assert crud.purge_deleted_tasks(db, timedelta(days=1), batch_size=2) == 3
+    assert db.scalars(select(models.Task.id).order_by(models.Task.id)).all() == [kept.id, recent.id]
+    assert count(db, models.Subtask, models.Subtask.task_id.in_(old)) == 0
+    assert count(db, models.Subtask) == 2
+    assert count(db, models.TaskDependency) == 0
+    # The change rows stay as tombstones, so /changes clients still learn of the delete
+    changes = db.scalars(select(models.TaskChange).where(models.TaskChange.task_id.in_(old))).all()
+    assert len(changes) == 3 and all(change.deleted for change in changes)
+    assert crud.purge_deleted_tasks(db, timedelta(days=1)) == 0
+
+
+def test_purge_removes_old_deleted_tasks(db):
+    delete_and_purge(db)
+
+
+@pytest.mark.parametrize("database_url", ["sqlite"], indirect=True)
+def test_purge_without_foreign_keys(database_url, engine):
+    # A plain engine: SQLite leaves foreign_keys off, so nothing cascades
+    plain = create_engine(database_url)
+    with Session(plain, expire_on_commit=False) as db:
+        assert not crud._foreign_keys_enforced(db)
+        delete_and_purge(db)
+    plain.dispose()
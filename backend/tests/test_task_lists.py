@@ -0,0 +1,62 @@
+import pytest
+
+from database_setup import crud, database, schemas
+
+API = "/api/v1"
+PAGE = "Home"
+
+
+def create_tasks(db, count: int, page_name: str = PAGE, subtasks: int = 3):
+    tasks = [
+        schemas.TaskCreate(name=f"task {n}", subtasks=[{"title": f"step {i}"} for i in range(subtasks)])
+        for n in range(count)
+    ]
+    return crud.bulk_create_tasks(db, tasks, page_name)
+
+
+@pytest.mark.parametrize("count", [5, 60])
+def test_orm_lists_load_subtasks_in_one_statement(db, count_statements, count):
+    create_tasks(db, count)
+    for list_tasks in (lambda: crud.get_tasks_by_page(db, PAGE), lambda: crud.get_tasks(db)):
+        db.expunge_all()
+        with count_statements(db.get_bind()) as statements:
+            tasks = [schemas.TaskResponse.model_validate(task) for task in list_tasks()]
+        assert len(tasks) == count
+        assert all(len(task.subtasks) == 3 for task in tasks)
+        # The tasks, then every task's subtasks
+        assert len(statements) == 2
+
+
+@pytest.mark.parametrize("count", [5, 60])
+def test_list_endpoints_issue_a_fixed_number_of_statements(client, db, count_statements, count):
+    create_tasks(db, count)
+    create_tasks(db, count, page_name="Other")
+    async_engine = database.async_engine.sync_engine
+
+    with count_statements(async_engine) as statements:
+        response = client.get(f"{API}/pages/{PAGE}/tasks")
+    assert response.status_code == 200
+    assert len(response.json()) == count
+    assert all(len(task["subtasks"]) == 3 for task in response.json())
+    # The page id (first lookup on this engine), the tasks, their subtasks
+    assert len(statements) == 3
+
+    with count_statements(async_engine) as statements:
+        response = client.get(f"{API}/tasks/all")
+    assert response.status_code == 200
+    assert len(response.json()) == 2 * count
+    assert len(statements) == 2
+
+
+@pytest.mark.parametrize("q, names", [
+    ("_", ["snake_case"]),
+    ("%", ["100% done"]),
+    ("\\", ["back\\slash"]),
+    ("CASE", ["snake_case"]),
+])
+def test_name_filter_matches_wildcards_literally(client, db, q, names):
+    for name in ("snake_case", "100% done", "back\\slash", "plain"):
+        crud.create_task(db, schemas.TaskCreate(name=name), PAGE)
+    response = client.get(f"{API}/pages/{PAGE}/tasks", params={"q": q})
+    assert response.status_code == 200
+    assert [task["name"] for task in response.json()] == names
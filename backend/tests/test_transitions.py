@@ -0,0 +1,94 @@
+from database_setup import crud, schemas
+
+API = "/api/v1"
+PAGE = "Home"
+
+
+def create_task(db, name="task", subtasks=()):
+    return crud.create_task(db, schemas.TaskCreate(name=name, subtasks=[{"title": title} for title in subtasks]), PAGE)
+
+
+def test_task_transitions(client, db):
+    started, direct = create_task(db, "started"), create_task(db, "direct")
+
+    response = client.put(f"{API}/pages/{PAGE}/tasks/{started.id}/start")
+    assert response.status_code == 200
+    assert response.json()["status"] == "In progress"
+    response = client.put(f"{API}/pages/{PAGE}/tasks/{started.id}/complete")
+    assert response.status_code == 200
+    assert response.json()["status"] == "Completed"
+
+    # Pending tasks may be completed without being started
+    response = client.put(f"{API}/pages/{PAGE}/tasks/{direct.id}/complete")
+    assert response.status_code == 200
+    assert response.json()["status"] == "Completed"
+    assert response.json()["started_at"] == response.json()["completed_at"]
+
+    for action in ("start", "complete"):
+        response = client.put(f"{API}/pages/{PAGE}/tasks/{started.id}/{action}")
+        assert response.status_code == 409
+        target = "In progress" if action == "start" else "Completed"
+        assert response.json()["detail"] == f"Cannot move from 'Completed' to '{target}'"
+
+    crud.delete_task(db, direct.id)
+    for task_id in (direct.id, 999999):
+        assert client.put(f"{API}/pages/{PAGE}/tasks/{task_id}/start").status_code == 404
+
+
+def test_task_status_batch(client, db):
+    pending, in_progress, completed, deleted = (create_task(db, name) for name in ("a", "b", "c", "d"))
+    crud.start_task(db, in_progress.id)
+    crud.complete_task(db, completed.id)
+    crud.delete_task(db, deleted.id)
+    revision = crud.get_revision(db, PAGE)
+
+    ids = [pending.id, in_progress.id, completed.id, deleted.id, 999999]
+    response = client.put(f"{API}/tasks/status:batch", json={"task_ids": ids, "status": "In progress"})
+    assert response.status_code == 200
+    result = response.json()
+    assert [task["id"] for task in result["updated"]] == [pending.id]
+    assert result["conflicts"] == {str(in_progress.id): "In progress", str(completed.id): "Completed"}
+    assert result["not_found"] == [deleted.id, 999999]
+    assert result["revisions"] == {PAGE: revision + 1}
+
+    response = client.put(f"{API}/tasks/status:batch", json={"task_ids": ids, "status": "Completed"})
+    result = response.json()
+    assert sorted(task["id"] for task in result["updated"]) == [pending.id, in_progress.id]
+    assert result["conflicts"] == {str(completed.id): "Completed"}
+    assert result["not_found"] == [deleted.id, 999999]
+
+    response = client.put(f"{API}/tasks/status:batch", json={"task_ids": ids, "status": "Pending"})
+    assert response.status_code == 400
+
+
+def test_subtask_transitions(client, db):
+    task = create_task(db, subtasks=["s"])
+    subtask_id = task.subtasks[0].id
+
+    for status in ("In progress", "Completed", "Pending"):
+        response = client.put(f"{API}/subtasks/{subtask_id}/status", json={"status": status})
+        assert response.status_code == 200
+        assert response.json()["status"] == status
+    # Setting the status a subtask already has changes nothing and is a conflict
+    response = client.put(f"{API}/subtasks/{subtask_id}/status", json={"status": "Pending"})
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Cannot move from 'Pending' to 'Pending'"
+
+    assert client.put(f"{API}/subtasks/{subtask_id}/status", json={"status": "Done"}).status_code == 400
+    assert client.put(f"{API}/subtasks/999999/status", json={"status": "Completed"}).status_code == 404
+    crud.delete_task(db, task.id)
+    assert client.put(f"{API}/subtasks/{subtask_id}/status", json={"status": "Completed"}).status_code == 404
+
+
+def test_subtask_status_batch(client, db):
+    task = create_task(db, subtasks=["a", "b", "c"])
+    a, b, c = (subtask.id for subtask in task.subtasks)
+    crud.update_subtask_status(db, b, "Completed")
+
+    response = client.put(f"{API}/subtasks/status:batch", json={"subtask_ids": [a, b, c, 999999], "status": "Completed"})
+    assert response.status_code == 200
+    result = response.json()
+    assert sorted(subtask["id"] for subtask in result["updated"]) == [a, c]
+    assert result["conflicts"] == {str(b): "Completed"}
+    assert result["not_found"] == [999999]
+    assert result["revisions"] == {PAGE: crud.get_revision(db, PAGE)}
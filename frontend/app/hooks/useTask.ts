@@ -29,12 +29,18 @@ export function useTaskManager({ pageName, baseUrl }: UseTaskManagerProps) {
     }
   }
 
+  const replaceTask = (updatedTask: Task) => {
+    setTasks(current => current.map(task => task.id === updatedTask.id ? updatedTask : task))
+  }
+
   const createTask = async (taskData: TaskCreate) => {
     try {
       setIsSubmitting(true)
       setError(null)
-      await apiService.createTask(taskData)
-      await fetchTasks()
+      // Mutations return the changed task, so the list is patched in place
+      // instead of refetching the whole page
+      const newTask = await apiService.createTask(taskData)
+      setTasks(current => [...current, newTask])
     } catch (error) {
       setError('Failed to create task')
       throw error
@@ -47,8 +53,8 @@ export function useTaskManager({ pageName, baseUrl }: UseTaskManagerProps) {
     try {
       setIsProcessing(true)
       setError(null)
-      await apiService.startTask(taskId)
-      await fetchTasks()
+      const updatedTask = await apiService.startTask(taskId)
+      replaceTask(updatedTask)
     } catch (error) {
       setError('Failed to start task')
       console.error('Error starting task:', error)
@@ -61,8 +67,8 @@ export function useTaskManager({ pageName, baseUrl }: UseTaskManagerProps) {
     try {
       setIsProcessing(true)
       setError(null)
-      await apiService.completeTask(taskId)
-      await fetchTasks()
+      const updatedTask = await apiService.completeTask(taskId)
+      replaceTask(updatedTask)
     } catch (error) {
       setError('Failed to complete task')
       console.error('Error completing task:', error)
@@ -76,7 +82,7 @@ export function useTaskManager({ pageName, baseUrl }: UseTaskManagerProps) {
       setIsProcessing(true)
       setError(null)
       await apiService.deleteTask(taskId)
-      await fetchTasks()
+      setTasks(current => current.filter(task => task.id !== taskId))
     } catch (error) {
       setError('Failed to delete task')
       console.error('Error deleting task:', error)
@@ -39,7 +39,7 @@ export class TaskApiService {
         }
     }
 
-    async createTask(taskData: TaskCreate): Promise<void> {
+    async createTask(taskData: TaskCreate): Promise<Task> {
         try {
             const response = await fetch(`${this.baseUrl}/tasks`, {
                 method: 'POST',
@@ -53,6 +53,7 @@ export class TaskApiService {
                 console.error("Server error:", errorData)
                 throw new Error(`Failed to make a new task: ${response.status}`)
             }
+            return await response.json();
         } catch (error){
             console.error("Error making the task: ", error)
             throw error
@@ -61,7 +62,7 @@ export class TaskApiService {
     }
 
 
-    async startTask(taskId: number): Promise<void> {
+    async startTask(taskId: number): Promise<Task> {
         try {
         const response = await fetch(`${this.baseUrl}/tasks/${taskId}/start`, {
             method: 'PUT',
@@ -70,6 +71,7 @@ export class TaskApiService {
         if (!response.ok) {
             throw new Error(`Failed to start task: ${response.status}`)
         }
+        return await response.json();
         } catch (error) {
         console.error('Error starting task:', error)
         throw error
@@ -77,7 +79,7 @@ export class TaskApiService {
     }
 
 
-    async completeTask(taskId: number): Promise<void> {
+    async completeTask(taskId: number): Promise<Task> {
         try {
         const response = await fetch(`${this.baseUrl}/tasks/${taskId}/complete`, {
             method: 'PUT',
@@ -86,6 +88,7 @@ export class TaskApiService {
         if (!response.ok) {
             throw new Error(`Failed to complete task: ${response.status}`)
         }
+        return await response.json();
         } catch (error) {
         console.error('Error completing task:', error)
         throw error